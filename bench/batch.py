@@ -0,0 +1,64 @@
+"""
+POST /api/schedule/batch против тех же запросов по одному (GET /api/schedule)
+через подставной upstream с задержкой.
+
+    uv run python bench/batch.py [--items 20] [--latency 0.1] [--events 120]
+
+Для холодного кеша (ленты загружаются из upstream) и тёплого печатает время
+всего набора сущностей последовательными запросами и одним пакетным запросом.
+Настройки приложения берутся из окружения, например ICAL_PARSER=fast.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from litestar.testing import AsyncTestClient
+from synthetic import feed_text, fmt
+from upstream import install
+
+from app.main import app
+
+PERIOD = {"date_from": "2026-03-02", "date_to": "2026-03-08"}
+
+
+async def run(items: int, latency: float, events: int) -> None:
+    text = feed_text(events)
+    install(lambda request: httpx.Response(200, text=text), latency)
+    sequential_ids = range(1000, 1000 + items)
+    batch_ids = range(2000, 2000 + items)
+
+    async with AsyncTestClient(app=app) as client:
+
+        async def sequential() -> float:
+            started = time.perf_counter()
+            for entity_id in sequential_ids:
+                response = await client.get(f"/api/schedule/1/{entity_id}", params=PERIOD)
+                response.raise_for_status()
+            return time.perf_counter() - started
+
+        async def batch() -> float:
+            body = {"items": [{"type": 1, "id": entity_id} for entity_id in batch_ids], **PERIOD}
+            started = time.perf_counter()
+            response = await client.post("/api/schedule/batch", json=body)
+            response.raise_for_status()
+            assert not any(result["error"] for result in response.json()["results"])
+            return time.perf_counter() - started
+
+        print(f"{'cache':6} {'sequential':>11} {'batch':>11}")
+        for cache in ("cold", "warm"):
+            print(f"{cache:6} {fmt(await sequential()):>11} {fmt(await batch()):>11}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1, help="задержка upstream, с")
+    parser.add_argument("--events", type=int, default=120)
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.latency, args.events))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Поток изменений: память на подписчика, сравнение версий ленты и рассылка
+события всем подписчикам одной сущности.
+
+    uv run python bench/changes_fanout.py [--subscribers 10000] [--events 120]
+
+Подписчики — генераторы ChangeFeed.subscribe в задачах asyncio, как у
+эндпоинта /api/changes без HTTP. Новая версия ленты меняет все дисциплины,
+так что событие несёт все занятия полугодия в added и removed. Печатает
+память подписчиков (tracemalloc), время разбора новой версии, сравнения
+наборов занятий (_apply) и доставки события последнему подписчику.
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from synthetic import feed_text, fmt, make_feed
+
+from app.cache import FeedCache
+from app.cache.backends import MemoryFeedBackend
+from app.parsers import FastICalParser, ParseExecutor
+from app.schemas.search import ScheduleTarget
+from app.services.changes import ChangeFeed
+
+KEY = (ScheduleTarget.GROUP, 708)
+
+
+async def run(subscribers: int, events: int) -> None:
+    executor = ParseExecutor(FastICalParser())
+    changes = ChangeFeed(FeedCache(MemoryFeedBackend(ttl=3600), ttl=3600), executor, heartbeat=3600)
+    year = changes.period[1].year
+    current = make_feed(feed_text(events, group_id=KEY[1], year=year))
+    changed = make_feed(feed_text(events, group_id=KEY[1], year=year, variant=1))
+    subscribed = 0
+    received: list[float] = []
+    all_subscribed, all_received = asyncio.Event(), asyncio.Event()
+
+    async def subscriber() -> None:
+        nonlocal subscribed
+        async for frame in changes.subscribe(KEY, current):
+            if frame.startswith(b"retry:"):
+                subscribed += 1
+                if subscribed == subscribers:
+                    all_subscribed.set()
+            elif frame.startswith(b"id:"):
+                received.append(time.perf_counter())
+                if len(received) == subscribers:
+                    all_received.set()
+
+    # Первый подписчик индексирует текущую версию, остальные её уже застают
+    tasks = [asyncio.ensure_future(subscriber())]
+    while not subscribed:
+        await asyncio.sleep(0.01)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks += [asyncio.ensure_future(subscriber()) for _ in range(subscribers - 1)]
+    await all_subscribed.wait()
+    gc.collect()
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / (subscribers - 1)
+    tracemalloc.stop()
+    print(f"{subscribers} подписчиков, {per_subscriber / 1024:.2f} KB на подписчика")
+
+    start, end = changes.period
+    started = time.perf_counter()
+    lessons = await executor.lessons(KEY, changed, start, end)
+    parsed = time.perf_counter()
+    changes._apply(KEY, lessons)
+    published = time.perf_counter()
+    await all_received.wait()
+    print(f"{'parse new version':18} {fmt(parsed - started):>10}  ({len(lessons)} занятий)")
+    print(f"{'diff + publish':18} {fmt(published - parsed):>10}")
+    print(f"{'fan-out':18} {fmt(max(received) - published):>10}")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    executor.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=120)
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.events))
+
+
+if __name__ == "__main__":
+    main()
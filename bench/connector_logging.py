@@ -0,0 +1,96 @@
+"""
+Накладные расходы HTTPXAsyncConnector (лог ответа, тела по LOG_BODIES, метрики)
+относительно голого вызова httpx с разбором JSON.
+
+    uv run python bench/connector_logging.py [--requests 3000] [--rounds 5] [--format text]
+
+Upstream — MockTransport с ответом поиска на 100 элементов, без задержки.
+Логирование настроено как в приложении (logging_config): записи уходят в очередь
+и форматируются в отдельном потоке, вывод — в /dev/null. Для каждой политики
+LOG_BODIES печатает среднее время запроса и разницу с голым вызовом.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+import httpx
+from synthetic import fmt
+
+from app.connectors.httpx_async import HTTPXAsyncConnector
+from app.log import logging_config
+
+BASE_URL = "https://schedule-of.mirea.ru"
+URL = "/schedule/api/search?match=БСБО"
+PAYLOAD = json.dumps(
+    {
+        "data": [
+            {"id": 700 + n, "targetTitle": f"БСБО-{n:02d}-23", "fullTitle": f"Группа БСБО-{n:02d}-23", "scheduleTarget": 1}
+            for n in range(100)
+        ],
+        "nextPageToken": None,
+    },
+    ensure_ascii=False,
+)
+
+POLICIES = ("off", "debug", "sampled", "truncated")
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, text=PAYLOAD, headers={"content-type": "application/json"})
+
+
+async def run(requests: int, rounds: int) -> dict[str, float]:
+    """
+    Лучшее из rounds среднее время запроса для голого вызова и каждой политики.
+    Варианты чередуются внутри раунда, чтобы дрейф машины не попадал в разницу.
+    """
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=BASE_URL)
+    connector = HTTPXAsyncConnector(max_retries=1, base_url=BASE_URL)
+    connector._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=BASE_URL)
+
+    async def bare() -> None:
+        (await client.get(URL)).json()
+
+    best = dict.fromkeys(("bare", *POLICIES), float("inf"))
+    try:
+        for _ in range(rounds):
+            for variant in best:
+                if variant == "bare":
+                    call = bare
+                else:
+                    connector.log_bodies = variant
+                    call = lambda: connector.get(URL)  # noqa: E731
+                started = time.perf_counter()
+                for _ in range(requests):
+                    await call()
+                best[variant] = min(best[variant], (time.perf_counter() - started) / requests)
+    finally:
+        await client.aclose()
+        await connector.shutdown()
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    args = parser.parse_args()
+
+    config = logging_config(debug=False, log_format=args.format)
+    config.handlers["console"]["stream"] = open(os.devnull, "w")  # noqa: SIM115
+    config.configure()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    best = asyncio.run(run(args.requests, args.rounds))
+    print(f"{'policy':10} {'per request':>12} {'overhead':>10}")
+    for variant, spent in best.items():
+        overhead = "" if variant == "bare" else fmt(spent - best["bare"])
+        print(f"{variant:10} {fmt(spent):>12} {overhead:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Хранилища лент в памяти: MemoryFeedBackend (по числу лент) против
+CompressedFeedBackend (по суммарному размеру) под нагрузкой с распределением Ципфа.
+
+    uv run python bench/feed_backends.py [--groups 3000] [--others 700] [--empty 300] [--requests 60000]
+
+Синтетический университет: ленты групп, преподавателей и аудиторий разного размера
+и одинаковые пустые ленты аудиторий. Запрос к ленте, которой нет в кеше, кладёт
+её в кеш. Печатает долю попаданий, число лент и байт в кеше (nbytes) и среднее
+время get при попадании. Синтетические ленты сжимаются лучше настоящих.
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+
+from synthetic import HEADER, feed_text, fmt, make_feed
+
+from app.cache.backends import CompressedFeedBackend, MemoryFeedBackend
+
+TTL = 3600
+
+
+def university(groups: int, others: int, empty: int) -> dict[tuple[int, int], str]:
+    feeds = {(1, n): feed_text(20 + n % 60, group_id=n) for n in range(groups)}
+    feeds.update({(2, n): feed_text(10 + n % 30, group_id=groups + n) for n in range(others)})
+    blank = HEADER + "END:VCALENDAR\n"
+    feeds.update({(3, n): blank for n in range(empty)})
+    return feeds
+
+
+def run(backend, keys: list, texts: dict, requests: list) -> tuple[float, float]:
+    """Доля попаданий и среднее время get при попадании (секунды)."""
+    feeds = {key: make_feed(texts[key]) for key in keys}
+    hits, spent = 0, 0.0
+    for key in requests:
+        started = time.perf_counter()
+        feed = backend.get(key)
+        if feed is not None:
+            spent += time.perf_counter() - started
+            hits += 1
+        else:
+            backend.set(key, feeds[key])
+    return hits / len(requests), spent / max(1, hits)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=3000)
+    parser.add_argument("--others", type=int, default=700)
+    parser.add_argument("--empty", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=60000)
+    parser.add_argument("--zipf", type=float, default=1.0, help="показатель распределения Ципфа")
+    args = parser.parse_args()
+
+    texts = university(args.groups, args.others, args.empty)
+    total = sum(sys.getsizeof(text) for text in texts.values())
+    print(f"{len(texts)} лент, {total / 2**20:.0f} MB строк")
+    rng = random.Random(42)
+    keys = list(texts)
+    rng.shuffle(keys)
+    weights = list(itertools.accumulate(1 / rank**args.zipf for rank in range(1, len(keys) + 1)))
+    requests = rng.choices(keys, cum_weights=weights, k=args.requests)
+
+    backends = {
+        "memory 512": lambda: MemoryFeedBackend(TTL, maxsize=512),
+        f"memory {len(keys)}": lambda: MemoryFeedBackend(TTL, maxsize=len(keys)),
+        "compressed 4MB": lambda: CompressedFeedBackend(TTL, max_bytes=4 * 2**20),
+        "compressed 16MB": lambda: CompressedFeedBackend(TTL, max_bytes=16 * 2**20),
+    }
+    print(f"{'backend':16} {'hit rate':>8} {'feeds':>6} {'bytes':>10} {'get':>9}")
+    for name, factory in backends.items():
+        backend = factory()
+        hit_rate, get_cost = run(backend, keys, texts, requests)
+        print(
+            f"{name:16} {hit_rate:8.1%} {len(backend):6d} {backend.nbytes() / 2**20:8.1f}MB "
+            f"{fmt(get_cost):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Движки разбора iCal: ICalParser (icalendar + recurring-ical-events) против
+построчного FastICalParser.
+
+    uv run python bench/ical_parsers.py [--events 300]
+
+Печатает время загрузки ленты и развёртки за неделю и за полугодие для обоих
+движков и проверяет, что занятия у них совпадают.
+"""
+
+import argparse
+from datetime import date
+
+from synthetic import best_of, feed_text, fmt
+
+from app.parsers import FastICalParser, ICalParser
+
+WINDOWS = {
+    "week": (date(2026, 3, 2), date(2026, 3, 8)),
+    "semester": (date(2026, 2, 1), date(2026, 8, 31)),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=300)
+    args = parser.parse_args()
+    text = feed_text(args.events)
+    slow, fast = ICalParser(), FastICalParser()
+    calendars = {slow: slow.load(text), fast: fast.load(text)}
+
+    print(f"{'step':9} {'icalendar':>10} {'fast':>10} {'speedup':>8}")
+    timings = {"load": [best_of(lambda: engine.load(text), number=3) for engine in (slow, fast)]}
+    for window, (date_from, date_to) in WINDOWS.items():
+        timings[window] = [
+            best_of(lambda: engine.expand(calendars[engine], date_from, date_to), number=3)
+            for engine in (slow, fast)
+        ]
+        expected = slow.expand(calendars[slow], date_from, date_to)
+        assert fast.expand(calendars[fast], date_from, date_to) == expected, f"занятия за {window} расходятся"
+    for step, (slow_time, fast_time) in timings.items():
+        print(f"{step:9} {fmt(slow_time):>10} {fmt(fast_time):>10} {slow_time / fast_time:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
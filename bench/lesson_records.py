@@ -0,0 +1,81 @@
+"""
+Представление занятий в индексе: компактные LessonRecord против pydantic-моделей
+Lesson на каждое повторение (как до записей).
+
+    uv run python bench/lesson_records.py [--events 400]
+
+Для обоих движков разбора на полугодии печатает память занятий (tracemalloc),
+время кодирования JSON и время развёртки. Модели строятся так же, как раньше
+строил разбор: отдельный провалидированный Lesson со своими PersonRef/RoomRef
+на каждое повторение, поэтому «развёртка в модели» — развёртка плюс валидация.
+"""
+
+import argparse
+import gc
+import tracemalloc
+from datetime import date
+
+from pydantic import TypeAdapter
+from synthetic import best_of, feed_text, fmt
+
+from app.parsers import FastICalParser, ICalParser, encode_lessons
+from app.parsers.records import lesson_details, person_ref, room_ref
+from app.schemas.schedule import Lesson
+
+SEMESTER = (date(2026, 2, 1), date(2026, 8, 31))
+LESSONS = TypeAdapter(list[Lesson])
+
+
+def traced(build):
+    """Результат build() и размер памяти, которую он удерживает (байт)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def clear_pools() -> None:
+    """Общие пулы записей заполняются при развёртке — иначе их память не попадёт в замер."""
+    lesson_details.cache_clear()
+    person_ref.cache_clear()
+    room_ref.cache_clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=400)
+    args = parser.parse_args()
+    text = feed_text(args.events)
+
+    print(f"{'engine':10} {'step':12} {'models':>10} {'records':>10}")
+    for engine in (ICalParser(), FastICalParser()):
+        name = "fast" if isinstance(engine, FastICalParser) else "icalendar"
+        calendar = engine.load(text)
+
+        clear_pools()
+        records, records_size = traced(lambda: engine.expand(calendar, *SEMESTER))
+        dumps = [record.to_lesson().model_dump() for record in records]
+        models, models_size = traced(lambda: [Lesson.model_validate(item) for item in dumps])
+        print(f"{name:10} {'memory':12} {models_size / 2**20:8.2f}MB {records_size / 2**20:8.2f}MB")
+
+        assert LESSONS.dump_json(models).decode() == encode_lessons(records)
+        print(
+            f"{name:10} {'json':12} {fmt(best_of(lambda: LESSONS.dump_json(models), number=3)):>10} "
+            f"{fmt(best_of(lambda: encode_lessons(records), number=3)):>10}"
+        )
+
+        def expand_models() -> list[Lesson]:
+            return [Lesson.model_validate(record.to_lesson().model_dump()) for record in engine.expand(calendar, *SEMESTER)]
+
+        expand_records = best_of(lambda: engine.expand(calendar, *SEMESTER), number=1, repeat=3)
+        print(f"{name:10} {'expand':12} {fmt(best_of(expand_models, number=1, repeat=3)):>10} {fmt(expand_records):>10}")
+        print(f"{name:10} lessons: {len(records)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Индекс занятости: индексирование лент, свободные аудитории, общее свободное
+время и переиндексация изменившейся ленты.
+
+    uv run python bench/occupancy.py [--groups 3000] [--events 30] [--rooms 1500]
+
+Ленты групп весеннего полугодия из периода индекса разбираются FastICalParser
+в режиме inline. Печатает время индексирования ленты (разбор + _apply и только
+_apply), размер индекса, время free_rooms по всем аудиториям, common_free для
+15 сущностей за неделю и переиндексации одной изменившейся ленты.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import timedelta
+
+from synthetic import best_of, feed_text, fmt, make_feed
+
+from app.parsers import FastICalParser, ParseExecutor
+from app.schemas.search import ScheduleTarget
+from app.services.occupancy import OccupancyIndex
+
+
+def index_bytes(index: OccupancyIndex) -> int:
+    """Память под маски: собственная занятость, вклады лент и итоговая занятость аудиторий."""
+    own = sum(map(sys.getsizeof, index._own.values()))
+    contrib = sum(sys.getsizeof(values) for rooms in index._contrib.values() for values in rooms.values())
+    rooms = sum(map(sys.getsizeof, index._rooms_busy.values()))
+    return own + contrib + rooms
+
+
+async def run(groups: int, events: int, rooms: int) -> None:
+    executor = ParseExecutor(FastICalParser(), maxsize=4)
+    index = OccupancyIndex(executor)
+    year = index.period[1].year
+    feeds = {
+        (ScheduleTarget.GROUP, n): make_feed(feed_text(events, group_id=n, year=year, rooms=rooms, room_shift=n * 13))
+        for n in range(groups)
+    }
+    start, end = index.period
+
+    parsed = applied = 0.0
+    occurrences = 0
+    for key, feed in feeds.items():
+        started = time.perf_counter()
+        lessons = await executor.lessons(key, feed, start, end)
+        middle = time.perf_counter()
+        index._apply(key, lessons)
+        index._versions[key] = (feed.digest, start)
+        finished = time.perf_counter()
+        parsed += middle - started
+        applied += finished - middle
+        occurrences += len(lessons)
+    print(f"{len(feeds)} лент, {occurrences} занятий, {len(index.rooms)} аудиторий")
+    print(f"{'index, per feed':24} {fmt((parsed + applied) / len(feeds)):>10}  (_apply {fmt(applied / len(feeds))})")
+    print(f"{'index size':24} {index_bytes(index) / 2**20:8.1f}MB")
+
+    day = min(lesson.date for lesson in lessons)
+    print(f"{'free_rooms, all rooms':24} {fmt(best_of(lambda: index.free_rooms(day, 0b11), number=20)):>10}")
+    keys = list(feeds)[:10] + [(ScheduleTarget.ROOM, 130 + n) for n in range(5)]
+    week = day + timedelta(days=6)
+    print(f"{'common_free, 15 x week':24} {fmt(best_of(lambda: index.common_free(keys, day, week))):>10}")
+
+    key = next(iter(feeds))
+    changed = make_feed(feed_text(events, group_id=key[1], year=year, variant=1, rooms=rooms))
+    started = time.perf_counter()
+    await index.update(key, changed)
+    print(f"{'re-index changed feed':24} {fmt(time.perf_counter() - started):>10}")
+    executor.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=3000)
+    parser.add_argument("--events", type=int, default=30)
+    parser.add_argument("--rooms", type=int, default=1500)
+    args = parser.parse_args()
+    asyncio.run(run(args.groups, args.events, args.rooms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Выборка занятий за период: развёртка календаря на каждый запрос (как до индекса)
+против OccurrenceIndex, развёрнутого один раз на полугодие.
+
+    uv run python bench/occurrence_index.py [--events 120]
+
+Печатает время одного запроса за день, неделю и полугодие для обоих движков
+разбора, время построения индекса и число полугодий, которые индекс хранит
+после запроса за 1000–9000 годы (не больше OccurrenceIndex.MAX_PERIODS).
+"""
+
+import argparse
+import time
+from datetime import date
+
+from synthetic import best_of, feed_text, fmt
+
+from app.parsers import FastICalParser, ICalParser, OccurrenceIndex
+
+WINDOWS = {
+    "day": (date(2026, 3, 4), date(2026, 3, 4)),
+    "week": (date(2026, 3, 2), date(2026, 3, 8)),
+    "semester": (date(2026, 2, 1), date(2026, 8, 31)),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=120)
+    args = parser.parse_args()
+    text = feed_text(args.events)
+
+    print(f"{'engine':10} {'window':9} {'expand':>10} {'index':>10}")
+    for engine in (ICalParser(), FastICalParser()):
+        name = "fast" if isinstance(engine, FastICalParser) else "icalendar"
+        calendar = engine.load(text)
+        started = time.perf_counter()
+        index = OccurrenceIndex.from_text(engine, text)
+        index.lessons(*WINDOWS["semester"])
+        built = time.perf_counter() - started
+        for window, (date_from, date_to) in WINDOWS.items():
+            expand = best_of(lambda: engine.expand(calendar, date_from, date_to), number=3)
+            indexed = best_of(lambda: index.lessons(date_from, date_to), number=1000)
+            print(f"{name:10} {window:9} {fmt(expand):>10} {fmt(indexed):>10}")
+        print(f"{name:10} {'build':9} {'':>10} {fmt(built):>10}")
+
+        wide = OccurrenceIndex.from_text(engine, text)
+        started = time.perf_counter()
+        wide.lessons(date(1000, 1, 1), date(9000, 1, 1))
+        print(
+            f"{name:10} 1000–9000: {fmt(time.perf_counter() - started)}, "
+            f"полугодий в индексе: {len(wide._periods)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Нагрузочный тест ParseExecutor: p50/p99 задержки маленьких запросов (одна неделя
+уже разобранной небольшой ленты), пока параллельно разбираются большие ленты.
+
+    uv run python bench/parse_p99.py [--large-events 400] [--parsers 4] [--seconds 5]
+
+Для каждого режима PARSE_EXECUTOR (inline, thread, process) печатает задержки
+маленьких запросов и число разобранных больших лент. В режиме inline разбор
+идёт в event loop и задерживает все остальные запросы на время разбора.
+В режиме process лента закреплена за процессом: запрос ждёт, если его процесс
+занят разбором другой ленты, а выигрыш от процессов есть только при нескольких ядрах.
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from datetime import date
+
+from synthetic import feed_text, make_feed, percentile
+
+from app.parsers import FastICalParser, ICalParser, ParseExecutor
+
+WEEK = (date(2026, 3, 2), date(2026, 3, 8))
+SEMESTER = (date(2026, 2, 1), date(2026, 8, 31))
+
+
+async def run(
+    mode: str, parser, large_events: int, parsers: int, seconds: float, interval: float
+) -> tuple[list[float], int]:
+    executor = ParseExecutor(parser, mode=mode, workers=4)
+    small = make_feed(feed_text(20, group_id=1))
+    # Версии больших лент готовятся заранее: каждая разбирается без попадания в кеш
+    large = [make_feed(feed_text(large_events, group_id=100, variant=n)) for n in range(64)]
+    versions = itertools.cycle(large)
+    await executor.lessons((1, 1), small, *WEEK)
+    parsed = 0
+    stop = time.perf_counter() + seconds
+
+    async def parse_large(worker: int) -> None:
+        nonlocal parsed
+        while time.perf_counter() < stop:
+            await executor.lessons((1, 100 + worker), next(versions), *SEMESTER)
+            parsed += 1
+            await asyncio.sleep(0)
+
+    async def small_request(planned: float, latencies: list[float]) -> None:
+        await executor.lessons((1, 1), small, *WEEK)
+        latencies.append(time.perf_counter() - planned)
+
+    async def small_requests() -> list[float]:
+        # Открытая нагрузка: запросы приходят по расписанию, задержка считается
+        # от запланированного момента — так видно и время, когда event loop был занят
+        latencies: list[float] = []
+        tasks = []
+        planned = time.perf_counter()
+        while planned < stop:
+            await asyncio.sleep(max(0.0, planned - time.perf_counter()))
+            tasks.append(asyncio.ensure_future(small_request(planned, latencies)))
+            planned += interval
+        await asyncio.gather(*tasks)
+        return latencies
+
+    try:
+        results = await asyncio.gather(
+            small_requests(), *(parse_large(worker) for worker in range(parsers))
+        )
+    finally:
+        executor.shutdown()
+    return results[0], parsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--large-events", type=int, default=400)
+    parser.add_argument("--parsers", type=int, default=4, help="одновременных разборов больших лент")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.01, help="период маленьких запросов, с")
+    parser.add_argument("--engine", choices=("icalendar", "fast"), default="icalendar")
+    args = parser.parse_args()
+    engine = FastICalParser() if args.engine == "fast" else ICalParser()
+
+    print(f"{'mode':8} {'small p50':>10} {'small p99':>10} {'small max':>10} {'large parsed':>13}")
+    for mode in ("inline", "thread", "process"):
+        latencies, parsed = asyncio.run(run(mode, engine, args.large_events, args.parsers, args.seconds, args.interval))
+        print(
+            f"{mode:8} {percentile(latencies, 0.5) * 1000:8.2f}ms {percentile(latencies, 0.99) * 1000:8.2f}ms "
+            f"{max(latencies) * 1000:8.2f}ms {parsed:13d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Синтетические ленты в формате schedule-of.mirea.ru для бенчмарков.
+
+Скрипты bench/ запускаются из корня репозитория: uv run python bench/<скрипт>.py
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+# Фоновые задачи приложения (поисковый индекс, прогрев, поток изменений) замеры искажают
+os.environ.setdefault("SEARCH_INDEX_REFRESH", "0")
+os.environ.setdefault("PREFETCH_TOP", "0")
+os.environ.setdefault("PREFETCH_STATE_PATH", os.path.join(tempfile.gettempdir(), "bench-popular.json"))
+os.environ.setdefault("CHANGES_INTERVAL", "0")
+
+from app.cache import Feed  # noqa: E402
+
+PAIRS = (("0900", "1030"), ("1040", "1210"), ("1240", "1410"), ("1420", "1550"), ("1620", "1750"), ("1800", "1930"))
+HEADER = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//bench//
+BEGIN:VTIMEZONE
+TZID:Europe/Moscow
+BEGIN:STANDARD
+DTSTART:19700101T000000
+TZOFFSETFROM:+0300
+TZOFFSETTO:+0300
+TZNAME:MSK
+END:STANDARD
+END:VTIMEZONE
+"""
+
+
+def feed_text(
+    events: int, group_id: int = 708, year: int = 2026, variant: int = 0, rooms: int = 25, room_shift: int = 0
+) -> str:
+    """
+    Лента группы весеннего полугодия year: events повторяющихся занятий (по неделе
+    или через неделю, с исключённой датой), у каждого — преподаватель, группы и аудитория
+    (одна из rooms, начиная со сдвига room_shift).
+    variant меняет названия дисциплин — так получаются разные версии одной ленты.
+    """
+    first_monday = date(year, 2, 9)
+    lines = [HEADER]
+    for n in range(events):
+        day = first_monday + timedelta(days=n % 6)
+        start, end = PAIRS[n // 6 % len(PAIRS)]
+        stamp = day.strftime("%Y%m%d")
+        excluded = (day + timedelta(weeks=2)).strftime("%Y%m%d")
+        teacher, room = 1900 + n % 40, 130 + (n + room_shift) % rooms
+        lines.append(
+            "BEGIN:VEVENT\n"
+            f"UID:ev-{group_id}-{n}\n"
+            f"DTSTART;TZID=Europe/Moscow:{stamp}T{start}00\n"
+            f"DTEND;TZID=Europe/Moscow:{stamp}T{end}00\n"
+            f"RRULE:FREQ=WEEKLY;INTERVAL={1 + n % 2};UNTIL={year}0531T235959Z\n"
+            f"EXDATE;TZID=Europe/Moscow:{excluded}T{start}00\n"
+            f"SUMMARY:ПР Дисциплина {n % 17}\n"
+            f"X-META-DISCIPLINE:Дисциплина {n % 17}\\, вариант {variant}\n"
+            "X-META-LESSON_TYPE:ПР\n"
+            "X-META-FULL_LESSON_TYPE:Практические занятия\n"
+            f"X-META-TEACHER;ID={teacher}:Преподаватель {teacher}\n"
+            f"X-META-GROUP;ID={group_id}:БСБО-{group_id % 100:02d}-23\n"
+            f"X-META-AUDITORIUM;ID={room};NUMBER={room}б;CAMPUS=С-20:{room}б (С-20)\n"
+            "END:VEVENT\n"
+        )
+    lines.append("END:VCALENDAR\n")
+    return "".join(lines)
+
+
+def make_feed(text: str) -> Feed:
+    return Feed(text=text, digest=hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def best_of(fn: Callable[[], object], number: int = 100, repeat: int = 5) -> float:
+    """Лучшее из repeat среднее время одного вызова fn (секунды)."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def fmt(seconds: float) -> str:
+    """Время в удобных единицах."""
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds * 1e6:.1f} us"
@@ -0,0 +1,40 @@
+"""
+Подставной upstream для бенчмарков: ответы без сети с заданной задержкой.
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+
+import httpx
+
+from app.connectors import ScheduleConnector
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+class StandInUpstream:
+    """Отвечает через handler спустя latency секунд и считает запросы."""
+
+    def __init__(self, handler: Handler, latency: float = 0.0) -> None:
+        self.handler = handler
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.handler(request)
+
+
+def install(handler: Handler, latency: float = 0.0) -> StandInUpstream:
+    """Подменяет клиент общего ScheduleConnector клиентом с подставным upstream."""
+    # Строка лога на каждый запрос заметно влияет на замеры
+    logging.disable(logging.INFO)
+    stand_in = StandInUpstream(handler, latency)
+    ScheduleConnector()._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(stand_in),
+        base_url=ScheduleConnector.BASE_URL,
+    )
+    return stand_in
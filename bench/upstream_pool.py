@@ -0,0 +1,99 @@
+"""
+Пул соединений к upstream: пропускная способность и ожидание соединения в пуле
+при разных UPSTREAM_MAX_CONNECTIONS / UPSTREAM_MAX_KEEPALIVE.
+
+    uv run python bench/upstream_pool.py [--requests 1000] [--concurrency 200] [--latency 0.2]
+
+Upstream — локальный HTTP/1.1 сервер в отдельном процессе, отвечающий через
+latency секунд (MockTransport пул соединений не использует). Ожидание в пуле
+замеряется так же, как в приложении (HTTPXAsyncConnector.pool_wait_trace).
+На одном ядре клиент и сервер делят процессор, поэтому начиная с нескольких
+десятков соединений пропускная способность упирается в CPU, а не в пул.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+import httpx
+from synthetic import fmt
+
+from app.connectors.httpx_async import HTTPXAsyncConnector
+from app.metrics import UPSTREAM_POOL_WAIT
+
+LIMITS = ((10, 10), (50, 5), (100, 20), (200, 20))
+BODY = b'{"data": [], "nextPageToken": null}'
+
+
+async def _serve(sock: socket.socket, latency: float) -> None:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                await asyncio.sleep(latency)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(BODY), BODY)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, sock=sock, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(sock: socket.socket, latency: float) -> None:
+    asyncio.run(_serve(sock, latency))
+
+
+async def run(url: str, connections: int, keepalive: int, requests: int, concurrency: int) -> tuple[float, float]:
+    """Запросов в секунду и среднее ожидание соединения в пуле (секунды)."""
+    label = f"bench-{connections}-{keepalive}"
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=connections, max_keepalive_connections=keepalive),
+        timeout=httpx.Timeout(60.0),
+    )
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            response = await client.get(url, extensions=HTTPXAsyncConnector.pool_wait_trace(label))
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        await client.aclose()
+    elapsed = time.perf_counter() - started
+    _, total, count = UPSTREAM_POOL_WAIT._values[(label,)]
+    return requests / elapsed, total / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="задержка ответа upstream, с")
+    args = parser.parse_args()
+
+    sock = socket.create_server(("127.0.0.1", 0))
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}/schedule/api/search"
+    server = multiprocessing.Process(target=serve, args=(sock, args.latency), daemon=True)
+    server.start()
+    try:
+        print(f"{'max conns':>9} {'keepalive':>9} {'req/s':>8} {'pool wait':>10}")
+        for connections, keepalive in LIMITS:
+            throughput, wait = asyncio.run(run(url, connections, keepalive, args.requests, args.concurrency))
+            print(f"{connections:9d} {keepalive:9d} {throughput:8.1f} {fmt(wait):>10}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
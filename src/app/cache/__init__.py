@@ -0,0 +1,23 @@
+from .backends import (
+    AbstractFeedBackend,
+    CompressedFeedBackend,
+    MemoryFeedBackend,
+    SQLiteFeedBackend,
+    create_feed_backend,
+)
+from .feeds import Feed, FeedCache, feed_digest
+from .parsed import ParsedCalendarCache
+from .responses import ResponseCache
+
+__all__ = [
+    "AbstractFeedBackend",
+    "CompressedFeedBackend",
+    "MemoryFeedBackend",
+    "SQLiteFeedBackend",
+    "create_feed_backend",
+    "Feed",
+    "FeedCache",
+    "feed_digest",
+    "ParsedCalendarCache",
+    "ResponseCache",
+]
@@ -0,0 +1,406 @@
+"""
+Хранилища для кеша iCal-лент.
+"""
+
+import heapq
+import itertools
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from cachetools import LRUCache, TTLCache
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+from .feeds import Feed, FeedKey
+
+
+class AbstractFeedBackend(ABC):
+    """
+    Базовое хранилище лент по ключу (schedule_type, entity_id).
+    Записи живут ttl секунд с момента последней записи.
+    """
+
+    # Операции обращаются к диску: FeedCache вызывает их в отдельном потоке
+    blocking = False
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        # Записи, удалённые хранилищем по истечении ttl или из-за нехватки места
+        self.evictions = 0
+        # Вызывается с ключом каждой вытесненной записи (его задаёт FeedCache)
+        self.on_evict: Callable[[FeedKey], None] | None = None
+
+    @abstractmethod
+    def get(self, key: FeedKey) -> Feed | None:
+        """Лента по ключу или None, если её нет или она истекла."""
+        raise NotImplementedError
+
+    def digest(self, key: FeedKey) -> str | None:
+        """Digest ленты по ключу (без её текста) или None."""
+        feed = self.get(key)
+        return feed.digest if feed is not None else None
+
+    @abstractmethod
+    def set(self, key: FeedKey, feed: Feed) -> None:
+        """Сохранение ленты."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: FeedKey) -> None:
+        """Удаление ленты."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def nbytes(self) -> int | None:
+        """Сколько памяти занимают ленты (None — хранилище не в памяти)."""
+        return None
+
+    def close(self) -> None:
+        """Освобождение ресурсов."""
+
+    def _evicted(self, keys: Iterable[FeedKey]) -> None:
+        """Учёт вытесненных записей."""
+        for key in keys:
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key)
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache, сообщающий владельцу число вытесненных записей."""
+
+    def __init__(self, owner: AbstractFeedBackend, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._owner = owner
+
+    def expire(self, time=None):
+        # Список вытесненных пар (ключ, значение) expire() возвращает с cachetools 5.3
+        expired = super().expire(time)
+        self._owner._evicted(key for key, _ in expired)
+        return expired
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._owner._evicted((key,))
+        return key, value
+
+
+class MemoryFeedBackend(AbstractFeedBackend):
+    """In-memory TTL-кеш процесса (по умолчанию)."""
+
+    def __init__(self, ttl: float, maxsize: int = 512) -> None:
+        super().__init__(ttl)
+        self._entries: TTLCache = _CountingTTLCache(self, maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: FeedKey) -> Feed | None:
+        return self._entries.get(key)
+
+    def set(self, key: FeedKey, feed: Feed) -> None:
+        self._entries[key] = feed
+
+    def delete(self, key: FeedKey) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def nbytes(self) -> int:
+        return sum(sys.getsizeof(feed.text) for feed in self._entries.values())
+
+
+@dataclass(slots=True)
+class _CompressedEntry:
+    digest: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    changed_at: float
+    expires_at: float
+    hits: int = 1
+    priority: float = 0.0
+
+
+class CompressedFeedBackend(AbstractFeedBackend):
+    """
+    Кеш в памяти процесса, ограниченный суммарным размером, а не числом лент.
+
+    Текст лент хранится сжатым (zstd, если есть compression.zstd, иначе zlib),
+    одинаковые ленты разных сущностей — одним экземпляром (по digest).
+    При превышении max_bytes вытесняются ленты с наименьшим приоритетом
+    GreedyDual-Size-Frequency: частота обращений / размер, с «инфляцией» L,
+    чтобы давно не запрашиваемые ленты со временем тоже уходили.
+    Тексты HOT_ENTRIES последних прочитанных лент дополнительно держатся
+    распакованными (сверх max_bytes), чтобы частые запросы не платили за распаковку.
+    """
+
+    HOT_ENTRIES = 64
+    # Служебные данные одной записи, учитываемые в max_bytes
+    ENTRY_OVERHEAD = 256
+    PURGE_INTERVAL = 300.0
+
+    def __init__(self, ttl: float, max_bytes: int = 128 * 1024 * 1024) -> None:
+        super().__init__(ttl)
+        self.max_bytes = max_bytes
+        self.codec = "zstd" if zstd is not None else "zlib"
+        self._entries: dict[FeedKey, _CompressedEntry] = {}
+        # digest → [сжатый текст, число ссылающихся записей]
+        self._blobs: dict[str, list] = {}
+        self._bytes = 0
+        self._inflation = 0.0
+        # (приоритет, порядковый номер, ключ); устаревшие элементы пропускаются при вытеснении
+        self._heap: list[tuple[float, int, FeedKey]] = []
+        self._order = itertools.count()
+        self._hot: LRUCache = LRUCache(maxsize=self.HOT_ENTRIES)
+        self._purged_at = 0.0
+
+    def _compress(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        return zstd.compress(data) if zstd is not None else zlib.compress(data, 6)
+
+    def _decompress(self, blob: bytes) -> str:
+        data = zstd.decompress(blob) if zstd is not None else zlib.decompress(blob)
+        return data.decode("utf-8")
+
+    def _touch(self, key: FeedKey, entry: _CompressedEntry) -> None:
+        size = len(self._blobs[entry.digest][0]) + self.ENTRY_OVERHEAD
+        entry.priority = self._inflation + entry.hits / size
+        heapq.heappush(self._heap, (entry.priority, next(self._order), key))
+        if len(self._heap) > 4 * len(self._entries) + 64:
+            # Слишком много устаревших элементов — пересобираем кучу
+            self._heap = [(e.priority, next(self._order), k) for k, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def get(self, key: FeedKey) -> Feed | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._remove(key)
+            self._evicted((key,))
+            return None
+        entry.hits += 1
+        self._touch(key, entry)
+        text = self._hot.get(entry.digest)
+        if text is None:
+            text = self._hot[entry.digest] = self._decompress(self._blobs[entry.digest][0])
+        return Feed(
+            text=text,
+            digest=entry.digest,
+            etag=entry.etag,
+            last_modified=entry.last_modified,
+            fetched_at=entry.fetched_at,
+            changed_at=entry.changed_at,
+        )
+
+    def set(self, key: FeedKey, feed: Feed) -> None:
+        now = time.time()
+        previous = self._entries.get(key)
+        hits = previous.hits if previous is not None else 1
+        blob = self._blobs.get(feed.digest)
+        if blob is None:
+            blob = self._blobs[feed.digest] = [self._compress(feed.text), 0]
+            self._bytes += len(blob[0])
+        blob[1] += 1
+        if previous is not None:
+            self._remove(key)
+        self._bytes += self.ENTRY_OVERHEAD
+        entry = self._entries[key] = _CompressedEntry(
+            digest=feed.digest,
+            etag=feed.etag,
+            last_modified=feed.last_modified,
+            fetched_at=feed.fetched_at,
+            changed_at=feed.changed_at,
+            expires_at=now + self.ttl,
+            hits=hits,
+        )
+        self._hot[feed.digest] = feed.text
+        self._touch(key, entry)
+        if now - self._purged_at > self.PURGE_INTERVAL:
+            self._purge(now)
+        self._evict()
+
+    def delete(self, key: FeedKey) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def _remove(self, key: FeedKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= self.ENTRY_OVERHEAD
+        blob = self._blobs[entry.digest]
+        blob[1] -= 1
+        if blob[1] == 0:
+            del self._blobs[entry.digest]
+            self._hot.pop(entry.digest, None)
+            self._bytes -= len(blob[0])
+
+    def _purge(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self._evicted(expired)
+        self._purged_at = now
+
+    def _evict(self) -> None:
+        """Вытесняет ленты с наименьшим приоритетом, пока размер больше max_bytes."""
+        while self._bytes > self.max_bytes and self._heap:
+            priority, _, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry.priority != priority:
+                continue
+            self._inflation = priority
+            self._remove(key)
+            self._evicted((key,))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def nbytes(self) -> int:
+        return self._bytes
+
+
+class SQLiteFeedBackend(AbstractFeedBackend):
+    """
+    Кеш лент в файле SQLite.
+
+    Файл общий для всех воркеров uvicorn на хосте и переживает перезапуск.
+    База в режиме WAL: чтения не блокируются записью соседних воркеров.
+    Число записей (len) пересчитывается не чаще раза в PURGE_INTERVAL секунд:
+    в файл пишут и соседние воркеры, точнее его всё равно не знать.
+    """
+
+    blocking = True
+    # Истёкшие записи удаляются не чаще, чем раз в PURGE_INTERVAL секунд
+    PURGE_INTERVAL = 300.0
+
+    def __init__(self, path: str, ttl: float) -> None:
+        super().__init__(ttl)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS feeds (
+                schedule_type INTEGER NOT NULL,
+                entity_id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                changed_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (schedule_type, entity_id)
+            )
+            """
+        )
+        self._conn.commit()
+        self._purged_at = 0.0
+        self._count = 0
+        self._counted_at = 0.0
+
+    def get(self, key: FeedKey) -> Feed | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, digest, etag, last_modified, fetched_at, changed_at FROM feeds "
+                "WHERE schedule_type = ? AND entity_id = ? AND expires_at > ?",
+                (*key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return Feed(
+            text=row[0],
+            digest=row[1],
+            etag=row[2],
+            last_modified=row[3],
+            fetched_at=row[4],
+            changed_at=row[5],
+        )
+
+    def digest(self, key: FeedKey) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM feeds WHERE schedule_type = ? AND entity_id = ? AND expires_at > ?",
+                (*key, time.time()),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, key: FeedKey, feed: Feed) -> None:
+        now = time.time()
+        purged: list[FeedKey] = []
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    *key,
+                    feed.text,
+                    feed.digest,
+                    feed.etag,
+                    feed.last_modified,
+                    feed.fetched_at,
+                    feed.changed_at,
+                    now + self.ttl,
+                ),
+            )
+            if now - self._purged_at > self.PURGE_INTERVAL:
+                purged = self._conn.execute(
+                    "DELETE FROM feeds WHERE expires_at <= ? RETURNING schedule_type, entity_id", (now,)
+                ).fetchall()
+                self._purged_at = now
+            self._conn.commit()
+        self._evicted(tuple(row) for row in purged)
+
+    def delete(self, key: FeedKey) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM feeds WHERE schedule_type = ? AND entity_id = ?", key
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        now = time.time()
+        if now - self._counted_at > self.PURGE_INTERVAL:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM feeds WHERE expires_at > ?", (now,)
+                ).fetchone()
+            self._count, self._counted_at = row[0], now
+        return self._count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_feed_backend(
+    kind: str,
+    ttl: float,
+    path: str,
+    maxsize: int = 512,
+    max_bytes: int = 128 * 1024 * 1024,
+) -> AbstractFeedBackend:
+    """Хранилище лент по имени из настроек (CACHE_BACKEND)."""
+    match kind:
+        case "memory":
+            return MemoryFeedBackend(ttl=ttl, maxsize=maxsize)
+        case "compressed":
+            return CompressedFeedBackend(ttl=ttl, max_bytes=max_bytes)
+        case "sqlite":
+            return SQLiteFeedBackend(path=path, ttl=ttl)
+    raise ValueError(f"Неизвестное хранилище кеша: {kind!r}")
@@ -0,0 +1,241 @@
+"""
+Кеш iCal-лент с фоновым обновлением (stale-while-revalidate).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING
+
+from app.connectors import Priority, ScheduleConnector, UpstreamUnavailableError, upstream_priority
+
+if TYPE_CHECKING:
+    from .backends import AbstractFeedBackend
+
+logger = logging.getLogger("app.cache")
+
+FeedKey = tuple[int, int]
+
+
+def feed_digest(text: str) -> str:
+    """Хеш содержимого ленты — по нему определяем, изменилась ли лента."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@dataclass(slots=True)
+class Feed:
+    """iCal-лента сущности вместе с валидаторами upstream."""
+    text: str
+    digest: str
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = field(default_factory=time.time)  # последняя успешная сверка с upstream
+    changed_at: float = field(default_factory=time.time)  # последнее изменение содержимого
+
+    def age(self) -> float:
+        """Сколько секунд прошло с последней сверки с upstream."""
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class FeedCache:
+    """
+    Кеш iCal-лент по ключу (schedule_type, entity_id) поверх хранилища лент.
+
+    Хранилище должно держать записи не меньше ttl + stale_ttl секунд.
+
+    Лента старше ttl сверяется с upstream условным запросом (ETag / If-Modified-Since).
+    При swr устаревшая запись отдаётся сразу, а лента обновляется в фоне; иначе запрос
+    ждёт сверки. Если upstream недоступен (предохранитель разомкнут, бюджет времени
+    исчерпан, 5xx), устаревшая запись отдаётся в обоих режимах, пока не истечёт stale_ttl.
+    При stale_ttl == 0 это обычный TTL-кеш.
+    """
+
+    # Пауза между фоновыми попытками обновления, если upstream отвечает ошибкой
+    REFRESH_BACKOFF = 30.0
+
+    def __init__(
+        self, backend: AbstractFeedBackend, ttl: float, stale_ttl: float = 0, swr: bool = True
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.swr = swr
+        self._backend = backend
+        self._refreshing: dict[FeedKey, asyncio.Task] = {}
+        self._retry_at: dict[FeedKey, float] = {}
+        self._listeners: list[Callable[[FeedKey, Feed], None]] = []
+        self._eviction_listeners: list[Callable[[FeedKey], None]] = []
+        backend.on_evict = self._on_evict
+        # Цикл событий, из которого хранилище вызывается в отдельном потоке (blocking)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    async def get(self, schedule_type: int, entity_id: int) -> Feed:
+        """Возвращает ленту из кеша или загружает её из upstream."""
+        key = (schedule_type, entity_id)
+        feed = await self._load(key)
+        if feed is None:
+            self.misses += 1
+            return await self._refresh(key, None)
+        if not self.is_stale(feed):
+            self.hits += 1
+        elif self.swr:
+            self.stale_hits += 1
+            self._refresh_in_background(key, feed)
+        else:
+            try:
+                feed = await self._refresh(key, feed)
+            except UpstreamUnavailableError as e:
+                self.stale_hits += 1
+                logger.warning("Upstream недоступен, отдаём устаревшую ленту %s: %r", key, e)
+            else:
+                self.misses += 1
+        return feed
+
+    async def warm(self, schedule_type: int, entity_id: int, min_ttl: float = 0) -> Feed:
+        """
+        Прогрев: лента, свежая ещё хотя бы min_ttl секунд, остаётся как есть, иначе
+        загружается или сверяется с upstream (условным запросом). Счётчики попаданий
+        не меняются — это не запрос пользователя.
+        """
+        key = (schedule_type, entity_id)
+        feed = await self._load(key)
+        if feed is not None and feed.age() + min_ttl <= self.ttl:
+            return feed
+        return await self._refresh(key, feed)
+
+    async def digest(self, schedule_type: int, entity_id: int) -> str | None:
+        """Digest ленты из кеша без обращения к upstream (None — ленты в кеше нет)."""
+        key = (schedule_type, entity_id)
+        if self._backend.blocking:
+            return await asyncio.to_thread(self._backend.digest, key)
+        return self._backend.digest(key)
+
+    async def _load(self, key: FeedKey) -> Feed | None:
+        if self._backend.blocking:
+            self._loop = asyncio.get_running_loop()
+            return await asyncio.to_thread(self._backend.get, key)
+        return self._backend.get(key)
+
+    async def _store(self, key: FeedKey, feed: Feed) -> None:
+        if self._backend.blocking:
+            self._loop = asyncio.get_running_loop()
+            await asyncio.to_thread(self._backend.set, key, feed)
+        else:
+            self._backend.set(key, feed)
+
+    def is_stale(self, feed: Feed) -> bool:
+        """Лента не сверялась с upstream дольше ttl."""
+        return feed.age() > self.ttl
+
+    def is_failing(self, schedule_type: int, entity_id: int) -> bool:
+        """Последнее фоновое обновление ленты завершилось ошибкой."""
+        return (schedule_type, entity_id) in self._retry_at
+
+    def _refresh_in_background(self, key: FeedKey, previous: Feed) -> None:
+        if key in self._refreshing:
+            return
+        if self._retry_at.get(key, 0.0) > time.monotonic():
+            return
+        with upstream_priority(Priority.BACKGROUND):
+            task = asyncio.ensure_future(self._refresh_quietly(key, previous))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh_quietly(self, key: FeedKey, previous: Feed) -> None:
+        try:
+            await self._refresh(key, previous)
+        except Exception as e:
+            self._retry_at[key] = time.monotonic() + self.REFRESH_BACKOFF
+            logger.warning("Не удалось обновить ленту %s, отдаём устаревшую: %r", key, e)
+        else:
+            self._retry_at.pop(key, None)
+
+    async def _refresh(self, key: FeedKey, previous: Feed | None) -> Feed:
+        connector = ScheduleConnector()
+        response = await connector.get_ical_conditional(
+            *key,
+            etag=previous.etag if previous is not None else None,
+            last_modified=previous.last_modified if previous is not None else None,
+        )
+        now = time.time()
+        if previous is not None and response.not_modified:
+            feed = replace(previous, fetched_at=now)
+        else:
+            digest = feed_digest(response.text)
+            if previous is not None and previous.digest == digest:
+                # Содержимое не изменилось: оставляем прежний текст, чтобы разобранные
+                # представления в кешах выше оставались действительными
+                feed = replace(
+                    previous,
+                    etag=response.etag,
+                    last_modified=response.last_modified,
+                    fetched_at=now,
+                )
+            else:
+                feed = Feed(
+                    text=response.text,
+                    digest=digest,
+                    etag=response.etag,
+                    last_modified=response.last_modified,
+                    fetched_at=now,
+                    changed_at=now,
+                )
+        await self._store(key, feed)
+        for listener in self._listeners:
+            try:
+                listener(key, feed)
+            except Exception:
+                logger.exception("Ошибка в слушателе кеша лент")
+        return feed
+
+    def add_listener(self, listener: Callable[[FeedKey, Feed], None]) -> None:
+        """
+        listener(key, feed) вызывается после каждой загрузки или сверки ленты с upstream
+        (в том числе если лента не изменилась). Должен быть быстрым: долгую работу —
+        в отдельную задачу.
+        """
+        self._listeners.append(listener)
+
+    def add_eviction_listener(self, listener: Callable[[FeedKey], None]) -> None:
+        """listener(key) вызывается, когда хранилище вытесняет ленту (истёк срок или не хватило места)."""
+        self._eviction_listeners.append(listener)
+
+    def _on_evict(self, key: FeedKey) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is not None and running is not self._loop:
+            # Вытеснение в потоке хранилища: слушатели работают в цикле событий
+            self._loop.call_soon_threadsafe(self._notify_evicted, key)
+        else:
+            self._notify_evicted(key)
+
+    def _notify_evicted(self, key: FeedKey) -> None:
+        for listener in self._eviction_listeners:
+            try:
+                listener(key)
+            except Exception:
+                logger.exception("Ошибка в слушателе вытеснения кеша лент")
+
+    def close(self) -> None:
+        """Закрытие хранилища."""
+        self._backend.close()
+
+    def stats(self) -> dict[str, int | None]:
+        """Размер кеша (лент и байт, если хранилище в памяти), счётчики попаданий и вытеснений."""
+        return {
+            "size": len(self._backend),
+            "bytes": self._backend.nbytes(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self._backend.evictions,
+        }
@@ -0,0 +1,64 @@
+"""
+Кеш распарсенных календарей.
+"""
+
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from cachetools import TTLCache
+
+from .feeds import Feed
+
+
+class ParsedCalendarCache:
+    """
+    Кеш результатов разбора iCal по ключу (schedule_type, entity_id).
+
+    Хранит подготовленный объект вместе с хешем исходной ленты: если лента под тем же
+    ключом изменилась, запись считается недействительной и собирается заново.
+    Безопасен для вызова из пула потоков; сам разбор выполняется вне блокировки.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Any],
+        maxsize: int = 512,
+        ttl: float = 3600,
+    ) -> None:
+        self._loader = loader
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, feed: Feed) -> Any:
+        """Возвращает разобранный календарь, при необходимости разбирая ленту."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == feed.digest:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        parsed = self._loader(feed.text)
+        with self._lock:
+            self._cache[key] = (feed.digest, parsed)
+        return parsed
+
+    def peek(self, key: Hashable, digest: str) -> Any | None:
+        """Разобранный календарь ленты с хешем digest, если он уже в кеше; иначе None."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == digest:
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаляет запись по ключу."""
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        """Счётчики попаданий и промахов."""
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
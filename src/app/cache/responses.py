@@ -0,0 +1,46 @@
+"""
+Кеш готовых (сериализованных) ответов.
+"""
+
+from collections.abc import Hashable
+
+from cachetools import LRUCache
+
+
+class ResponseCache:
+    """
+    LRU-кеш закодированных JSON-ответов, ограниченный суммарным размером в байтах.
+
+    Ключ должен включать хеш ленты, из которой собран ответ: тогда при изменении
+    ленты старые ответы просто перестают запрашиваться и вытесняются.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._cache: LRUCache = LRUCache(maxsize=max_bytes, getsizeof=len)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> bytes | None:
+        body = self._cache.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    def set(self, key: Hashable, body: bytes) -> None:
+        # Ответ крупнее всего кеша не сохраняем
+        if len(body) <= self.max_bytes:
+            self._cache[key] = body
+
+    def stats(self) -> dict[str, float]:
+        """Число записей, занятые байты, попадания, промахи и доля попаданий."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "bytes": self._cache.currsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
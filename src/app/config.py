@@ -2,6 +2,8 @@
 Конфигурация приложения.
 """
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -12,7 +14,90 @@ class Settings(BaseSettings):
     # и режим reload в uvicorn при локальном запуске через runserver.py
     debug: bool = False
     port: int = 8000
+    # Формат логов: text — строки для человека, json — по объекту JSON на строку
+    log_format: Literal["text", "json"] = "text"
+    # Тела запросов/ответов upstream в логах: off — никогда, truncated — всегда (первые
+    # log_body_limit символов), sampled — каждый log_body_sample_rate-й запрос, debug — при DEBUG
+    log_bodies: Literal["off", "truncated", "sampled", "debug"] = "debug"
+    log_body_limit: int = 1000  # символов
+    log_body_sample_rate: int = 100
+    # Клиент upstream: размер пула соединений, сколько из них держать открытыми между
+    # запросами и сколько секунд; раздельные таймауты; HTTP/2 (нужен пакет h2, иначе HTTP/1.1)
+    upstream_max_connections: int = 100
+    upstream_max_keepalive: int = 20
+    upstream_keepalive_expiry: float = 30.0  # секунд
+    upstream_connect_timeout: float = 5.0  # секунд
+    upstream_read_timeout: float = 15.0  # секунд
+    upstream_pool_timeout: float = 15.0  # секунд
+    upstream_http2: bool = False
+    # Загрузка iCal: после upstream_breaker_failures ошибок подряд запросы к upstream не
+    # отправляются upstream_breaker_reset секунд; ical_deadline — предел ожидания вместе с
+    # повторами (0 — нет); при ical_hedge_quantile > 0 через этот квантиль недавних длительностей
+    # (но не раньше ical_hedge_min_delay) отправляется дублирующий запрос
+    upstream_breaker_failures: int = 5
+    upstream_breaker_reset: float = 30.0  # секунд
+    ical_deadline: float = 20.0  # секунд
+    ical_hedge_quantile: float = 0.0
+    ical_hedge_min_delay: float = 0.5  # секунд
+    # Допуск к upstream: не больше upstream_concurrency одновременных запросов (0 — без предела)
+    # и upstream_rate новых в секунду с запасом upstream_burst (0 — без предела). Остальные ждут
+    # в очереди: сначала запросы пользователей, затем пакетные, затем фоновые. Если в очереди
+    # уже upstream_queue_size запросов или ожидание дольше upstream_queue_timeout — 503
+    upstream_concurrency: int = 32
+    upstream_rate: float = 0.0  # запросов в секунду
+    upstream_burst: int = 20
+    upstream_queue_size: int = 200
+    upstream_queue_timeout: float = 5.0  # секунд
     cache_ttl: int = 3600  # секунд
+    # ttl — после cache_ttl запрос ждёт сверки ленты с upstream; swr — лента отдаётся из кеша
+    # и обновляется в фоне. В обоих режимах ещё cache_stale_ttl секунд устаревшая лента
+    # отдаётся, если upstream недоступен
+    cache_mode: Literal["ttl", "swr"] = "ttl"
+    cache_stale_ttl: int = 86400  # секунд
+    # memory — кеш в памяти процесса (до 512 лент); compressed — в памяти, сжатый и
+    # ограниченный cache_max_bytes байт; sqlite — общий для воркеров файл cache_path,
+    # который переживает перезапуск
+    cache_backend: Literal["memory", "compressed", "sqlite"] = "memory"
+    cache_max_bytes: int = 128 * 1024 * 1024
+    cache_path: str = ".cache/feeds.sqlite3"
+    # Локальный поисковый индекс: полное обновление из upstream раз в search_index_refresh
+    # секунд (0 — только пополнение результатами upstream), по запросу на каждый символ seeds
+    search_index_refresh: int = 21600  # секунд
+    search_index_seeds: str = "абвгдежзийклмнопрстуфхцчшщэюя0123456789"
+    search_index_seed_limit: int = 10000
+    # POST /api/schedule/batch: максимум сущностей в запросе и одновременных загрузок лент
+    batch_max_items: int = 100
+    batch_concurrency: int = 8
+    # Где выполняется разбор iCal: inline — в event loop, thread — в пуле потоков,
+    # process — в пуле процессов; parse_workers — размер пула
+    parse_executor: Literal["inline", "thread", "process"] = "inline"
+    parse_workers: int = 4
+    # Движок разбора iCal: icalendar — icalendar + recurring-ical-events,
+    # fast — построчный парсер FastICalParser (сложные ленты он отдаёт icalendar)
+    ical_parser: Literal["icalendar", "fast"] = "icalendar"
+    # Кеш готовых JSON-ответов /api/schedule: предел суммарного размера в байтах (0 — выключен)
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    # Обратный индекс: расписания преподавателей и аудиторий из загруженных лент групп.
+    # fallback — отдавать их, если upstream недоступен, а ленты в кеше нет; prefer — ещё и
+    # вместо запроса к upstream, когда данные полные (все группы сущности в кеше); off — выключен
+    reverse_index: Literal["off", "fallback", "prefer"] = "fallback"
+    # Поток изменений /api/changes: ленты сущностей с подписчиками сверяются с upstream раз
+    # в changes_interval секунд (0 — только при запросах расписания); без изменений подписчикам раз в changes_heartbeat секунд — пинг
+    changes_interval: int = 300  # секунд
+    changes_heartbeat: float = 15.0  # секунд
+    # Часовой пояс университета: по нему считаются даты учебного календаря (/api/week, week=)
+    academic_timezone: str = "Europe/Moscow"
+    # Фоновый прогрев лент: prefetch_entities ("тип:id" через запятую) и prefetch_top самых
+    # запрашиваемых сущностей — при старте (prefetch_on_startup) и ежедневно в prefetch_at
+    # ("ЧЧ:ММ" через запятую) по часовому поясу prefetch_timezone; не чаще prefetch_rate
+    # запросов в секунду (0 — без предела). Счётчики запросов сохраняются в prefetch_state_path
+    prefetch_entities: str = ""
+    prefetch_top: int = 100
+    prefetch_at: str = "07:30"
+    prefetch_timezone: str = "Europe/Moscow"
+    prefetch_rate: float = 2.0
+    prefetch_on_startup: bool = True
+    prefetch_state_path: str = ".cache/popular.json"
 
     class Config:
         env_file = ".env"
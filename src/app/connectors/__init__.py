@@ -1,3 +1,23 @@
-from .schedule import ScheduleConnector
+from .admission import AdmissionController, Priority, UpstreamOverloadedError, upstream_priority
+from .resilience import (
+    CircuitOpenError,
+    DeadlineExceededError,
+    UpstreamFailedError,
+    UpstreamUnavailableError,
+    is_upstream_failure,
+)
+from .schedule import ICalResponse, ScheduleConnector
 
-__all__ = ["ScheduleConnector"]
+__all__ = [
+    "AdmissionController",
+    "CircuitOpenError",
+    "DeadlineExceededError",
+    "ICalResponse",
+    "Priority",
+    "ScheduleConnector",
+    "UpstreamFailedError",
+    "UpstreamOverloadedError",
+    "UpstreamUnavailableError",
+    "is_upstream_failure",
+    "upstream_priority",
+]
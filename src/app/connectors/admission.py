@@ -0,0 +1,243 @@
+"""
+Допуск запросов к upstream: предел одновременных запросов, скорость и очередь с приоритетами.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+
+from app.metrics import UPSTREAM_QUEUE_WAIT, UPSTREAM_SHED
+
+from .resilience import UpstreamUnavailableError
+
+logger = logging.getLogger("app.connector")
+
+
+class Priority(IntEnum):
+    """Класс запроса к upstream: чем меньше значение, тем раньше он выходит из очереди."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+    BACKGROUND = 2
+
+
+_priority: ContextVar[Priority] = ContextVar("upstream_priority", default=Priority.INTERACTIVE)
+
+
+def current_priority() -> Priority:
+    """Приоритет, с которым сейчас пойдёт запрос к upstream."""
+    shared = _shared.get()
+    return shared.priority if shared is not None else _priority.get()
+
+
+@contextmanager
+def upstream_priority(priority: Priority) -> Iterator[None]:
+    """Запросы к upstream внутри блока (и запущенных из него задач) идут с приоритетом priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class SharedPriority:
+    """
+    Приоритет операции, которую ждут несколько вызовов (SingleFlight). Когда
+    присоединяется более важный вызов, приоритет повышается — вместе с местом
+    её запросов в очереди допуска.
+    """
+
+    def __init__(self, priority: Priority) -> None:
+        self.priority = priority
+        self._waiting: dict[asyncio.Future, AdmissionController] = {}
+
+    @contextmanager
+    def activate(self) -> Iterator[None]:
+        """Запросы к upstream внутри блока (и запущенных из него задач) идут с этим приоритетом."""
+        token = _shared.set(self)
+        try:
+            yield
+        finally:
+            _shared.reset(token)
+
+    def raise_to(self, priority: Priority) -> None:
+        if priority >= self.priority:
+            return
+        self.priority = priority
+        for waiter, controller in list(self._waiting.items()):
+            controller._requeue(waiter, priority)
+
+
+# Приоритет общей операции SingleFlight: если задан, он важнее _priority
+_shared: ContextVar[SharedPriority | None] = ContextVar("upstream_shared_priority", default=None)
+
+
+class UpstreamOverloadedError(UpstreamUnavailableError):
+    """Очередь к upstream переполнена или ожидание в ней слишком долгое: запрос не отправлялся."""
+
+
+class AdmissionController:
+    """
+    Допуск запросов к upstream.
+
+    Одновременно выполняется не больше max_concurrent запросов, новые начинаются
+    не чаще rate в секунду (token bucket с запасом burst; rate=0 — без ограничения).
+    Остальные ждут в очереди по приоритету (Priority), при равном — по порядку.
+    В очереди не больше max_queue запросов: при переполнении новый запрос вытесняет
+    менее важный из очереди или сам получает UpstreamOverloadedError; так же
+    заканчивается ожидание дольше queue_timeout.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        rate: float = 0,
+        burst: int = 20,
+        max_queue: int = 200,
+        queue_timeout: float = 5.0,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        # (приоритет, порядковый номер, future ожидающего)
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str) -> AsyncIterator[None]:
+        """Ждёт допуска к upstream и держит место на время запроса."""
+        started = time.perf_counter()
+        if not self._queue and self._can_start():
+            self._start()
+        else:
+            await self._wait(current_priority(), endpoint)
+        # Пока запрос ждал, его приоритет мог быть повышен (SharedPriority)
+        priority = current_priority()
+        UPSTREAM_QUEUE_WAIT.observe(time.perf_counter() - started, endpoint, priority.name.lower())
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._dispatch()
+
+    def _can_start(self) -> bool:
+        if self.max_concurrent and self._active >= self.max_concurrent:
+            return False
+        if not self.rate:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        return self._tokens >= 1
+
+    def _start(self) -> None:
+        self._active += 1
+        if self.rate:
+            self._tokens -= 1
+
+    async def _wait(self, priority: Priority, endpoint: str) -> None:
+        if len(self._queue) >= self.max_queue:
+            # Вытесняем самый неважный и самый поздний запрос, если он менее важен нового
+            worst = max(self._queue, default=None)
+            if worst is None or worst[0] <= priority:
+                self._shed(endpoint, priority, "очередь переполнена")
+            self._forget(worst[2])
+            worst[2].set_exception(self._overloaded("вытеснен более важным запросом"))
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._order), waiter))
+        shared = _shared.get()
+        if shared is not None:
+            shared._waiting[waiter] = self
+        self._dispatch()
+        try:
+            async with asyncio.timeout(self.queue_timeout or None):
+                await waiter
+        except TimeoutError:
+            if self._granted(waiter):
+                # Место выдано в тот же момент, когда истекло ожидание
+                return
+            self._forget(waiter)
+            self._shed(endpoint, priority, f"нет места дольше {self.queue_timeout:g} с")
+        except UpstreamOverloadedError as e:
+            UPSTREAM_SHED.inc(endpoint, priority.name.lower())
+            logger.warning("Запрос к upstream %s отклонён: %s", endpoint, e)
+            raise
+        except asyncio.CancelledError:
+            if self._granted(waiter):
+                # Место уже выдано, но запрос отменён — возвращаем его
+                self._active -= 1
+                self._dispatch()
+            else:
+                self._forget(waiter)
+            raise
+        finally:
+            if shared is not None:
+                shared._waiting.pop(waiter, None)
+
+    @staticmethod
+    def _granted(waiter: asyncio.Future) -> bool:
+        return waiter.done() and not waiter.cancelled() and waiter.exception() is None
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+        heapq.heapify(self._queue)
+
+    def _requeue(self, waiter: asyncio.Future, priority: Priority) -> None:
+        """Переставляет ожидающий запрос в очереди с новым приоритетом."""
+        self._queue = [
+            (int(priority), order, w) if w is waiter else (p, order, w) for p, order, w in self._queue
+        ]
+        heapq.heapify(self._queue)
+
+    def _dispatch(self) -> None:
+        """Выпускает из очереди столько запросов, сколько позволяют пределы."""
+        while self._queue and self._can_start():
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+            self._start()
+            waiter.set_result(None)
+        if self._queue and self.rate and self._wakeup is None and (
+            not self.max_concurrent or self._active < self.max_concurrent
+        ):
+            # Упёрлись в скорость: разбудим очередь, когда накопится токен
+            delay = (1 - self._tokens) / self.rate
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    def _overloaded(self, reason: str) -> UpstreamOverloadedError:
+        return UpstreamOverloadedError(
+            f"Upstream перегружен ({reason}), повторите позже",
+            retry_after=max(1.0, self.queue_timeout),
+        )
+
+    def _shed(self, endpoint: str, priority: Priority, reason: str) -> None:
+        UPSTREAM_SHED.inc(endpoint, priority.name.lower())
+        logger.warning("Запрос к upstream %s отклонён: %s", endpoint, reason)
+        raise self._overloaded(reason)
+
+    def stats(self) -> dict[str, int]:
+        return {"active": self._active, "queued": len(self._queue)}
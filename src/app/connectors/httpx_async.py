@@ -3,14 +3,20 @@
 """
 
 import asyncio
-import json
+import importlib.util
+import itertools
 import logging
 import time
+from contextlib import AbstractAsyncContextManager, nullcontext
 from typing import Any
 
 import httpx
 
+from app.metrics import UPSTREAM_DURATION, UPSTREAM_POOL_WAIT, UPSTREAM_RETRIES
+
+from .admission import AdmissionController
 from .base_connectors import AbstractAsyncConnector
+from .resilience import UpstreamUnavailableError
 
 logger = logging.getLogger("app.connector")
 
@@ -19,15 +25,27 @@ class HTTPXAsyncConnector(AbstractAsyncConnector[httpx.AsyncClient]):
     """
     Асинхронный коннектор с использованием httpx.AsyncClient.
     Retry с экспоненциальной задержкой, разделение 4xx/5xx.
+
+    Каждый ответ — одна строка лога с полями в extra (method, url, status, duration_ms).
+    Тела запросов и ответов пишутся по политике log_bodies:
+    off — никогда, truncated — всегда (первые log_body_limit символов),
+    sampled — у каждого log_body_sample_rate-го запроса, debug — только при уровне DEBUG.
+    Если задан admission, каждая попытка сначала получает у него допуск к upstream.
     """
 
     def __init__(
         self,
         max_retries: int = 3,
         retry_delay: float = 1.0,
-        timeout: float = 30.0,
+        timeout: float | httpx.Timeout = 30.0,
         base_url: str | None = None,
         default_headers: dict[str, str] | None = None,
+        limits: httpx.Limits | None = None,
+        http2: bool = False,
+        log_bodies: str = "debug",
+        log_body_limit: int = 1000,
+        log_body_sample_rate: int = 100,
+        admission: AdmissionController | None = None,
     ) -> None:
         super().__init__(max_retries=max_retries, retry_delay=retry_delay)
         if hasattr(self, "_httpx_initialized"):
@@ -36,81 +54,160 @@ class HTTPXAsyncConnector(AbstractAsyncConnector[httpx.AsyncClient]):
         self.timeout = timeout
         self.base_url = base_url
         self.default_headers = default_headers or {}
+        self.log_bodies = log_bodies
+        self.log_body_limit = log_body_limit
+        self.log_body_sample_rate = max(1, log_body_sample_rate)
+        self._requests_seen = itertools.count()
+        self.admission = admission
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 включён, но пакет h2 не установлен — используется HTTP/1.1")
+            http2 = False
+        self.http2 = http2
         self._client = httpx.AsyncClient(
-            timeout=httpx.Timeout(self.timeout),
+            timeout=self.timeout if isinstance(self.timeout, httpx.Timeout) else httpx.Timeout(self.timeout),
+            limits=limits or httpx.Limits(),
+            http2=http2,
             base_url=self.base_url,
             headers=self.default_headers,
             verify=True,
         )
 
-    async def request(self, method: str, url: str, **kwargs: Any) -> dict[str, Any]:
+    @staticmethod
+    def pool_wait_trace(endpoint: str) -> dict[str, Any]:
+        """
+        extensions для запроса httpx, замеряющие ожидание соединения в пуле:
+        время до первого события httpcore (подключения или отправки заголовков
+        по уже открытому соединению).
         """
-        Асинхронный HTTP запрос с retry логикой и детальным логированием.
+        started = time.perf_counter()
+        waiting = True
+
+        async def trace(event_name: str, info: dict[str, Any]) -> None:
+            nonlocal waiting
+            if waiting and event_name.endswith(".started"):
+                waiting = False
+                UPSTREAM_POOL_WAIT.observe(time.perf_counter() - started, endpoint)
+
+        return {"trace": trace}
+
+    def _admit(self, endpoint: str) -> AbstractAsyncContextManager[None]:
+        """Допуск попытки к upstream (без admission — сразу)."""
+        if self.admission is None:
+            return nullcontext()
+        return self.admission.slot(endpoint)
+
+    def _body_log_level(self) -> int | None:
+        """Уровень, с которым писать тела текущего запроса, или None — не писать."""
+        match self.log_bodies:
+            case "truncated":
+                return logging.INFO
+            case "sampled":
+                if next(self._requests_seen) % self.log_body_sample_rate == 0:
+                    return logging.INFO
+            case "debug":
+                if logger.isEnabledFor(logging.DEBUG):
+                    return logging.DEBUG
+        return None
+
+    async def request(
+        self, method: str, url: str, endpoint: str | None = None, **kwargs: Any
+    ) -> dict[str, Any]:
+        """
+        Асинхронный HTTP запрос с retry логикой.
 
         Retry при 5xx и сетевых ошибках.
         4xx — сразу raise без retry.
         Экспоненциальная задержка: retry_delay * (2 ** attempt).
+        endpoint — метка запроса в метриках и логах (по умолчанию URL без query).
         """
         last_exception: Exception | None = None
+        endpoint = endpoint or url.split("?", 1)[0]
+        body_level = self._body_log_level()
 
-        full_url = f"{self.base_url}{url}" if self.base_url and not url.startswith("http") else url
-        logger.info(f">>> REQUEST: {method} {full_url}")
-
-        if "params" in kwargs:
-            logger.info(f"    Query params: {kwargs['params']}")
+        logger.debug(">>> REQUEST: %s %s params=%s", method, url, kwargs.get("params"))
+        if body_level is not None and "json" in kwargs:
+            logger.log(body_level, "    Request Body: %.*s", self.log_body_limit, kwargs["json"])
 
-        if "json" in kwargs:
-            try:
-                formatted_json = json.dumps(kwargs["json"], indent=2, ensure_ascii=False)
-                logger.info(f"    Request Body:\n{formatted_json}")
-            except Exception:
-                logger.info(f"    Request Body: {kwargs['json']}")
-
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         for attempt in range(self.max_retries):
+            attempt_start = time.perf_counter()
             try:
-                response = await self._client.request(method, url, **kwargs)
-                duration = (time.time() - start_time) * 1000
-
-                logger.info(f"<<< RESPONSE: {response.status_code} | {duration:.2f}ms | {method} {full_url}")
-
-                try:
-                    response_data = response.json()
-                    formatted_response = json.dumps(response_data, indent=2, ensure_ascii=False)
-                    if len(formatted_response) > 1000:
-                        formatted_response = formatted_response[:1000] + "...(truncated)"
-                    logger.info(f"    Response Body:\n{formatted_response}")
-                except Exception:
-                    logger.info(f"    Response Body: {response.text[:500]}")
+                async with self._admit(endpoint):
+                    response = await self._client.request(
+                        method, url, extensions=self.pool_wait_trace(endpoint), **kwargs
+                    )
+                now = time.perf_counter()
+                UPSTREAM_DURATION.observe(now - attempt_start, endpoint, str(response.status_code))
+                logger.info(
+                    "<<< RESPONSE: %s | %.2fms | %s %s",
+                    response.status_code,
+                    (now - start_time) * 1000,
+                    method,
+                    url,
+                    extra={
+                        "endpoint": endpoint,
+                        "method": method,
+                        "url": url,
+                        "status": response.status_code,
+                        "duration_ms": round((now - start_time) * 1000, 2),
+                        "attempt": attempt + 1,
+                    },
+                )
+                if body_level is not None:
+                    logger.log(body_level, "    Response Body: %.*s", self.log_body_limit, response.text)
 
                 response.raise_for_status()
                 return response.json()
 
             except httpx.HTTPStatusError as e:
-                duration = (time.time() - start_time) * 1000
-                logger.error(f"<<< ERROR: {e.response.status_code} | {duration:.2f}ms | {method} {full_url}")
-                logger.error(f"    Error response: {e.response.text[:500]}")
+                logger.error(
+                    "<<< ERROR: %s | %.2fms | %s %s | %.500s",
+                    e.response.status_code,
+                    (time.perf_counter() - start_time) * 1000,
+                    method,
+                    url,
+                    e.response.text,
+                )
 
                 if 400 <= e.response.status_code < 500:
                     raise
                 last_exception = e
 
             except (httpx.RequestError, httpx.TimeoutException) as e:
-                duration = (time.time() - start_time) * 1000
-                logger.error(f"<<< CONNECTION ERROR: {type(e).__name__} | {duration:.2f}ms | {method} {full_url}")
-                logger.error(f"    Error: {str(e)}")
+                now = time.perf_counter()
+                UPSTREAM_DURATION.observe(now - attempt_start, endpoint, type(e).__name__)
+                logger.error(
+                    "<<< CONNECTION ERROR: %s | %.2fms | %s %s | %s",
+                    type(e).__name__,
+                    (now - start_time) * 1000,
+                    method,
+                    url,
+                    e,
+                )
                 last_exception = e
 
+            except UpstreamUnavailableError:
+                # Запрос не отправлялся (например, очередь к upstream переполнена)
+                raise
+
             except Exception as e:
-                duration = (time.time() - start_time) * 1000
-                logger.error(f"<<< UNEXPECTED ERROR: {type(e).__name__} | {duration:.2f}ms | {method} {full_url}")
-                logger.error(f"    Error: {str(e)}")
+                logger.error(
+                    "<<< UNEXPECTED ERROR: %s | %.2fms | %s %s | %s",
+                    type(e).__name__,
+                    (time.perf_counter() - start_time) * 1000,
+                    method,
+                    url,
+                    e,
+                )
                 last_exception = e
 
             if attempt < self.max_retries - 1:
                 delay = self.retry_delay * (2 ** attempt)
-                logger.warning(f"    Retrying in {delay:.1f}s... (attempt {attempt + 1}/{self.max_retries})")
+                UPSTREAM_RETRIES.inc(endpoint)
+                logger.warning(
+                    "    Retrying in %.1fs... (attempt %d/%d)", delay, attempt + 1, self.max_retries
+                )
                 await asyncio.sleep(delay)
 
         raise last_exception or Exception("Request failed after all retries")
@@ -0,0 +1,280 @@
+"""
+Устойчивость запросов к upstream: предохранитель, дублирующие запросы и бюджет времени.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TypeVar
+
+import httpx
+
+from app.metrics import UPSTREAM_BREAKER_OPENED, UPSTREAM_HEDGES, UPSTREAM_RETRIES
+
+logger = logging.getLogger("app.connector")
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Upstream сейчас не может ответить. retry_after — через сколько секунд
+    имеет смысл повторить запрос (None — неизвестно).
+    """
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Предохранитель разомкнут: запрос к upstream не отправлялся."""
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    """Запрос не уложился в бюджет времени (вместе с повторами)."""
+
+
+class UpstreamFailedError(UpstreamUnavailableError):
+    """Upstream отвечал 5xx или был недоступен по сети во всех попытках."""
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Ошибка говорит о проблемах upstream: 5xx, таймаут или сетевой сбой (но не 4xx)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class _Attempts:
+    """Попытки текущего вызова ResilientCall, которые дошли до upstream и ещё не завершились."""
+
+    __slots__ = ("sent",)
+
+    def __init__(self) -> None:
+        self.sent = 0
+
+
+_attempts: ContextVar[_Attempts | None] = ContextVar("upstream_attempts", default=None)
+
+
+@contextmanager
+def sent_upstream() -> Iterator[None]:
+    """
+    Отметка для ResilientCall: запрос допущен и отправлен в upstream. Если бюджет
+    времени истёк, пока таких запросов нет (все ждут допуска), это не неудача upstream.
+    Отменённые запросы не вычитаются: их отменил именно истёкший бюджет.
+    """
+    attempts = _attempts.get()
+    if attempts is None:
+        yield
+        return
+    attempts.sent += 1
+    try:
+        yield
+    except asyncio.CancelledError:
+        raise
+    except BaseException:
+        attempts.sent -= 1
+        raise
+    else:
+        attempts.sent -= 1
+
+
+class CircuitBreaker:
+    """
+    Предохранитель: после failure_threshold неудач подряд запросы отклоняются
+    сразу (CircuitOpenError) в течение reset_timeout секунд. Затем пропускается
+    один пробный запрос: успех замыкает цепь, неудача размыкает её снова.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def retry_after(self) -> float:
+        """Через сколько секунд цепь снова пропустит запрос (0 — пропускает сейчас)."""
+        if self.state != "open":
+            return 0.0
+        return self.reset_timeout - (time.monotonic() - self._opened_at)
+
+    def before_call(self) -> None:
+        """Проверка перед запросом; при разомкнутой цепи — CircuitOpenError."""
+        match self.state:
+            case "open":
+                raise CircuitOpenError(
+                    f"Upstream {self.name} недоступен, повторите позже", retry_after=self.retry_after()
+                )
+            case "half-open":
+                if self._probing:
+                    raise CircuitOpenError(
+                        f"Upstream {self.name} недоступен, идёт проверка", retry_after=1.0
+                    )
+                self._probing = True
+
+    def abandon(self) -> None:
+        """Запрос отменён, не дойдя до результата: пробный запрос можно повторить."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                logger.warning("Предохранитель %s разомкнут после %d ошибок", self.name, self._failures)
+                UPSTREAM_BREAKER_OPENED.inc(self.name)
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyTracker:
+    """Скользящее окно длительностей успешных запросов для порога дублирования."""
+
+    MIN_SAMPLES = 20
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        if len(self._samples) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCall:
+    """
+    Обёртка запроса к одному эндпоинту upstream:
+    - предохранитель CircuitBreaker;
+    - повторы при 5xx и сетевых ошибках с экспоненциальной задержкой;
+    - дублирующий запрос (hedging), если ответа нет дольше квантиля hedge_quantile
+      недавних длительностей (но не раньше hedge_min_delay); 0 — выключено;
+    - общий бюджет deadline секунд на все попытки (0 — без ограничения); неудачей
+      upstream его исчерпание считается, только если запрос был отправлен (sent_upstream),
+      а не ждал допуска в очереди.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        deadline: float = 0,
+        hedge_quantile: float = 0,
+        hedge_min_delay: float = 0.5,
+    ) -> None:
+        self.name = name
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.deadline = deadline
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.deadline:
+            return await self._with_retries(fn)
+        attempts = _Attempts()
+        token = _attempts.set(attempts)
+        try:
+            async with asyncio.timeout(self.deadline):
+                return await self._with_retries(fn)
+        except TimeoutError:
+            if attempts.sent:
+                self.breaker.record_failure()
+            raise DeadlineExceededError(
+                f"Upstream {self.name} не ответил за {self.deadline:g} с"
+            ) from None
+        finally:
+            _attempts.reset(token)
+
+    async def _with_retries(self, fn: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = await self._attempt(fn)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except UpstreamUnavailableError:
+                # Запрос не дошёл до upstream (не допущен): о его состоянии ничего не известно
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                if not is_upstream_failure(e):
+                    # 4xx и прочее — upstream жив, повторять бессмысленно
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                UPSTREAM_RETRIES.inc(self.name)
+                logger.warning(
+                    "    %s: %r, повтор через %.1fs (попытка %d/%d)",
+                    self.name, e, delay, attempt, self.max_retries,
+                )
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        threshold = self.latency.quantile(self.hedge_quantile) if self.hedge_quantile else None
+        if threshold is None:
+            return await self._timed(fn)
+        return await self._hedged(fn, max(threshold, self.hedge_min_delay))
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        started = time.perf_counter()
+        result = await fn()
+        self.latency.record(time.perf_counter() - started)
+        return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]], delay: float) -> T:
+        """Второй такой же запрос через delay секунд; побеждает первый успешный."""
+        tasks = {asyncio.ensure_future(self._timed(fn))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                UPSTREAM_HEDGES.inc(self.name)
+                tasks.add(asyncio.ensure_future(self._timed(fn)))
+            error: BaseException | None = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
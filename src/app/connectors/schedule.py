@@ -2,32 +2,196 @@
 Коннектор к schedule-of.mirea.ru.
 """
 
+import time
+from dataclasses import dataclass
 from typing import Any
 
+import httpx
+
+from app.config import settings
+from app.metrics import UPSTREAM_DURATION, registry
+
+from .admission import AdmissionController
 from .httpx_async import HTTPXAsyncConnector
+from .resilience import (
+    CircuitBreaker,
+    ResilientCall,
+    UpstreamFailedError,
+    is_upstream_failure,
+    sent_upstream,
+)
+from .singleflight import SingleFlight
+
+
+@dataclass(slots=True)
+class ICalResponse:
+    """Ответ upstream на запрос iCal (возможно, условный)."""
+    text: str | None
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def not_modified(self) -> bool:
+        """Upstream ответил 304 — лента не изменилась."""
+        return self.text is None
 
 
 class ScheduleConnector(HTTPXAsyncConnector):
-    """Коннектор к schedule-of.mirea.ru."""
+    """
+    Коннектор к schedule-of.mirea.ru.
+    Одновременные одинаковые запросы склеиваются в один запрос к upstream.
+    Загрузка iCal идёт через ResilientCall: повторы, предохранитель, бюджет времени
+    и (по настройке) дублирующие запросы. Все запросы к upstream проходят общий
+    AdmissionController: предел одновременных запросов, скорость и очередь по приоритету.
+    """
 
     BASE_URL = "https://schedule-of.mirea.ru"
 
     def __init__(self) -> None:
-        super().__init__(base_url=self.BASE_URL, timeout=15.0)
+        # Экземпляр один на процесс: клиент, допуск и таймауты создаются при первом вызове
+        if hasattr(self, "_schedule_initialized"):
+            return
+        super().__init__(
+            base_url=self.BASE_URL,
+            timeout=httpx.Timeout(
+                settings.upstream_read_timeout,
+                connect=settings.upstream_connect_timeout,
+                pool=settings.upstream_pool_timeout,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.upstream_max_connections,
+                max_keepalive_connections=settings.upstream_max_keepalive,
+                keepalive_expiry=settings.upstream_keepalive_expiry,
+            ),
+            http2=settings.upstream_http2,
+            log_bodies=settings.log_bodies,
+            log_body_limit=settings.log_body_limit,
+            log_body_sample_rate=settings.log_body_sample_rate,
+            admission=AdmissionController(
+                max_concurrent=settings.upstream_concurrency,
+                rate=settings.upstream_rate,
+                burst=settings.upstream_burst,
+                max_queue=settings.upstream_queue_size,
+                queue_timeout=settings.upstream_queue_timeout,
+            ),
+        )
+        self._schedule_initialized = True
+        self._flight = SingleFlight()
+        self._ical_breaker = CircuitBreaker(
+            "ical",
+            failure_threshold=settings.upstream_breaker_failures,
+            reset_timeout=settings.upstream_breaker_reset,
+        )
+        self._ical_call = ResilientCall(
+            "ical",
+            self._ical_breaker,
+            max_retries=self.max_retries,
+            retry_delay=self.retry_delay,
+            deadline=settings.ical_deadline,
+            hedge_quantile=settings.ical_hedge_quantile,
+            hedge_min_delay=settings.ical_hedge_min_delay,
+        )
+        registry.callback(
+            "schedule_upstream_breaker_open",
+            "Предохранитель upstream разомкнут (1) или нет (0)",
+            "gauge",
+            lambda: {("ical",): int(self._ical_breaker.state != "closed")},
+            ("endpoint",),
+        )
+        registry.callback(
+            "schedule_upstream_requests",
+            "Запросы к upstream: active — выполняются, queued — ждут допуска",
+            "gauge",
+            lambda: {(state,): value for state, value in self.admission.stats().items()},
+            ("state",),
+        )
 
     async def search(self, query: str, limit: int = 100) -> dict[str, Any]:
         """Поиск групп, преподавателей, кабинетов."""
-        return await self.get("/schedule/api/search", params={"match": query, "limit": limit})
+        return await self._flight.do(
+            ("search", query, limit),
+            lambda: self.get(
+                "/schedule/api/search",
+                params={"match": query, "limit": limit},
+                endpoint="search",
+            ),
+        )
 
     async def get_ical(self, schedule_type: int, entity_id: int) -> str:
         """Возвращает сырой iCal текст."""
-        response = await self._client.get(
-            f"/schedule/api/ical/{schedule_type}/{entity_id}",
-            params={"includeMeta": "true"},
-        )
-        response.raise_for_status()
+        response = await self.get_ical_conditional(schedule_type, entity_id)
         return response.text
 
+    async def get_ical_conditional(
+        self,
+        schedule_type: int,
+        entity_id: int,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> ICalResponse:
+        """
+        Запрос iCal с валидаторами If-None-Match / If-Modified-Since.
+        Если лента не изменилась, возвращает ICalResponse с text=None.
+        При разомкнутом предохранителе, исчерпанном бюджете времени или 5xx/сетевой
+        ошибке во всех попытках — CircuitOpenError / DeadlineExceededError /
+        UpstreamFailedError (UpstreamUnavailableError).
+        """
+        try:
+            return await self._flight.do(
+                ("ical", schedule_type, entity_id, etag, last_modified),
+                lambda: self._ical_call.call(
+                    lambda: self._fetch_ical(schedule_type, entity_id, etag, last_modified)
+                ),
+            )
+        except Exception as e:
+            if not is_upstream_failure(e):
+                raise
+            raise UpstreamFailedError(
+                f"Upstream ical недоступен: {type(e).__name__}",
+                retry_after=max(self.retry_delay, self._ical_breaker.retry_after()),
+            ) from e
+
+    async def _fetch_ical(
+        self,
+        schedule_type: int,
+        entity_id: int,
+        etag: str | None,
+        last_modified: str | None,
+    ) -> ICalResponse:
+        headers: dict[str, str] = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+        async with self._admit("ical"):
+            started = time.perf_counter()
+            try:
+                with sent_upstream():
+                    response = await self._client.get(
+                        f"/schedule/api/ical/{schedule_type}/{entity_id}",
+                        params={"includeMeta": "true"},
+                        headers=headers,
+                        extensions=self.pool_wait_trace("ical"),
+                    )
+            except httpx.HTTPError as e:
+                UPSTREAM_DURATION.observe(time.perf_counter() - started, "ical", type(e).__name__)
+                raise
+        UPSTREAM_DURATION.observe(time.perf_counter() - started, "ical", str(response.status_code))
+        if response.status_code == 304 and headers:
+            return ICalResponse(text=None, etag=etag, last_modified=last_modified)
+        response.raise_for_status()
+        return ICalResponse(
+            text=response.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
     async def get_week_number(self) -> dict[str, Any]:
         """Возвращает номер текущей учебной недели."""
-        return await self.get("/schedule/api/weeknumber/receiver/attendance_high_school")
+        return await self._flight.do(
+            ("week",),
+            lambda: self.get(
+                "/schedule/api/weeknumber/receiver/attendance_high_school",
+                endpoint="week",
+            ),
+        )
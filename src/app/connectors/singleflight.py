@@ -0,0 +1,46 @@
+"""
+Склейка одновременных одинаковых запросов (single-flight).
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from .admission import SharedPriority, current_priority
+
+
+class SingleFlight:
+    """
+    Одновременные вызовы с одинаковым ключом ждут одну и ту же операцию.
+
+    Операция запускается отдельной задачей и защищена от отмены: если один из
+    ожидающих отменён, остальные всё равно получат результат. Её запросы к upstream
+    идут с приоритетом самого важного из ожидающих (SharedPriority).
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, tuple[asyncio.Task, SharedPriority]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполняет fn() или присоединяется к уже выполняющемуся вызову с тем же ключом."""
+        flight = self._inflight.get(key)
+        if flight is None:
+            priority = SharedPriority(current_priority())
+            with priority.activate():
+                task = asyncio.ensure_future(fn())
+            flight = self._inflight[key] = (task, priority)
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            flight[1].raise_to(current_priority())
+        return await asyncio.shield(flight[0])
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        flight = self._inflight.get(key)
+        if flight is not None and flight[0] is task:
+            del self._inflight[key]
+        # Помечаем исключение как полученное, даже если все ожидающие отменены
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,51 @@
+"""
+Заголовки ответов с расписанием: валидаторы для условных запросов и пометка устаревшего кеша.
+"""
+
+import hashlib
+from datetime import date, datetime, time
+from email.utils import formatdate, parsedate_to_datetime
+
+from app.cache import Feed
+from app.state import feed_cache
+
+
+def feed_headers(feed: Feed) -> dict[str, str]:
+    """Заголовки, сообщающие клиенту, что расписание отдано из устаревшего кеша."""
+    if not feed_cache.is_stale(feed):
+        return {}
+    return {"X-Schedule-Stale": "true", "Age": str(int(feed.age()))}
+
+
+def validators(feed: Feed, variant: tuple, relative: bool = False) -> dict[str, str]:
+    """
+    Сильный ETag по содержимому ленты и параметрам ответа, Last-Modified — по изменению ленты.
+    relative — период ответа зависит от текущей даты (по умолчанию «сегодня», week=): тогда
+    Last-Modified не раньше начала суток, и вчерашний If-Modified-Since не даёт 304.
+    """
+    source = "|".join(map(str, (feed.digest, *variant)))
+    modified = feed.changed_at
+    if relative:
+        modified = max(modified, datetime.combine(date.today(), time.min).timestamp())
+    return {
+        "ETag": f'"{hashlib.sha1(source.encode("utf-8")).hexdigest()}"',
+        "Last-Modified": formatdate(modified, usegmt=True),
+    }
+
+
+def not_modified(
+    validators: dict[str, str],
+    if_none_match: str | None,
+    if_modified_since: str | None,
+) -> bool:
+    """Условный запрос клиента: If-None-Match приоритетнее If-Modified-Since (RFC 9110)."""
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or validators["ETag"] in tags
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(validators["Last-Modified"]).timestamp() <= since
+    return False
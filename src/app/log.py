@@ -0,0 +1,46 @@
+"""
+Настройка логирования приложения.
+"""
+
+import json
+import logging
+import time
+
+from litestar.logging import LoggingConfig
+
+# Атрибуты, которые есть у любой LogRecord; всё остальное пришло через extra=
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — один JSON-объект: время, уровень, логгер, сообщение и поля из extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def logging_config(debug: bool, log_format: str) -> LoggingConfig:
+    """
+    Конфигурация логирования Litestar: формат text/json и уровень корневого логгера.
+    Записи форматируются и выводятся в отдельном потоке (очередь Litestar), а не в event loop.
+    """
+    if log_format == "json":
+        formatter: dict = {"()": JsonFormatter}
+    else:
+        formatter = {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"}
+    return LoggingConfig(
+        formatters={"standard": formatter},
+        root={"handlers": ["queue_listener"], "level": "DEBUG" if debug else "INFO"},
+    )
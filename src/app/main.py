@@ -2,33 +2,91 @@
 Точка входа Litestar-приложения.
 """
 
-import logging
-from contextlib import asynccontextmanager
+import asyncio
+import math
+from contextlib import asynccontextmanager, suppress
 from collections.abc import AsyncGenerator
 from typing import Any
 
-from litestar import Litestar
+from litestar import Litestar, MediaType, Request, Response
 from litestar.openapi import OpenAPIConfig
 
 from app.config import settings
-from app.connectors import ScheduleConnector
-from app.routers import get_schedule, get_schedule_by_name, get_week, search
-
-logging.basicConfig(
-    level=logging.DEBUG if settings.debug else logging.INFO,
-    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+from app.connectors import ScheduleConnector, UpstreamUnavailableError
+from app.log import logging_config
+from app.routers import (
+    get_changes,
+    get_ical,
+    get_free_rooms,
+    get_free_slots,
+    get_schedule,
+    get_schedule_batch,
+    get_schedule_by_name,
+    get_week,
+    metrics,
+    search,
 )
+from app.services import parse_times, search_index
+from app.state import change_feed, feed_cache, parse_executor, prefetcher
 
 
 @asynccontextmanager
 async def lifespan(app: Litestar) -> AsyncGenerator[None, None]:
+    tasks: list[asyncio.Task] = []
+    if settings.search_index_refresh > 0:
+        tasks.append(asyncio.create_task(search_index.run_refresh_loop(
+            settings.search_index_seeds,
+            settings.search_index_seed_limit,
+            settings.search_index_refresh,
+        )))
+    if prefetcher.enabled:
+        tasks.append(asyncio.create_task(prefetcher.run_forever(
+            parse_times(settings.prefetch_at),
+            settings.prefetch_timezone,
+            settings.prefetch_on_startup,
+        )))
+    if settings.changes_interval > 0:
+        tasks.append(asyncio.create_task(change_feed.run_forever(settings.changes_interval)))
     yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    prefetcher.save_state()
     await ScheduleConnector().shutdown()
+    parse_executor.shutdown()
+    feed_cache.close()
+
+
+def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailableError) -> Response:
+    """503 с Retry-After, если upstream недоступен и отдать из кеша нечего."""
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return Response(
+        {"status_code": 503, "detail": str(exc)},
+        status_code=503,
+        media_type=MediaType.JSON,
+        headers=headers,
+    )
 
 
 app = Litestar(
-    route_handlers=[search, get_schedule, get_schedule_by_name, get_week],
+    route_handlers=[
+        search,
+        get_schedule,
+        get_schedule_batch,
+        get_schedule_by_name,
+        get_week,
+        get_free_rooms,
+        get_free_slots,
+        get_changes,
+        get_ical,
+        metrics,
+    ],
     lifespan=[lifespan],
+    exception_handlers={UpstreamUnavailableError: upstream_unavailable_handler},
+    logging_config=logging_config(settings.debug, settings.log_format),
     openapi_config=OpenAPIConfig(
         title=settings.app_title,
         version=settings.app_version,
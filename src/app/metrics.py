@@ -0,0 +1,240 @@
+"""
+Метрики приложения в текстовом формате Prometheus.
+
+Собственный минимальный реестр без внешних зависимостей: счётчики, гистограммы
+и метрики-функции, значения которых снимаются в момент запроса /metrics
+(размеры и счётчики кешей). Метрики обновляются из потока event loop.
+"""
+
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels → (счётчики по корзинам, сумма, количество)
+        self._values: dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            entry[0][index] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(float(bound))}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {count}"
+            plain = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{plain} {_format_value(total)}"
+            yield f"{self.name}_count{plain} {count}"
+
+
+class CallbackMetric(Metric):
+    """Метрика, значения которой вычисляет функция при каждом снятии."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        collect: Callable[[], dict[Labels, float]],
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._collect().items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    """Набор метрик, отдаваемых эндпоинтом /metrics."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        **kwargs,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        collect: Callable[[], dict[Labels, float]],
+        labelnames: tuple[str, ...] = (),
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, kind, collect, labelnames))
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+registry = Registry()
+
+UPSTREAM_DURATION = registry.histogram(
+    "schedule_upstream_request_duration_seconds",
+    "Длительность запросов к upstream (каждая попытка отдельно)",
+    ("endpoint", "status"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30),
+)
+UPSTREAM_POOL_WAIT = registry.histogram(
+    "schedule_upstream_pool_wait_seconds",
+    "Ожидание свободного соединения в пуле httpx перед запросом к upstream",
+    ("endpoint",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+UPSTREAM_RETRIES = registry.counter(
+    "schedule_upstream_retries_total",
+    "Повторные попытки запросов к upstream",
+    ("endpoint",),
+)
+UPSTREAM_HEDGES = registry.counter(
+    "schedule_upstream_hedged_requests_total",
+    "Дублирующие запросы к upstream, отправленные из-за медленного ответа",
+    ("endpoint",),
+)
+UPSTREAM_BREAKER_OPENED = registry.counter(
+    "schedule_upstream_breaker_opened_total",
+    "Размыкания предохранителя upstream",
+    ("endpoint",),
+)
+UPSTREAM_QUEUE_WAIT = registry.histogram(
+    "schedule_upstream_queue_wait_seconds",
+    "Ожидание допуска к upstream (предел одновременных запросов и скорости)",
+    ("endpoint", "priority"),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+UPSTREAM_SHED = registry.counter(
+    "schedule_upstream_shed_total",
+    "Запросы к upstream, отклонённые из-за переполненной очереди или долгого ожидания",
+    ("endpoint", "priority"),
+)
+STAGE_DURATION = registry.histogram(
+    "schedule_response_stage_duration_seconds",
+    "Длительность этапов ответа: fetch — лента из кеша/upstream, parse — выборка занятий, serialize — JSON",
+    ("endpoint", "stage"),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+RESPONSE_SIZE = registry.histogram(
+    "schedule_response_size_bytes",
+    "Размер тела ответа с расписанием",
+    ("endpoint",),
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+
+
+class ServerTiming:
+    """
+    Замеры этапов одного ответа: заголовок Server-Timing и гистограмма STAGE_DURATION.
+    """
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self._entries: list[str] = []
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            STAGE_DURATION.observe(elapsed, self.endpoint, stage)
+            self._entries.append(f"{stage};dur={elapsed * 1000:.2f}")
+
+    def mark(self, name: str, description: str) -> None:
+        """Метка без длительности, например cache;desc="hit"."""
+        self._entries.append(f'{name};desc="{description}"')
+
+    def header(self) -> dict[str, str]:
+        return {"Server-Timing": ", ".join(self._entries)} if self._entries else {}
@@ -1,3 +1,19 @@
+from .executor import ParseExecutor
+from .fast import FastICalParser
 from .ical import ICalParser
+from .ical_filter import ICalFilter, filter_ical
+from .index import OccurrenceIndex, semester_bounds
+from .records import LessonRecord, encode_lesson, encode_lessons
 
-__all__ = ["ICalParser"]
+__all__ = [
+    "FastICalParser",
+    "ICalFilter",
+    "ICalParser",
+    "LessonRecord",
+    "OccurrenceIndex",
+    "ParseExecutor",
+    "encode_lesson",
+    "encode_lessons",
+    "filter_ical",
+    "semester_bounds",
+]
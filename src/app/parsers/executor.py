@@ -0,0 +1,178 @@
+"""
+Выполнение разбора iCal вне event loop.
+"""
+
+import asyncio
+import math
+import sys
+from collections.abc import AsyncIterator, Hashable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from typing import Any
+
+from app.cache import Feed, ParsedCalendarCache
+
+from .ical import ICalParser
+from .index import OccurrenceIndex, semester_periods
+from .records import LessonRecord, details_to_row, lesson_details
+
+# Занятие в виде кортежа примитивов — так результат дёшево передаётся между процессами
+LessonRow = tuple[Any, ...]
+
+
+def lesson_to_row(lesson: LessonRecord) -> LessonRow:
+    return (
+        lesson.date.toordinal(),
+        lesson.time_start,
+        lesson.time_end,
+        details_to_row(lesson.details),
+    )
+
+
+def lesson_from_row(row: LessonRow) -> LessonRecord:
+    return LessonRecord(
+        date=date.fromordinal(row[0]),
+        time_start=sys.intern(row[1]),
+        time_end=sys.intern(row[2]),
+        details=lesson_details(row[3]),
+    )
+
+
+class ParseExecutor:
+    """
+    Разбор лент и выборка занятий за период.
+
+    Режимы:
+    - inline — прямо в event loop (по умолчанию);
+    - thread — в пуле потоков, индексы общие с процессом приложения;
+    - process — в workers процессах; каждая лента закреплена за одним процессом
+      (по хешу ключа) и разбирается только в нём. Процессу сначала отправляются
+      ключ и хеш ленты, текст — только если в его кеше индексов этой версии нет.
+      Занятия возвращаются кортежами примитивов (LessonRow) вместе со счётчиками
+      кеша процесса — из них складываются stats().
+    """
+
+    def __init__(
+        self,
+        parser: ICalParser,
+        mode: str = "inline",
+        workers: int = 4,
+        maxsize: int = 512,
+        ttl: float = 3600,
+    ) -> None:
+        self.mode = mode
+        self._parser = parser
+        self._cache = ParsedCalendarCache(self._load, maxsize=maxsize, ttl=ttl)
+        self._pool: Executor | None = None
+        self._workers: list[Executor] = []
+        # Последние счётчики кеша каждого процесса-воркера
+        self._worker_stats: list[dict[str, int]] = []
+        match mode:
+            case "inline":
+                pass
+            case "thread":
+                self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ical")
+            case "process":
+                # Ленты делятся между процессами, поэтому кеш каждого — своя доля maxsize
+                initargs = (type(parser), math.ceil(maxsize / workers), ttl)
+                self._workers = [
+                    ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=initargs)
+                    for _ in range(workers)
+                ]
+                self._worker_stats = [{"size": 0, "hits": 0, "misses": 0} for _ in range(workers)]
+            case _:
+                raise ValueError(f"Неизвестный режим разбора: {mode!r}")
+
+    def _load(self, ical_text: str) -> OccurrenceIndex:
+        return OccurrenceIndex.from_text(self._parser, ical_text)
+
+    def index(self, key: Hashable, feed: Feed) -> OccurrenceIndex:
+        """Индекс занятий ленты в текущем потоке."""
+        return self._cache.get(key, feed)
+
+    async def lessons(self, key: Hashable, feed: Feed, date_from: date, date_to: date) -> list[LessonRecord]:
+        """Занятия ленты за период [date_from, date_to]."""
+        loop = asyncio.get_running_loop()
+        if self._workers:
+            number = hash(key) % len(self._workers)
+            worker = self._workers[number]
+            rows, stats = await loop.run_in_executor(
+                worker, _worker_rows, key, feed.digest, None, date_from, date_to
+            )
+            if rows is None:
+                rows, stats = await loop.run_in_executor(
+                    worker, _worker_rows, key, feed.digest, feed.text, date_from, date_to
+                )
+            self._worker_stats[number] = stats
+            return [lesson_from_row(row) for row in rows]
+        if self._pool is None:
+            return self.index(key, feed).lessons(date_from, date_to)
+        index = self._cache.peek(key, feed.digest)
+        if index is not None:
+            # Индекс уже построен: выборка дешёвая, не ждём в очереди пула за разбором
+            return index.lessons(date_from, date_to)
+        return await loop.run_in_executor(
+            self._pool,
+            lambda: self.index(key, feed).lessons(date_from, date_to),
+        )
+
+    async def iter_lessons(
+        self, key: Hashable, feed: Feed, date_from: date, date_to: date
+    ) -> AsyncIterator[LessonRecord]:
+        """
+        Занятия за период по порядку, по одному полугодию за раз — для потоковой
+        отдачи: в памяти одновременно не больше одного полугодия выборки.
+        """
+        for start, end in semester_periods(date_from, date_to):
+            for lesson in await self.lessons(key, feed, max(date_from, start), min(date_to, end)):
+                yield lesson
+
+    def stats(self) -> dict[str, int]:
+        """
+        Счётчики кеша индексов. В режиме process — сумма по процессам-воркерам
+        на момент их последних ответов.
+        """
+        if not self._worker_stats:
+            return self._cache.stats()
+        return {name: sum(stats[name] for stats in self._worker_stats) for name in ("size", "hits", "misses")}
+
+    def shutdown(self) -> None:
+        for pool in (self._pool, *self._workers):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._workers = []
+
+
+# Состояние процесса-воркера в режиме process
+_worker_cache: ParsedCalendarCache | None = None
+
+
+def _init_worker(parser_cls: type[ICalParser], maxsize: int, ttl: float) -> None:
+    global _worker_cache
+    parser = parser_cls()
+    _worker_cache = ParsedCalendarCache(
+        lambda text: OccurrenceIndex.from_text(parser, text),
+        maxsize=maxsize,
+        ttl=ttl,
+    )
+
+
+def _worker_rows(
+    key: Hashable,
+    digest: str,
+    ical_text: str | None,
+    date_from: date,
+    date_to: date,
+) -> tuple[list[LessonRow] | None, dict[str, int]]:
+    """
+    Занятия за период и счётчики кеша процесса; занятий нет (None), если текст
+    не передан, а этой версии ленты в кеше процесса нет.
+    """
+    if ical_text is None:
+        index = _worker_cache.peek(key, digest)
+        if index is None:
+            return None, _worker_cache.stats()
+    else:
+        index = _worker_cache.get(key, Feed(text=ical_text, digest=digest))
+    return [lesson_to_row(lesson) for lesson in index.lessons(date_from, date_to)], _worker_cache.stats()
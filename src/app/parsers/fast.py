@@ -0,0 +1,349 @@
+"""
+Быстрый построчный парсер iCal для лент schedule-of.mirea.ru.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .ical import ICalParser
+from .ical_lines import Unsupported, parse_datetime, parse_params, split_line, unescape_text, unfold
+from .records import LessonDetails, LessonRecord
+
+_NEWLINE = re.compile(r"\r?\n")
+
+_WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+# Свойства VEVENT, которые читает парсер; остальные строки пропускаются без разбора
+_EVENT_PROPS = frozenset({
+    "UID", "DTSTART", "DTEND", "DURATION", "RRULE", "EXRULE", "EXDATE", "RDATE", "RECURRENCE-ID",
+    "X-META-DISCIPLINE", "X-META-LESSON_TYPE", "X-META-FULL_LESSON_TYPE",
+    "X-META-TEACHER", "X-META-GROUP", "X-META-AUDITORIUM",
+})
+
+
+class _Prop(str):
+    """Значение свойства с параметрами — повторяет интерфейс свойств icalendar."""
+    params: dict[str, str | list[str]]
+
+
+@dataclass(slots=True)
+class _RawEvent:
+    props: dict[str, _Prop | list[_Prop]] = field(default_factory=dict)
+
+    def get(self, name: str, default=None):
+        return self.props.get(name, default)
+
+    def add(self, name: str, params: str, value: str) -> None:
+        prop = _Prop(value)
+        prop.params = parse_params(params) if params else {}
+        existing = self.props.get(name)
+        if existing is None:
+            self.props[name] = prop
+        elif isinstance(existing, list):
+            existing.append(prop)
+        else:
+            self.props[name] = [existing, prop]
+
+
+@dataclass(slots=True)
+class _Event:
+    """Событие, подготовленное к развёртке: локальное время начала, длительность, правило."""
+    uid: str
+    start: datetime
+    duration: timedelta
+    details: LessonDetails
+    recurrence_id: datetime | None = None
+    # (шаг, начала серий) — для каждого дня недели из BYDAY своя серия
+    step: timedelta | None = None
+    series: tuple[datetime, ...] = ()
+    until: datetime | None = None
+    count: int | None = None
+    exdates: frozenset[datetime] = frozenset()
+    exdays: frozenset[date] = frozenset()
+    rdates: tuple[datetime, ...] = ()
+
+
+@dataclass(slots=True)
+class FastCalendar:
+    """Лента, разобранная быстрым парсером."""
+    events: list[_Event]
+    # UID → даты повторений, заменённых событиями с RECURRENCE-ID
+    overridden: dict[str, frozenset[datetime]]
+
+
+class FastICalParser(ICalParser):
+    """
+    Построчный парсер iCal без построения дерева компонентов.
+
+    Читает только свойства, нужные для занятия, и разворачивает DAILY/WEEKLY RRULE,
+    EXDATE, RDATE и RECURRENCE-ID прямо в запрошенном окне. Если в ленте встречается
+    что-то более сложное, лента целиком разбирается обычным ICalParser —
+    результат совпадает в обоих случаях.
+    """
+
+    def load(self, ical_text: str):
+        try:
+            return self._load_fast(ical_text)
+        except Unsupported:
+            return super().load(ical_text)
+
+    def expand(self, query, date_from: date, date_to: date) -> list[LessonRecord]:
+        if not isinstance(query, FastCalendar):
+            return super().expand(query, date_from, date_to)
+        dt_from = datetime.combine(date_from, time.min)
+        dt_to = datetime.combine(date_to, time.max)
+        lessons = []
+        for event in query.events:
+            skip = query.overridden.get(event.uid, frozenset()) if event.recurrence_id is None else ()
+            for start in self._occurrences(event, dt_from, dt_to):
+                if start in skip:
+                    continue
+                lessons.append(self._build_lesson(start, start + event.duration, event.details))
+        return sorted(lessons, key=self._sort_key)
+
+    def _occurrences(self, event: _Event, dt_from: datetime, dt_to: datetime):
+        """Начала повторений события, пересекающихся с окном [dt_from, dt_to]."""
+        duration = event.duration
+        if event.step is None:
+            starts = [event.start, *event.rdates]
+        else:
+            starts = list(event.rdates)
+            lower = dt_from - duration
+            for first in event.series:
+                skip = 0
+                if first < lower:
+                    skip = (lower - first) // event.step
+                k = skip
+                while True:
+                    if event.count is not None and k >= event.count:
+                        break
+                    start = first + k * event.step
+                    if start > dt_to or (event.until is not None and start > event.until):
+                        break
+                    starts.append(start)
+                    k += 1
+        seen = set()
+        for start in starts:
+            if start in seen:
+                continue
+            seen.add(start)
+            if start in event.exdates or start.date() in event.exdays:
+                continue
+            end = start + duration
+            if start <= dt_to and (end > dt_from or (end == start and start >= dt_from)):
+                yield start
+
+    def _load_fast(self, ical_text: str) -> FastCalendar:
+        raw_events: list[_RawEvent] = []
+        current: _RawEvent | None = None
+        depth = 0  # вложенные компоненты внутри VEVENT (VALARM и т.п.)
+        for line in _NEWLINE.split(unfold(ical_text)):
+            if not line:
+                continue
+            if line.startswith("BEGIN:"):
+                if current is not None:
+                    depth += 1
+                elif line[6:].strip().upper() == "VEVENT":
+                    current = _RawEvent()
+                continue
+            if line.startswith("END:"):
+                if current is not None:
+                    if depth:
+                        depth -= 1
+                    else:
+                        raw_events.append(current)
+                        current = None
+                continue
+            if current is None or depth:
+                continue
+            cut = len(line)
+            for sep in (";", ":"):
+                pos = line.find(sep)
+                if 0 <= pos < cut:
+                    cut = pos
+            name = line[:cut].upper()
+            if name not in _EVENT_PROPS:
+                continue
+            _, params, value = split_line(line)
+            if name.startswith("X-") or name == "UID":
+                # Текстовые свойства: снимаем экранирование так же, как vText в icalendar
+                value = unescape_text(value)
+            current.add(name, params, value)
+
+        events: list[_Event] = []
+        overridden: dict[str, set[datetime]] = {}
+        for raw in raw_events:
+            event = self._prepare(raw)
+            if event is None:
+                continue
+            events.append(event)
+            if event.recurrence_id is not None:
+                overridden.setdefault(event.uid, set()).add(event.recurrence_id)
+        return FastCalendar(
+            events=events,
+            overridden={uid: frozenset(dates) for uid, dates in overridden.items()},
+        )
+
+    def _prepare(self, raw: _RawEvent) -> _Event | None:
+        for name in ("DURATION", "EXRULE"):
+            if name in raw.props:
+                raise Unsupported(name)
+        dtstart = raw.get("DTSTART")
+        dtend = raw.get("DTEND")
+        if dtstart is None or isinstance(dtstart, list) or isinstance(dtend, list):
+            raise Unsupported("DTSTART")
+        start = parse_datetime(dtstart)
+        if not isinstance(start, datetime):
+            # Маркеры недель — all-day события
+            return None
+        if dtend is None:
+            return None
+        end = parse_datetime(dtend)
+        if not isinstance(end, datetime):
+            return None
+        zone = self._zone(dtstart)
+        if self._zone(dtend) != zone:
+            raise Unsupported("DTEND в другом часовом поясе")
+
+        event = _Event(
+            uid=str(raw.get("UID", "")),
+            start=start,
+            duration=end - start,
+            details=self._event_details(raw),
+        )
+
+        recurrence_id = raw.get("RECURRENCE-ID")
+        if recurrence_id is not None:
+            if isinstance(recurrence_id, list) or "RANGE" in recurrence_id.params or "RRULE" in raw.props:
+                raise Unsupported("RECURRENCE-ID")
+            event.recurrence_id = self._local(recurrence_id, zone)
+
+        exdates: set[datetime] = set()
+        exdays: set[date] = set()
+        for prop in self._get_all(raw, "EXDATE"):
+            for value in prop.split(","):
+                parsed = self._local_value(value, prop, zone)
+                if isinstance(parsed, datetime):
+                    exdates.add(parsed)
+                else:
+                    exdays.add(parsed)
+        event.exdates, event.exdays = frozenset(exdates), frozenset(exdays)
+
+        rdates: list[datetime] = []
+        for prop in self._get_all(raw, "RDATE"):
+            if prop.params.get("VALUE", "DATE-TIME") != "DATE-TIME":
+                raise Unsupported("RDATE")
+            for value in prop.split(","):
+                parsed = self._local_value(value, prop, zone)
+                if not isinstance(parsed, datetime):
+                    raise Unsupported("RDATE")
+                rdates.append(parsed)
+        event.rdates = tuple(rdates)
+
+        rrule = raw.get("RRULE")
+        if rrule is not None:
+            if isinstance(rrule, list):
+                raise Unsupported("RRULE")
+            self._apply_rrule(event, rrule, zone)
+        return event
+
+    def _apply_rrule(self, event: _Event, rrule: _Prop, zone: str | None) -> None:
+        parts = {}
+        for part in rrule.split(";"):
+            key, _, value = part.partition("=")
+            parts[key.strip().upper()] = value.strip()
+        unknown = set(parts) - {"FREQ", "INTERVAL", "UNTIL", "COUNT", "BYDAY", "WKST"}
+        if unknown:
+            raise Unsupported(f"RRULE {unknown}")
+        try:
+            interval = int(parts.get("INTERVAL", "1"))
+            count = int(parts["COUNT"]) if "COUNT" in parts else None
+        except ValueError:
+            raise Unsupported("RRULE") from None
+        if interval < 1:
+            raise Unsupported("RRULE INTERVAL")
+        event.count = count
+
+        if "UNTIL" in parts:
+            until = parse_datetime(parts["UNTIL"])
+            if not isinstance(until, datetime):
+                raise Unsupported("UNTIL без времени")
+            if parts["UNTIL"].strip().endswith("Z"):
+                until = self._from_utc(until, zone)
+            elif zone is not None:
+                # Трактовка плавающего UNTIL при DTSTART с часовым поясом различается
+                # между реализациями — оставляем её icalendar
+                raise Unsupported("UNTIL без часового пояса")
+            event.until = until
+
+        match parts.get("FREQ", "").upper():
+            case "DAILY":
+                if "BYDAY" in parts:
+                    raise Unsupported("DAILY BYDAY")
+                event.step = timedelta(days=interval)
+                event.series = (event.start,)
+            case "WEEKLY":
+                event.step = timedelta(weeks=interval)
+                if "BYDAY" not in parts:
+                    event.series = (event.start,)
+                    return
+                try:
+                    weekdays = sorted({_WEEKDAYS[d.strip().upper()] for d in parts["BYDAY"].split(",")})
+                    wkst = _WEEKDAYS[parts.get("WKST", "MO").upper()]
+                except KeyError:
+                    raise Unsupported("BYDAY") from None
+                start_weekday = event.start.weekday()
+                if start_weekday not in weekdays:
+                    raise Unsupported("DTSTART вне BYDAY")
+                if len(weekdays) > 1 and count is not None:
+                    raise Unsupported("COUNT с несколькими BYDAY")
+                week_start = event.start - timedelta(days=(start_weekday - wkst) % 7)
+                series = []
+                for weekday in weekdays:
+                    first = week_start + timedelta(days=(weekday - wkst) % 7)
+                    if first < event.start:
+                        first += event.step
+                    series.append(first)
+                event.series = tuple(series)
+            case _:
+                raise Unsupported("FREQ")
+
+    @staticmethod
+    def _zone(prop: _Prop) -> str | None:
+        """Часовой пояс значения: TZID, "Z" для UTC или None для плавающего времени."""
+        if prop.strip().endswith("Z"):
+            return "Z"
+        tzid = prop.params.get("TZID")
+        if isinstance(tzid, list):
+            raise Unsupported("TZID")
+        return tzid
+
+    def _local(self, prop: _Prop, zone: str | None) -> datetime:
+        value = self._local_value(prop, prop, zone)
+        if not isinstance(value, datetime):
+            raise Unsupported(f"Дата вместо даты-времени: {prop!r}")
+        return value
+
+    def _local_value(self, value: str, prop: _Prop, zone: str | None) -> datetime | date:
+        """Дата/время значения в часовом поясе DTSTART события."""
+        parsed = parse_datetime(value)
+        if not isinstance(parsed, datetime):
+            return parsed
+        value_zone = "Z" if value.strip().endswith("Z") else prop.params.get("TZID")
+        if value_zone == zone:
+            return parsed
+        if value_zone == "Z":
+            return self._from_utc(parsed, zone)
+        raise Unsupported("Смешанные часовые пояса")
+
+    @staticmethod
+    def _from_utc(value: datetime, zone: str | None) -> datetime:
+        if zone in (None, "Z"):
+            return value
+        try:
+            tz = ZoneInfo(zone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise Unsupported(f"Неизвестный часовой пояс: {zone!r}") from None
+        return value.replace(tzinfo=UTC).astimezone(tz).replace(tzinfo=None)
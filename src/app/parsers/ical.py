@@ -7,19 +7,31 @@ from datetime import date, datetime, time, timezone
 from icalendar import Calendar
 import recurring_ical_events
 
-from app.schemas.schedule import Lesson, PersonRef, RoomRef
+from .records import LessonDetails, LessonRecord, hhmm, lesson_details
 
 
 class ICalParser:
     """Парсер iCal в список занятий."""
 
-    def parse(self, ical_text: str, date_from: date, date_to: date) -> list[Lesson]:
-        cal = Calendar.from_ical(ical_text)
+    def load(self, ical_text: str) -> recurring_ical_events.CalendarQuery:
+        """Разбирает iCal текст и готовит развёртку повторяющихся событий."""
+        return recurring_ical_events.of(Calendar.from_ical(ical_text))
+
+    def parse(self, ical_text: str, date_from: date, date_to: date) -> list[LessonRecord]:
+        return self.expand(self.load(ical_text), date_from, date_to)
+
+    def expand(
+        self,
+        query: recurring_ical_events.CalendarQuery,
+        date_from: date,
+        date_to: date,
+    ) -> list[LessonRecord]:
+        """Занятия за период из заранее подготовленного календаря."""
         # Передаём datetime с явным временем: between() с date-объектами даёт
         # пустой результат при date_from == date_to (граница не включается)
         dt_from = datetime.combine(date_from, time.min)
         dt_to = datetime.combine(date_to, time.max)
-        events = recurring_ical_events.of(cal).between(dt_from, dt_to)
+        events = query.between(dt_from, dt_to)
         lessons = []
         for event in events:
             if event.name != "VEVENT":
@@ -33,7 +45,23 @@ class ICalParser:
             lesson = self._parse_event(event)
             if lesson is not None:
                 lessons.append(lesson)
-        return sorted(lessons, key=lambda l: (l.date, l.time_start))
+        return sorted(lessons, key=self._sort_key)
+
+    @staticmethod
+    def _sort_key(lesson: LessonRecord) -> tuple:
+        # Кроме даты и времени начала сравниваем остальные поля, чтобы порядок
+        # одновременных занятий не зависел от порядка развёртки событий
+        details = lesson.details
+        return (
+            lesson.date,
+            lesson.time_start,
+            lesson.time_end,
+            details.discipline,
+            details.lesson_type,
+            [t.id for t in details.teachers],
+            [g.id for g in details.groups],
+            details.room.id if details.room is not None else -1,
+        )
 
     def _get_all(self, event, prop_name: str) -> list:
         """Получить все значения многозначного свойства."""
@@ -44,7 +72,7 @@ class ICalParser:
             return val
         return [val]
 
-    def _parse_event(self, event) -> Lesson | None:
+    def _parse_event(self, event) -> LessonRecord | None:
         dtstart = event.get("DTSTART")
         dtend = event.get("DTEND")
         if dtstart is None or dtend is None:
@@ -55,23 +83,27 @@ class ICalParser:
         if not isinstance(dt_start, datetime) or not isinstance(dt_end, datetime):
             return None
 
-        teachers: list[PersonRef] = []
+        return self._build_lesson(dt_start, dt_end, self._event_details(event))
+
+    def _event_details(self, event) -> LessonDetails:
+        """Дисциплина, тип, преподаватели, группы и аудитория из X-META-* свойств."""
+        teachers: list[tuple[int, str]] = []
         for t in self._get_all(event, "X-META-TEACHER"):
             try:
                 teacher_id = int(t.params.get("ID", 0))
             except (ValueError, AttributeError):
                 teacher_id = 0
-            teachers.append(PersonRef(id=teacher_id, name=str(t)))
+            teachers.append((teacher_id, str(t)))
 
-        groups: list[PersonRef] = []
+        groups: list[tuple[int, str]] = []
         for g in self._get_all(event, "X-META-GROUP"):
             try:
                 group_id = int(g.params.get("ID", 0))
             except (ValueError, AttributeError):
                 group_id = 0
-            groups.append(PersonRef(id=group_id, name=str(g)))
+            groups.append((group_id, str(g)))
 
-        room: RoomRef | None = None
+        room: tuple[int, str, str] | None = None
         auditorium = event.get("X-META-AUDITORIUM")
         if auditorium is not None:
             try:
@@ -80,20 +112,26 @@ class ICalParser:
                 room_id = 0
             number = str(auditorium.params.get("NUMBER", str(auditorium)))
             campus = str(auditorium.params.get("CAMPUS", ""))
-            room = RoomRef(id=room_id, number=number, campus=campus)
+            room = (room_id, number, campus)
 
         discipline_prop = event.get("X-META-DISCIPLINE")
         lesson_type_prop = event.get("X-META-LESSON_TYPE")
         lesson_type_full_prop = event.get("X-META-FULL_LESSON_TYPE")
 
-        return Lesson(
+        # Одинаковые поля (в том числе у копий-повторений) дают один общий объект
+        return lesson_details((
+            str(discipline_prop) if discipline_prop is not None else "",
+            str(lesson_type_prop) if lesson_type_prop is not None else "",
+            str(lesson_type_full_prop) if lesson_type_full_prop is not None else "",
+            tuple(teachers),
+            tuple(groups),
+            room,
+        ))
+
+    def _build_lesson(self, dt_start: datetime, dt_end: datetime, details: LessonDetails) -> LessonRecord:
+        return LessonRecord(
             date=dt_start.date(),
-            time_start=dt_start.strftime("%H:%M"),
-            time_end=dt_end.strftime("%H:%M"),
-            discipline=str(discipline_prop) if discipline_prop is not None else "",
-            lesson_type=str(lesson_type_prop) if lesson_type_prop is not None else "",
-            lesson_type_full=str(lesson_type_full_prop) if lesson_type_full_prop is not None else "",
-            teachers=teachers,
-            groups=groups,
-            room=room,
+            time_start=hhmm(dt_start),
+            time_end=hhmm(dt_end),
+            details=details,
         )
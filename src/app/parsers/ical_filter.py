@@ -0,0 +1,166 @@
+"""
+Отбор событий iCal-ленты без разбора календаря: проход по блокам VEVENT.
+"""
+
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Self
+
+from .ical_lines import Unsupported, parse_datetime, split_line, unescape_text, unfold
+
+# Свойства VEVENT, по которым принимается решение; строки свёрнутых свойств уже развёрнуты
+_PROPS = re.compile(
+    r"^(UID|DTSTART|RRULE|RDATE|RECURRENCE-ID|X-META-LESSON_TYPE|X-META-DISCIPLINE)([;:][^\r\n]*)",
+    re.M,
+)
+_BEGIN = "\nBEGIN:VEVENT"
+_END = "\nEND:VEVENT"
+
+
+@dataclass(slots=True, frozen=True)
+class ICalFilter:
+    """
+    Условия отбора занятий: типы (X-META-LESSON_TYPE, без учёта регистра), подстрока
+    названия дисциплины и период. Маркеры недель (all-day события) отбираются только
+    по периоду. Пустой фильтр пропускает всё.
+    """
+    lesson_types: frozenset[str] = frozenset()
+    discipline: str = ""
+    date_from: date | None = None
+    date_to: date | None = None
+
+    @classmethod
+    def create(
+        cls,
+        lesson_types: list[str] | None = None,
+        discipline: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> Self:
+        return cls(
+            lesson_types=frozenset(t.strip().casefold() for t in lesson_types or () if t.strip()),
+            discipline=(discipline or "").strip().casefold(),
+            date_from=date_from,
+            date_to=date_to,
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.lesson_types or self.discipline or self.date_from or self.date_to)
+
+    def key(self) -> tuple:
+        """Представление фильтра, не зависящее от порядка элементов множества (для ETag)."""
+        return tuple(sorted(self.lesson_types)), self.discipline, self.date_from, self.date_to
+
+    def matches(self, props: dict[str, str]) -> bool:
+        """Подходит ли событие; props — значения свойств события (см. _event_props)."""
+        try:
+            start = parse_datetime(props["DTSTART"])
+        except (KeyError, Unsupported):
+            # Событие, которое не удалось разобрать, не отбрасываем
+            return True
+        if not isinstance(start, datetime):
+            return self._overlaps(start, start)
+        if self.lesson_types and props.get("X-META-LESSON_TYPE", "").casefold() not in self.lesson_types:
+            return False
+        if self.discipline and self.discipline not in props.get("X-META-DISCIPLINE", "").casefold():
+            return False
+        return self._overlaps(start.date(), _last_date(start.date(), props))
+
+    def _overlaps(self, first: date, last: date | None) -> bool:
+        if self.date_to is not None and first > self.date_to:
+            return False
+        return self.date_from is None or last is None or last >= self.date_from
+
+
+def _last_date(start: date, props: dict[str, str]) -> date | None:
+    """Верхняя оценка даты последнего повторения; None — без ограничения."""
+    if "RDATE" in props:
+        return None
+    rrule = props.get("RRULE")
+    if rrule is None:
+        return start
+    parts = dict(part.partition("=")[::2] for part in rrule.upper().split(";"))
+    try:
+        if "UNTIL" in parts:
+            # UNTIL может быть в UTC — день запаса на разницу часовых поясов
+            until = parse_datetime(parts["UNTIL"].removesuffix("Z"))
+            return (until.date() if isinstance(until, datetime) else until) + timedelta(days=1)
+        if "COUNT" in parts:
+            step = {"DAILY": 1, "WEEKLY": 7}.get(parts.get("FREQ", ""))
+            if step is None:
+                return None
+            return start + timedelta(days=step * int(parts.get("INTERVAL", "1")) * int(parts["COUNT"]))
+    except (Unsupported, ValueError):
+        return None
+    return None
+
+
+def _event_props(block: str) -> tuple[dict[str, str], str | None]:
+    """Значения свойств события и строка RECURRENCE-ID как есть (для EXDATE)."""
+    props: dict[str, str] = {}
+    recurrence_line = None
+    for match in _PROPS.finditer(unfold(block)):
+        name = match[1]
+        if name in props:
+            continue
+        line = match[0]
+        if name == "RECURRENCE-ID":
+            recurrence_line = line
+        try:
+            _, _, value = split_line(line)
+        except Unsupported:
+            continue
+        props[name] = unescape_text(value) if name.startswith("X-") or name == "UID" else value
+    return props, recurrence_line
+
+
+def filter_ical(text: str, flt: ICalFilter) -> Iterator[str]:
+    """
+    Фрагменты ленты, в которой оставлены только подходящие под flt события VEVENT;
+    остальное (заголовок, VTIMEZONE) — как есть. Если отброшен перенос занятия
+    (событие с RECURRENCE-ID), а исходное повторяющееся событие осталось, в него
+    добавляется EXDATE — иначе календарь показал бы занятие на старом месте.
+    """
+    if not flt:
+        yield text
+        return
+    newline = "\r\n" if "\r\n" in text else "\n"
+    blocks: list[tuple[int, int, bool]] = []
+    masters: dict[str, int] = {}
+    exdates: dict[str, list[str]] = {}
+    begin = text.find(_BEGIN)
+    while begin >= 0:
+        end = text.find(_END, begin)
+        if end < 0:
+            break
+        end = text.find("\n", end + len(_END))
+        end = len(text) - 1 if end < 0 else end
+        props, recurrence_line = _event_props(text[begin + 1:end + 1])
+        keep = flt.matches(props)
+        uid = props.get("UID", "")
+        if recurrence_line is None:
+            masters.setdefault(uid, len(blocks))
+        elif not keep:
+            exdates.setdefault(uid, []).append("EXDATE" + recurrence_line[len("RECURRENCE-ID"):])
+        blocks.append((begin + 1, end + 1, keep))
+        begin = text.find(_BEGIN, end)
+
+    extra = {masters[uid]: lines for uid, lines in exdates.items() if uid in masters}
+    position = 0
+    for number, (begin, end, keep) in enumerate(blocks):
+        if begin > position:
+            yield text[position:begin]
+        position = end
+        if not keep:
+            continue
+        lines = extra.get(number)
+        if lines is None:
+            yield text[begin:end]
+        else:
+            tail = text.rfind("END:VEVENT", begin, end)
+            yield text[begin:tail]
+            yield newline.join(lines) + newline
+            yield text[tail:end]
+    yield text[position:]
@@ -0,0 +1,113 @@
+"""
+Строки содержимого iCal (RFC 5545): развёртка, разбор строки свойства, параметров
+и значений дат. Общие для FastICalParser и ICalFilter.
+"""
+
+import re
+from datetime import date, datetime
+
+_FOLD = re.compile(r"(\r?\n)+[ \t]")
+_RFC_6868 = re.compile(r"\^\^|\^n|\^'")
+_RFC_6868_MAP = {"^^": "^", "^n": "\n", "^'": '"'}
+
+
+def unfold(text: str) -> str:
+    """Текст со свёрнутыми строками, склеенными обратно."""
+    return _FOLD.sub("", text)
+
+
+class Unsupported(Exception):
+    """В ленте встретилась конструкция, которую построчный разбор не поддерживает."""
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace(r"\,", "%2C")
+        .replace(r"\:", "%3A")
+        .replace(r"\;", "%3B")
+        .replace("\\\\", "%5C")
+    )
+
+
+def _unescape(value: str) -> str:
+    return value.replace("%2C", ",").replace("%3A", ":").replace("%3B", ";").replace("%5C", "\\")
+
+
+def unescape_text(value: str) -> str:
+    """Значение типа TEXT без экранирования (\\n, \\, и т.п.)."""
+    return (
+        value.replace("\\N", "\\n")
+        .replace("\r\n", "\n")
+        .replace("\\n", "\n")
+        .replace("\\,", ",")
+        .replace("\\;", ";")
+        .replace("\\\\", "\\")
+    )
+
+
+def _split_quoted(text: str, sep: str) -> list[str]:
+    """Разбиение по разделителю вне кавычек."""
+    if '"' not in text:
+        return text.split(sep)
+    parts, start, quoted = [], 0, False
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == sep and not quoted:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_params(text: str) -> dict[str, str | list[str]]:
+    """Параметры свойства: имя в верхнем регистре → значение или список значений."""
+    params: dict[str, str | list[str]] = {}
+    for param in _split_quoted(text, ";"):
+        key, _, raw = param.partition("=")
+        values = []
+        for v in _split_quoted(raw, ","):
+            if v.startswith('"') and v.endswith('"'):
+                v = v.strip('"')
+            values.append(_RFC_6868.sub(lambda m: _RFC_6868_MAP[m.group(0)], v) if "^" in v else v)
+        if len(values) == 1:
+            params[_unescape(key).upper()] = _unescape(values[0])
+        else:
+            params[_unescape(key).upper()] = [_unescape(v) for v in values]
+    return params
+
+
+def split_line(line: str) -> tuple[str, str, str]:
+    """Имя, строка параметров и значение строки содержимого."""
+    if "\\" in line:
+        line = _escape(line)
+    name_end = value_start = -1
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in ":;":
+            if name_end < 0:
+                name_end = i
+            if ch == ":":
+                value_start = i
+                break
+    if name_end < 0 or value_start < 0:
+        raise Unsupported(f"Некорректная строка: {line!r}")
+    return line[:name_end], line[name_end + 1:value_start], _unescape(line[value_start + 1:])
+
+
+def parse_datetime(value: str) -> datetime | date:
+    """Значение DATE или DATE-TIME без учёта часового пояса."""
+    value = value.strip()
+    try:
+        if len(value) == 8:
+            return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+        if value[8] != "T" or len(value) not in (15, 16):
+            raise ValueError
+        return datetime(
+            int(value[:4]), int(value[4:6]), int(value[6:8]),
+            int(value[9:11]), int(value[11:13]), int(value[13:15]),
+        )
+    except (ValueError, IndexError):
+        raise Unsupported(f"Неподдерживаемое значение даты: {value!r}") from None
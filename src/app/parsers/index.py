@@ -0,0 +1,105 @@
+"""
+Индекс занятий ленты, развёрнутых по семестрам.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+from datetime import date, timedelta
+from typing import Any, Self
+
+from .ical import ICalParser
+from .records import LessonRecord
+
+_DAY = timedelta(days=1)
+
+def semester_bounds(day: date) -> tuple[date, date]:
+    """
+    Границы учебного полугодия, в которое попадает дата.
+    Осень — с 1 сентября по 31 января (с сессией), весна — с 1 февраля по 31 августа.
+    """
+    if day.month >= 9:
+        return date(day.year, 9, 1), date(day.year + 1, 1, 31)
+    if day.month == 1:
+        return date(day.year - 1, 9, 1), date(day.year, 1, 31)
+    return date(day.year, 2, 1), date(day.year, 8, 31)
+
+
+def index_horizon(today: date) -> tuple[date, date]:
+    """
+    Период, полугодия которого индекс хранит: текущий учебный год (с 1 сентября)
+    и по полугодию до и после него.
+    """
+    year = today.year if today.month >= 9 else today.year - 1
+    return date(year, 2, 1), date(year + 2, 1, 31)
+
+
+def semester_periods(date_from: date, date_to: date) -> Iterator[tuple[date, date]]:
+    """Полугодия, пересекающиеся с периодом [date_from, date_to]."""
+    day = date_from
+    while day <= date_to:
+        start, end = semester_bounds(day)
+        yield start, end
+        day = date.fromordinal(end.toordinal() + 1)
+
+
+class OccurrenceIndex:
+    """
+    Занятия одной ленты, развёрнутые один раз на всё полугодие.
+
+    Для каждого полугодия хранится отсортированный список занятий и параллельный
+    массив порядковых номеров дат, так что выборка за период — это два бинарных
+    поиска и срез списка. Полугодие разворачивается под блокировкой, поэтому индекс
+    можно использовать из пула потоков.
+
+    Хранятся только полугодия в пределах index_horizon и не больше MAX_PERIODS;
+    часть запроса вне горизонта разворачивается каждый раз заново и не кешируется.
+    """
+
+    MAX_PERIODS = 4
+
+    def __init__(self, parser: ICalParser, calendar: Any) -> None:
+        self._parser = parser
+        self._calendar = calendar
+        self._periods: dict[date, tuple[array, list[LessonRecord]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_text(cls, parser: ICalParser, ical_text: str) -> Self:
+        return cls(parser, parser.load(ical_text))
+
+    def lessons(self, date_from: date, date_to: date) -> list[LessonRecord]:
+        """Занятия за период [date_from, date_to] в порядке (дата, время начала)."""
+        if date_from > date_to:
+            return []
+        first, last = index_horizon(date.today())
+        result: list[LessonRecord] = []
+        if date_from < first:
+            result = self._parser.expand(self._calendar, date_from, min(date_to, first - _DAY))
+        for start, end in semester_periods(max(date_from, first), min(date_to, last)):
+            days, lessons = self._period(start, end)
+            lo = bisect_left(days, max(date_from, start).toordinal())
+            hi = bisect_right(days, min(date_to, end).toordinal(), lo)
+            if not result:
+                result = lessons[lo:hi]
+            else:
+                result.extend(lessons[lo:hi])
+        if date_to > last:
+            result.extend(self._parser.expand(self._calendar, max(date_from, last + _DAY), date_to))
+        return result
+
+    def _period(self, start: date, end: date) -> tuple[array, list[LessonRecord]]:
+        period = self._periods.get(start)
+        if period is not None:
+            return period
+        with self._lock:
+            period = self._periods.get(start)
+            if period is None:
+                lessons = self._parser.expand(self._calendar, start, end)
+                days = array("l", (lesson.date.toordinal() for lesson in lessons))
+                while len(self._periods) >= self.MAX_PERIODS:
+                    # Горизонт сдвинулся: вытесняем самое давно развёрнутое полугодие
+                    del self._periods[next(iter(self._periods))]
+                period = self._periods[start] = (days, lessons)
+        return period
@@ -0,0 +1,146 @@
+"""
+Компактное внутреннее представление занятий.
+
+Индексы лент хранят не pydantic-модели Lesson, а LessonRecord: у всех повторений
+одного события общий LessonDetails, строки интернированы, а PersonRef/RoomRef
+переиспользуются между событиями и лентами. В публичную схему записи
+превращаются только на границе — при кодировании ответа.
+"""
+
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+
+from app.schemas.schedule import Lesson, PersonRef, RoomRef
+
+# Сколько различных преподавателей/групп и аудиторий держать в общих пулах
+_REFS_MAXSIZE = 65536
+
+
+@lru_cache(maxsize=_REFS_MAXSIZE)
+def person_ref(ref_id: int, name: str) -> PersonRef:
+    """Общий экземпляр PersonRef для пары (id, имя)."""
+    return PersonRef.model_construct(id=ref_id, name=sys.intern(name))
+
+
+@lru_cache(maxsize=_REFS_MAXSIZE)
+def room_ref(ref_id: int, number: str, campus: str) -> RoomRef:
+    """Общий экземпляр RoomRef для (id, номер, кампус)."""
+    return RoomRef.model_construct(id=ref_id, number=sys.intern(number), campus=sys.intern(campus))
+
+
+def hhmm(moment: datetime) -> str:
+    return sys.intern(f"{moment.hour:02d}:{moment.minute:02d}")
+
+
+def _dumps(value) -> str:
+    # Те же правила экранирования, что у pydantic: не-ASCII символы как есть
+    return json.dumps(value, ensure_ascii=False)
+
+
+@dataclass(slots=True)
+class LessonDetails:
+    """Общие для всех повторений события поля занятия."""
+    discipline: str
+    lesson_type: str
+    lesson_type_full: str
+    teachers: tuple[PersonRef, ...]
+    groups: tuple[PersonRef, ...]
+    room: RoomRef | None
+    _json: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    def json_fragment(self) -> str:
+        """JSON полей занятия после времени окончания; кодируется один раз на событие."""
+        if self._json is None:
+            room = self.room
+            self._json = (
+                f'"discipline":{_dumps(self.discipline)},'
+                f'"lesson_type":{_dumps(self.lesson_type)},'
+                f'"lesson_type_full":{_dumps(self.lesson_type_full)},'
+                f'"teachers":[{",".join(_person_json(t) for t in self.teachers)}],'
+                f'"groups":[{",".join(_person_json(g) for g in self.groups)}],'
+                '"room":'
+                + (
+                    f'{{"id":{room.id},"number":{_dumps(room.number)},"campus":{_dumps(room.campus)}}}'
+                    if room is not None
+                    else "null"
+                )
+            )
+        return self._json
+
+
+def _person_json(ref: PersonRef) -> str:
+    return f'{{"id":{ref.id},"name":{_dumps(ref.name)}}}'
+
+
+# Поля LessonDetails примитивами: (дисциплина, тип, полный тип,
+# ((id, имя), ...) преподавателей, ((id, имя), ...) групп, (id, номер, кампус) | None)
+DetailsRow = tuple
+
+
+@lru_cache(maxsize=_REFS_MAXSIZE)
+def lesson_details(row: DetailsRow) -> LessonDetails:
+    """
+    Общий LessonDetails для одинаковых полей: повторения события, развёрнутые
+    recurring_ical_events копиями, и строки из процессов-воркеров сходятся в один объект.
+    """
+    room = row[5]
+    return LessonDetails(
+        discipline=sys.intern(row[0]),
+        lesson_type=sys.intern(row[1]),
+        lesson_type_full=sys.intern(row[2]),
+        teachers=tuple(person_ref(i, n) for i, n in row[3]),
+        groups=tuple(person_ref(i, n) for i, n in row[4]),
+        room=room_ref(*room) if room is not None else None,
+    )
+
+
+def details_to_row(details: LessonDetails) -> DetailsRow:
+    room = details.room
+    return (
+        details.discipline,
+        details.lesson_type,
+        details.lesson_type_full,
+        tuple((t.id, t.name) for t in details.teachers),
+        tuple((g.id, g.name) for g in details.groups),
+        (room.id, room.number, room.campus) if room is not None else None,
+    )
+
+
+@dataclass(slots=True)
+class LessonRecord:
+    """Одно повторение события: дата, время и ссылка на общие поля."""
+    date: date
+    time_start: str
+    time_end: str
+    details: LessonDetails
+
+    def to_lesson(self) -> Lesson:
+        """Публичная модель занятия (без повторной валидации)."""
+        details = self.details
+        return Lesson.model_construct(
+            date=self.date,
+            time_start=self.time_start,
+            time_end=self.time_end,
+            discipline=details.discipline,
+            lesson_type=details.lesson_type,
+            lesson_type_full=details.lesson_type_full,
+            teachers=list(details.teachers),
+            groups=list(details.groups),
+            room=details.room,
+        )
+
+
+def encode_lesson(record: LessonRecord) -> str:
+    """JSON-объект занятия, побайтно совпадающий с сериализацией Lesson в pydantic."""
+    return (
+        f'{{"date":"{record.date.isoformat()}","time_start":"{record.time_start}",'
+        f'"time_end":"{record.time_end}",{record.details.json_fragment()}}}'
+    )
+
+
+def encode_lessons(records: list[LessonRecord]) -> str:
+    """JSON-массив занятий."""
+    return "[" + ",".join(map(encode_lesson, records)) + "]"
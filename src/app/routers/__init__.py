@@ -1,4 +1,19 @@
+from .changes import get_changes
+from .ical import get_ical
+from .metrics import metrics
+from .occupancy import get_free_rooms, get_free_slots
 from .search import search
-from .schedule import get_schedule, get_schedule_by_name, get_week
+from .schedule import get_schedule, get_schedule_batch, get_schedule_by_name, get_week
 
-__all__ = ["search", "get_schedule", "get_schedule_by_name", "get_week"]
+__all__ = [
+    "metrics",
+    "search",
+    "get_changes",
+    "get_ical",
+    "get_free_rooms",
+    "get_free_slots",
+    "get_schedule",
+    "get_schedule_batch",
+    "get_schedule_by_name",
+    "get_week",
+]
@@ -0,0 +1,37 @@
+"""
+Роутер потока изменений расписания (Server-Sent Events).
+"""
+
+from typing import Annotated
+
+from litestar import get
+from litestar.exceptions import HTTPException
+from litestar.params import Parameter
+from litestar.response import Stream
+
+from app.state import change_feed, feed_cache
+
+
+@get("/api/changes/{schedule_type:int}/{entity_id:int}")
+async def get_changes(
+    schedule_type: int,
+    entity_id: int,
+    last_event_id: Annotated[str | None, Parameter(header="Last-Event-ID")] = None,
+) -> Stream:
+    """
+    Подписка на изменения расписания сущности (text/event-stream).
+    При каждом изменении ленты приходит событие change с добавленными и удалёнными
+    занятиями; без изменений — комментарии-пинги. После переподключения с Last-Event-ID
+    пропущенные события повторяются, если они ещё в истории.
+    """
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID должен быть числом")
+    # Лента загружается до начала потока: ошибки upstream — обычным ответом, а не обрывом
+    feed = await feed_cache.get(schedule_type, entity_id)
+    return Stream(
+        change_feed.subscribe((schedule_type, entity_id), feed, last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
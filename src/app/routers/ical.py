@@ -0,0 +1,101 @@
+"""
+Роутер iCal-лент для подписки в календаре: лента из кеша, при необходимости отфильтрованная.
+"""
+
+import gzip
+from typing import Annotated
+
+from litestar import Response, get
+from litestar.params import Parameter
+
+from app.headers import feed_headers, not_modified, validators
+from app.parsers import ICalFilter, filter_ical
+from app.state import feed_cache, prefetcher, response_cache
+from app.types import parse_date_param
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+# Litestar сам добавит "; charset=utf-8"
+ICAL_MEDIA_TYPE = "text/calendar"
+# Сжатые варианты в порядке предпочтения при равном q
+_ENCODINGS = ("zstd", "gzip") if zstd is not None else ("gzip",)
+
+
+def _negotiate(accept_encoding: str | None) -> str:
+    """Кодировка ответа по Accept-Encoding: zstd, gzip или identity."""
+    if not accept_encoding:
+        return "identity"
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    best = max(_ENCODINGS, key=lambda e: weights.get(e, weights.get("*", 0.0)))
+    return best if weights.get(best, weights.get("*", 0.0)) > 0 else "identity"
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstd.compress(body, level=10)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    return body
+
+
+@get("/api/ical/{schedule_type:int}/{entity_id:int}")
+async def get_ical(
+    schedule_type: int,
+    entity_id: int,
+    lesson_type: Annotated[list[str] | None, Parameter(description="Типы занятий: ЛК, ПР, ЛАБ…")] = None,
+    discipline: Annotated[str | None, Parameter(description="Часть названия дисциплины")] = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    if_none_match: Annotated[str | None, Parameter(header="If-None-Match")] = None,
+    if_modified_since: Annotated[str | None, Parameter(header="If-Modified-Since")] = None,
+    accept_encoding: Annotated[str | None, Parameter(header="Accept-Encoding")] = None,
+) -> Response[bytes]:
+    """
+    iCal-лента группы/преподавателя/кабинета для подписки в календаре — из кеша, без разбора.
+    Фильтры (тип занятия, дисциплина, период) отбирают события VEVENT построчно;
+    сжатые варианты (zstd, gzip) кешируются вместе с лентой.
+    """
+    flt = ICalFilter.create(
+        lesson_type,
+        discipline,
+        parse_date_param(date_from, None) if date_from is not None else None,
+        parse_date_param(date_to, None) if date_to is not None else None,
+    )
+    feed = await feed_cache.get(schedule_type, entity_id)
+    prefetcher.record_request(schedule_type, entity_id)
+    encoding = _negotiate(accept_encoding)
+    variant = ("ical", schedule_type, entity_id, *flt.key(), encoding)
+    headers = (
+        validators(feed, variant)
+        | feed_headers(feed)
+        | {
+            "Cache-Control": f"public, max-age={max(0, int(feed_cache.ttl - feed.age()))}",
+            "Vary": "Accept-Encoding",
+            "Content-Disposition": f'inline; filename="schedule-{schedule_type}-{entity_id}.ics"',
+        }
+    )
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if not_modified(headers, if_none_match, if_modified_since):
+        return Response(b"", status_code=304, headers=headers)
+
+    cache_key = (*variant, feed.digest)
+    body = response_cache.get(cache_key)
+    if body is None:
+        body = _compress("".join(filter_ical(feed.text, flt)).encode(), encoding)
+        response_cache.set(cache_key, body)
+    return Response(body, media_type=ICAL_MEDIA_TYPE, headers=headers)
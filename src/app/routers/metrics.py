@@ -0,0 +1,16 @@
+"""
+Роутер метрик Prometheus.
+"""
+
+from litestar import Response, get
+
+from app.metrics import registry
+
+# Litestar сам добавит "; charset=utf-8"
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4"
+
+
+@get("/metrics", include_in_schema=False)
+async def metrics() -> Response[str]:
+    """Метрики приложения в текстовом формате Prometheus."""
+    return Response(registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -0,0 +1,123 @@
+"""
+Роутер поиска свободных аудиторий и общего свободного времени.
+"""
+
+import asyncio
+from datetime import date
+from typing import Annotated
+
+from litestar import get
+from litestar.exceptions import HTTPException
+from litestar.params import Parameter
+
+from app.config import settings
+from app.schemas.occupancy import EntityRef, FreeDay, FreeRoomsResponse, FreeSlotsResponse, Pair
+from app.schemas.search import ScheduleTarget
+from app.services import PAIRS, parse_entities
+from app.services.occupancy import ALL_PAIRS, pairs_of
+from app.state import feed_cache, occupancy_index
+from app.types import parse_date_param
+
+
+def _pairs(mask: int) -> list[Pair]:
+    return [
+        Pair(number=number, time_start=PAIRS[number - 1][0], time_end=PAIRS[number - 1][1])
+        for number in pairs_of(mask)
+    ]
+
+
+def _pairs_mask(pairs: list[int] | None) -> int:
+    if not pairs:
+        return ALL_PAIRS
+    mask = 0
+    for number in pairs:
+        if not 1 <= number <= len(PAIRS):
+            raise HTTPException(status_code=400, detail=f"Номер пары — от 1 до {len(PAIRS)}")
+        mask |= 1 << (number - 1)
+    return mask
+
+
+def _out_of_period() -> HTTPException:
+    start, end = occupancy_index.period
+    return HTTPException(
+        status_code=400,
+        detail=f"Доступен период с {start.isoformat()} по {end.isoformat()}",
+    )
+
+
+def _check_period(date_from: date, date_to: date) -> None:
+    if not (occupancy_index.covers(date_from) and occupancy_index.covers(date_to)):
+        raise _out_of_period()
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from позже date_to")
+
+
+@get("/api/rooms/free")
+async def get_free_rooms(
+    day: Annotated[str | None, Parameter(query="date", description="Дата (по умолчанию — сегодня)")] = None,
+    pair: Annotated[list[int] | None, Parameter(description="Номера пар 1…7 (по умолчанию — весь день)")] = None,
+    campus: str | None = None,
+) -> FreeRoomsResponse:
+    """
+    Аудитории, свободные на всех указанных парах.
+    Учитываются аудитории из уже загруженных лент групп, преподавателей и аудиторий.
+    """
+    df = parse_date_param(day, occupancy_index.today())
+    _check_period(df, df)
+    mask = _pairs_mask(pair)
+    rooms = occupancy_index.free_rooms(df, mask, campus)
+    if rooms is None:
+        raise _out_of_period()
+    rooms.sort(key=lambda room: (room.campus, room.number))
+    return FreeRoomsResponse(
+        date=df,
+        pairs=_pairs(mask),
+        campus=campus,
+        rooms=rooms,
+        indexed_feeds=len(occupancy_index),
+    )
+
+
+@get("/api/free-slots")
+async def get_free_slots(
+    entity: Annotated[list[str], Parameter(description="Сущности в виде тип:id, например 1:708")],
+    date_from: str | None = None,
+    date_to: str | None = None,
+) -> FreeSlotsResponse:
+    """
+    Пары, свободные одновременно у всех указанных групп, преподавателей и аудиторий.
+    Ленты сущностей загружаются (или берутся из кеша) и индексируются перед ответом.
+    """
+    try:
+        keys = list(dict.fromkeys(key for value in entity for key in parse_entities(value)))
+        refs = [EntityRef(type=ScheduleTarget(t), id=i) for t, i in keys]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Сущность задаётся как тип:id, тип — 1, 2 или 3")
+    if not keys or len(keys) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Нужно от 1 до {settings.batch_max_items} сущностей",
+        )
+    today = occupancy_index.today()
+    df = parse_date_param(date_from, today)
+    dt = parse_date_param(date_to, today)
+    _check_period(df, dt)
+
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+
+    async def load(key: tuple[int, int]) -> None:
+        async with semaphore:
+            feed = await feed_cache.get(*key)
+            await occupancy_index.ensure(key, feed)
+
+    await asyncio.gather(*(load(key) for key in keys))
+    # Пока загружались ленты, период индекса мог сдвинуться
+    free = occupancy_index.common_free(keys, df, dt)
+    if free is None:
+        raise _out_of_period()
+    return FreeSlotsResponse(
+        entities=refs,
+        days=[FreeDay(date=day, pairs=_pairs(mask)) for day, mask in free],
+        date_from=df,
+        date_to=dt,
+    )
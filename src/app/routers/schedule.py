@@ -2,25 +2,259 @@
 Роутер расписания и номера недели.
 """
 
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Callable
 from datetime import date
 from typing import Any
+from urllib.parse import quote
 
-from cachetools import TTLCache
-from litestar import get
+import httpx
+from litestar import MediaType, Response, get, post
+from litestar.response import Stream
 from litestar.exceptions import HTTPException
+from pydantic import BaseModel
 
 from litestar.params import Parameter
 from typing import Annotated
 
-from app.connectors import ScheduleConnector
+from app.cache import Feed
+from app.connectors import (
+    Priority,
+    UpstreamUnavailableError,
+    is_upstream_failure,
+    upstream_priority,
+)
 from app.config import settings
-from app.parsers import ICalParser
-from app.schemas.schedule import MatchedEntity, ScheduleByNameResponse, ScheduleResponse
+from app.headers import feed_headers, not_modified, validators
+from app.metrics import RESPONSE_SIZE, ServerTiming
+from app.parsers import LessonRecord, encode_lesson, encode_lessons
+from app.schemas.schedule import (
+    BatchScheduleItem,
+    BatchScheduleRequest,
+    BatchScheduleResponse,
+    BatchScheduleResult,
+    MatchedEntity,
+    ScheduleByNameResponse,
+    ScheduleResponse,
+)
 from app.schemas.search import ScheduleTarget
+from app.services import find_entities
+from app.state import (
+    academic_calendar,
+    feed_cache,
+    parse_executor,
+    prefetcher,
+    response_cache,
+    reverse_index,
+)
 from app.types import parse_date_param
 
-_ical_cache: TTLCache = TTLCache(maxsize=512, ttl=settings.cache_ttl)
-_parser = ICalParser()
+logger = logging.getLogger("app.schedule")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Сколько занятий кодировать в один фрагмент потокового ответа
+_NDJSON_CHUNK = 256
+
+
+async def _period(date_from: str | None, date_to: str | None, week: int | None) -> tuple[date, date]:
+    """Период запроса: даты (по умолчанию — сегодня) или учебная неделя текущего периода."""
+    if week is None:
+        today = date.today()
+        return parse_date_param(date_from, today), parse_date_param(date_to, today)
+    if date_from is not None or date_to is not None:
+        raise HTTPException(status_code=400, detail="week указывается без date_from и date_to")
+    return await _week_dates(week)
+
+
+async def _week_dates(week: int) -> tuple[date, date]:
+    """Понедельник и воскресенье учебной недели week текущего периода."""
+    period = await academic_calendar.resolve(academic_calendar.today())
+    if period is None:
+        raise HTTPException(status_code=503, detail="Учебный календарь на сегодня неизвестен")
+    dates = period.week_dates(week)
+    if dates is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"В текущем периоде недели с 1 по {period.week(period.end)}",
+        )
+    return dates
+
+
+async def _load_lessons(
+    schedule_type: int, entity_id: int, df: date, dt: date
+) -> tuple[Feed, list[LessonRecord]]:
+    """Возвращает ленту сущности и её занятия за период."""
+    feed = await feed_cache.get(schedule_type, entity_id)
+    lessons = await parse_executor.lessons((schedule_type, entity_id), feed, df, dt)
+    prefetcher.record_request(schedule_type, entity_id)
+    return feed, lessons
+
+
+def _is_relative(date_from: str | None, date_to: str | None, week: int | None) -> bool:
+    """Период запроса считается от текущей даты."""
+    return week is not None or date_from is None or date_to is None
+
+
+def _encode(model: BaseModel, lessons: list[LessonRecord]) -> bytes:
+    """
+    Кодирует ответ: model собрана с пустым списком lessons, массив занятий
+    кодируется из записей напрямую и подставляется на его место.
+    """
+    # В строковых значениях кавычки экранированы, так что совпадение только одно — само поле
+    head, tail = model.model_dump_json().split('"lessons":[]', 1)
+    return f'{head}"lessons":{encode_lessons(lessons)}{tail}'.encode()
+
+
+def _wants_ndjson(accept: str | None) -> bool:
+    return accept is not None and NDJSON_MEDIA_TYPE in accept
+
+
+async def _aiter(items: list[LessonRecord]) -> AsyncIterator[LessonRecord]:
+    for item in items:
+        yield item
+
+
+async def _ndjson(lessons: AsyncIterator[LessonRecord], endpoint: str) -> AsyncIterator[bytes]:
+    """Занятия по одному JSON-объекту на строку, фрагментами по _NDJSON_CHUNK."""
+    chunk: list[str] = []
+    size = 0
+    async for lesson in lessons:
+        chunk.append(encode_lesson(lesson))
+        if len(chunk) >= _NDJSON_CHUNK:
+            data = ("\n".join(chunk) + "\n").encode()
+            size += len(data)
+            yield data
+            chunk.clear()
+    if chunk:
+        data = ("\n".join(chunk) + "\n").encode()
+        size += len(data)
+        yield data
+    RESPONSE_SIZE.observe(size, endpoint)
+
+
+async def _schedule_response(
+    variant: tuple,
+    schedule_type: int,
+    entity_id: int,
+    df: date,
+    dt: date,
+    build: Callable[[], BaseModel],
+    if_none_match: str | None,
+    if_modified_since: str | None,
+    accept: str | None,
+    extra_headers: dict[str, str] | None = None,
+    relative: bool = False,
+) -> Response:
+    """
+    Ответ с расписанием сущности за период.
+
+    Если клиент прислал совпадающий валидатор — 304 без разбора ленты.
+    При Accept: application/x-ndjson занятия отдаются потоком, по строке на занятие,
+    а поля обёртки (кроме периода) — в extra_headers. relative — см. validators.
+    Иначе тело берётся из кеша ответов или кодируется один раз: build возвращает
+    модель ответа без занятий, занятия подставляются из записей индекса.
+    Этапы fetch/parse/serialize попадают в заголовок Server-Timing и метрики.
+    Расписание преподавателя или аудитории может быть собрано из обратного индекса —
+    см. _use_reverse_index и _reverse_index_response.
+    Сущность учитывается в популярности для прогрева, только когда расписание получено.
+    """
+    endpoint = variant[0]
+    timing = ServerTiming(endpoint)
+    key = (schedule_type, entity_id)
+    if settings.reverse_index == "prefer" and await _use_reverse_index(key, complete=True):
+        prefetcher.record_request(schedule_type, entity_id)
+        return _reverse_index_response(endpoint, key, df, dt, build, accept, extra_headers, timing)
+    with timing.measure("fetch"):
+        try:
+            feed = await feed_cache.get(schedule_type, entity_id)
+        except Exception as e:
+            fallback = settings.reverse_index != "off" and await _use_reverse_index(key)
+            if not (fallback and (isinstance(e, UpstreamUnavailableError) or is_upstream_failure(e))):
+                raise
+            feed = None
+    prefetcher.record_request(schedule_type, entity_id)
+    if feed is None:
+        return _reverse_index_response(endpoint, key, df, dt, build, accept, extra_headers, timing)
+    stream = _wants_ndjson(accept)
+    variant = (*variant, schedule_type, entity_id, df, dt, stream)
+    headers = (
+        validators(feed, variant, relative)
+        | feed_headers(feed)
+        | (extra_headers or {})
+        | {"Vary": "Accept"}
+    )
+    if not_modified(headers, if_none_match, if_modified_since):
+        return Response(b"", status_code=304, headers=headers | timing.header())
+
+    if stream:
+        lessons = parse_executor.iter_lessons((schedule_type, entity_id), feed, df, dt)
+        return Stream(
+            _ndjson(lessons, endpoint),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers | timing.header(),
+        )
+
+    cache_key = (*variant, feed.digest)
+    body = response_cache.get(cache_key)
+    if body is None:
+        with timing.measure("parse"):
+            lessons = await parse_executor.lessons((schedule_type, entity_id), feed, df, dt)
+        with timing.measure("serialize"):
+            body = _encode(build(), lessons)
+        response_cache.set(cache_key, body)
+    else:
+        timing.mark("cache", "hit")
+    RESPONSE_SIZE.observe(len(body), endpoint)
+    return Response(body, media_type=MediaType.JSON, headers=headers | timing.header())
+
+
+async def _use_reverse_index(key: tuple[int, int], complete: bool = False) -> bool:
+    """
+    Можно ли ответить из обратного индекса: для преподавателя или аудитории,
+    чьей ленты нет в кеше, если в индексе есть их занятия (complete — и все их группы).
+    """
+    if key[0] == ScheduleTarget.GROUP or await feed_cache.digest(*key) is not None:
+        return False
+    return reverse_index.is_complete(key) if complete else reverse_index.has(key)
+
+
+def _reverse_index_response(
+    endpoint: str,
+    key: tuple[int, int],
+    df: date,
+    dt: date,
+    build: Callable[[], BaseModel],
+    accept: str | None,
+    extra_headers: dict[str, str] | None,
+    timing: ServerTiming,
+) -> Response:
+    """
+    Расписание из занятий, найденных в лентах групп. X-Schedule-Source: reverse-index;
+    X-Schedule-Partial: true — если полнота не гарантирована (ленты сущности ещё не было
+    или не все её группы в кеше). Без валидаторов: у ответа нет ленты-источника.
+    """
+    timing.mark("source", "reverse-index")
+    with timing.measure("parse"):
+        lessons = reverse_index.lessons(key, df, dt)
+    headers = (
+        {
+            "X-Schedule-Source": "reverse-index",
+            "X-Schedule-Partial": "false" if reverse_index.is_complete(key) else "true",
+        }
+        | (extra_headers or {})
+        | {"Vary": "Accept"}
+    )
+    if _wants_ndjson(accept):
+        return Stream(
+            _ndjson(_aiter(lessons), endpoint),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers | timing.header(),
+        )
+    with timing.measure("serialize"):
+        body = _encode(build(), lessons)
+    RESPONSE_SIZE.observe(len(body), endpoint)
+    return Response(body, media_type=MediaType.JSON, headers=headers | timing.header())
 
 
 @get("/api/schedule/{schedule_type:int}/{entity_id:int}")
@@ -29,26 +263,32 @@ async def get_schedule(
     entity_id: int,
     date_from: str | None = None,
     date_to: str | None = None,
-) -> ScheduleResponse:
-    """Получить расписание для группы/преподавателя/кабинета."""
-    today = date.today()
-    df = parse_date_param(date_from, today)
-    dt = parse_date_param(date_to, today)
-
-    cache_key = (schedule_type, entity_id)
-    if cache_key not in _ical_cache:
-        connector = ScheduleConnector()
-        ical_text = await connector.get_ical(schedule_type, entity_id)
-        _ical_cache[cache_key] = ical_text
-    else:
-        ical_text = _ical_cache[cache_key]
+    week: Annotated[int | None, Parameter(ge=1, description="Учебная неделя текущего периода")] = None,
+    if_none_match: Annotated[str | None, Parameter(header="If-None-Match")] = None,
+    if_modified_since: Annotated[str | None, Parameter(header="If-Modified-Since")] = None,
+    accept: Annotated[str | None, Parameter(header="Accept")] = None,
+) -> Response[ScheduleResponse]:
+    """
+    Получить расписание для группы/преподавателя/кабинета.
+    С Accept: application/x-ndjson — потоком, по занятию на строку.
+    """
+    df, dt = await _period(date_from, date_to, week)
 
-    lessons = _parser.parse(ical_text, df, dt)
-
-    return ScheduleResponse(
-        lessons=lessons,
-        date_from=df,
-        date_to=dt,
+    return await _schedule_response(
+        ("schedule",),
+        schedule_type,
+        entity_id,
+        df,
+        dt,
+        lambda: ScheduleResponse(
+            lessons=[],
+            date_from=df,
+            date_to=dt,
+        ),
+        if_none_match,
+        if_modified_since,
+        accept,
+        relative=_is_relative(date_from, date_to, week),
     )
 
 
@@ -58,19 +298,18 @@ async def get_schedule_by_name(
     date_from: str | None = None,
     date_to: str | None = None,
     target: ScheduleTarget | None = None,
-) -> ScheduleByNameResponse:
-    """Получить расписание по названию — без предварительного поиска ID."""
-    today = date.today()
-    df = parse_date_param(date_from, today)
-    dt = parse_date_param(date_to, today)
-
-    connector = ScheduleConnector()
-    raw = await connector.search(query=q, limit=100)
-
-    results = raw.get("data", [])
-    if target is not None:
-        results = [r for r in results if r.get("scheduleTarget") == int(target)]
+    week: Annotated[int | None, Parameter(ge=1, description="Учебная неделя текущего периода")] = None,
+    if_none_match: Annotated[str | None, Parameter(header="If-None-Match")] = None,
+    if_modified_since: Annotated[str | None, Parameter(header="If-Modified-Since")] = None,
+    accept: Annotated[str | None, Parameter(header="Accept")] = None,
+) -> Response[ScheduleByNameResponse]:
+    """
+    Получить расписание по названию — без предварительного поиска ID.
+    С Accept: application/x-ndjson — потоком; найденная сущность в заголовках X-Matched-*.
+    """
+    df, dt = await _period(date_from, date_to, week)
 
+    results = await find_entities(q, limit=100, target=int(target) if target is not None else None)
     if not results:
         raise HTTPException(status_code=404, detail=f"Ничего не найдено по запросу «{q}»")
 
@@ -79,29 +318,120 @@ async def get_schedule_by_name(
     schedule_type: int = matched["scheduleTarget"]
     matched_target = ScheduleTarget(schedule_type)
 
-    cache_key = (schedule_type, entity_id)
-    if cache_key not in _ical_cache:
-        ical_text = await connector.get_ical(schedule_type, entity_id)
-        _ical_cache[cache_key] = ical_text
-    else:
-        ical_text = _ical_cache[cache_key]
-
-    lessons = _parser.parse(ical_text, df, dt)
-
-    return ScheduleByNameResponse(
-        matched=MatchedEntity(
-            id=entity_id,
-            title=matched["targetTitle"],
-            target=matched_target,
+    return await _schedule_response(
+        ("by-name", matched["targetTitle"]),
+        schedule_type,
+        entity_id,
+        df,
+        dt,
+        lambda: ScheduleByNameResponse(
+            matched=MatchedEntity(
+                id=entity_id,
+                title=matched["targetTitle"],
+                target=matched_target,
+            ),
+            lessons=[],
+            date_from=df,
+            date_to=dt,
         ),
-        lessons=lessons,
-        date_from=df,
-        date_to=dt,
+        if_none_match,
+        if_modified_since,
+        accept,
+        {
+            "X-Matched-Id": str(entity_id),
+            # Название может быть не-ASCII, поэтому в заголовке оно percent-encoded (UTF-8)
+            "X-Matched-Title": quote(matched["targetTitle"]),
+            "X-Matched-Target": str(int(matched_target)),
+        },
+        relative=_is_relative(date_from, date_to, week),
     )
 
 
+async def _batch_item(
+    item: BatchScheduleItem,
+    df: date,
+    dt: date,
+    semaphore: asyncio.Semaphore,
+) -> BatchScheduleResult:
+    """Расписание одной сущности пакетного запроса; ошибки — в поле error."""
+    result = BatchScheduleResult(query=item.query, type=item.type, id=item.id)
+    try:
+        async with semaphore:
+            if item.query is not None:
+                found = await find_entities(
+                    item.query,
+                    limit=1,
+                    target=int(item.target) if item.target is not None else None,
+                )
+                if not found:
+                    result.error = f"Ничего не найдено по запросу «{item.query}»"
+                    return result
+                result.id = found[0]["id"]
+                result.type = ScheduleTarget(found[0]["scheduleTarget"])
+                result.title = found[0]["targetTitle"]
+            _, records = await _load_lessons(int(result.type), result.id, df, dt)
+            result.lessons = [record.to_lesson() for record in records]
+    except httpx.HTTPStatusError as e:
+        result.error = f"Upstream ответил {e.response.status_code}"
+    except httpx.HTTPError as e:
+        result.error = f"Upstream недоступен: {type(e).__name__}"
+    except UpstreamUnavailableError as e:
+        result.error = str(e)
+    except Exception as e:
+        # Ошибка разбора или проверки одной ленты не должна ронять весь пакет
+        logger.exception("Пакетный запрос: не удалось получить расписание %s", item)
+        result.lessons = []
+        result.error = f"Не удалось получить расписание: {type(e).__name__}"
+    return result
+
+
+@post("/api/schedule/batch", status_code=200)
+async def get_schedule_batch(data: BatchScheduleRequest) -> BatchScheduleResponse:
+    """
+    Расписание сразу для нескольких сущностей за один период.
+    Недостающие в кеше ленты загружаются параллельно, не более batch_concurrency одновременно,
+    с приоритетом ниже одиночных запросов расписания.
+    """
+    if len(data.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не больше {settings.batch_max_items} сущностей за запрос",
+        )
+    if data.week is not None:
+        if data.date_from is not None or data.date_to is not None:
+            raise HTTPException(status_code=400, detail="week указывается без date_from и date_to")
+        df, dt = await _week_dates(data.week)
+    else:
+        today = date.today()
+        df = data.date_from or today
+        dt = data.date_to or today
+
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+    with upstream_priority(Priority.BATCH):
+        results = await asyncio.gather(
+            *(_batch_item(item, df, dt, semaphore) for item in data.items)
+        )
+    return BatchScheduleResponse(results=list(results), date_from=df, date_to=dt)
+
+
 @get("/api/week")
-async def get_week() -> dict[str, Any]:
-    """Получить номер текущей учебной недели."""
-    connector = ScheduleConnector()
-    return await connector.get_week_number()
+async def get_week(
+    day: Annotated[str | None, Parameter(query="date", description="Дата (по умолчанию — сегодня)")] = None,
+) -> dict[str, Any]:
+    """
+    Получить номер учебной недели (по умолчанию — текущей).
+    Считается по учебному календарю, который сверяется с upstream раз в сутки.
+    """
+    today = academic_calendar.today()
+    df = parse_date_param(day, today)
+    period = await academic_calendar.resolve(df)
+    if period is not None:
+        return academic_calendar.describe(period, df)
+    if df != today:
+        raise HTTPException(status_code=404, detail=f"Учебный период на {df.isoformat()} неизвестен")
+    # Upstream сообщил период, в который сегодня не попадает, — отдаём его ответ как есть,
+    # из сегодняшней сверки, а не новым запросом
+    reported = academic_calendar.reported()
+    if reported is None:
+        raise HTTPException(status_code=503, detail="Учебный календарь на сегодня неизвестен")
+    return reported
@@ -7,8 +7,8 @@ from typing import Annotated
 from litestar import get
 from litestar.params import Parameter
 
-from app.connectors import ScheduleConnector
 from app.schemas.search import ScheduleTarget, SearchResponse, SearchResultItem
+from app.services import find_entities
 
 
 @get("/api/search")
@@ -17,11 +17,8 @@ async def search(
     limit: int = 100,
 ) -> SearchResponse:
     """Поиск групп, преподавателей и кабинетов."""
-    connector = ScheduleConnector()
-    raw = await connector.search(query=q, limit=limit)
-
     items: list[SearchResultItem] = []
-    for item in raw.get("data", []):
+    for item in await find_entities(q, limit=limit, fuzzy=True):
         try:
             target = ScheduleTarget(item["scheduleTarget"])
         except (ValueError, KeyError):
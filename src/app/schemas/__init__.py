@@ -1,5 +1,17 @@
 from .search import ScheduleTarget, SearchResultItem, SearchResponse
-from .schedule import PersonRef, RoomRef, Lesson, ScheduleResponse, MatchedEntity, ScheduleByNameResponse
+from .occupancy import EntityRef, FreeDay, FreeRoomsResponse, FreeSlotsResponse, Pair
+from .schedule import (
+    PersonRef,
+    RoomRef,
+    Lesson,
+    ScheduleResponse,
+    MatchedEntity,
+    ScheduleByNameResponse,
+    BatchScheduleItem,
+    BatchScheduleRequest,
+    BatchScheduleResult,
+    BatchScheduleResponse,
+)
 
 __all__ = [
     "ScheduleTarget",
@@ -10,4 +22,13 @@ __all__ = [
     "Lesson",
     "ScheduleResponse",
     "ScheduleByNameResponse",
+    "BatchScheduleItem",
+    "BatchScheduleRequest",
+    "BatchScheduleResult",
+    "BatchScheduleResponse",
+    "EntityRef",
+    "FreeDay",
+    "FreeRoomsResponse",
+    "FreeSlotsResponse",
+    "Pair",
 ]
@@ -0,0 +1,41 @@
+"""
+Схемы для поиска свободных аудиторий и общего свободного времени.
+"""
+
+from datetime import date
+
+from pydantic import BaseModel
+
+from app.schemas.schedule import RoomRef
+from app.schemas.search import ScheduleTarget
+
+
+class Pair(BaseModel):
+    number: int         # 1…7
+    time_start: str     # "09:00"
+    time_end: str       # "10:30"
+
+
+class FreeRoomsResponse(BaseModel):
+    date: date
+    pairs: list[Pair]
+    campus: str | None
+    rooms: list[RoomRef]
+    indexed_feeds: int  # сколько лент учтено в индексе занятости
+
+
+class EntityRef(BaseModel):
+    type: ScheduleTarget
+    id: int
+
+
+class FreeDay(BaseModel):
+    date: date
+    pairs: list[Pair]
+
+
+class FreeSlotsResponse(BaseModel):
+    entities: list[EntityRef]
+    days: list[FreeDay]
+    date_from: date
+    date_to: date
@@ -3,10 +3,12 @@
 """
 
 from datetime import date
+from typing import Self
 
-from pydantic import BaseModel, computed_field
+from pydantic import BaseModel, Field, computed_field, model_validator
 
 from app.schemas.search import ScheduleTarget
+from app.types import FlexDate
 
 
 class PersonRef(BaseModel):
@@ -54,3 +56,40 @@ class ScheduleByNameResponse(BaseModel):
     lessons: list[Lesson]
     date_from: date
     date_to: date
+
+
+class BatchScheduleItem(BaseModel):
+    """Сущность в пакетном запросе: либо type + id, либо query (+ target)."""
+    type: ScheduleTarget | None = None
+    id: int | None = None
+    query: str | None = None
+    target: ScheduleTarget | None = None
+
+    @model_validator(mode="after")
+    def _check_identity(self) -> Self:
+        if self.query is None and (self.type is None or self.id is None):
+            raise ValueError("Нужно указать либо type и id, либо query")
+        return self
+
+
+class BatchScheduleRequest(BaseModel):
+    items: list[BatchScheduleItem] = Field(min_length=1)
+    date_from: FlexDate | None = None
+    date_to: FlexDate | None = None
+    # Номер учебной недели текущего периода — вместо date_from/date_to
+    week: int | None = Field(default=None, ge=1)
+
+
+class BatchScheduleResult(BaseModel):
+    query: str | None = None
+    type: ScheduleTarget | None = None
+    id: int | None = None
+    title: str | None = None
+    lessons: list[Lesson] = []
+    error: str | None = None
+
+
+class BatchScheduleResponse(BaseModel):
+    results: list[BatchScheduleResult]
+    date_from: date
+    date_to: date
@@ -0,0 +1,21 @@
+from .academic_calendar import AcademicCalendar, AcademicPeriod
+from .changes import ChangeFeed
+from .occupancy import PAIRS, OccupancyIndex
+from .prefetch import Prefetcher, parse_entities, parse_times
+from .reverse_index import ReverseIndex
+from .search_index import SearchIndex, find_entities, search_index
+
+__all__ = [
+    "AcademicCalendar",
+    "AcademicPeriod",
+    "ChangeFeed",
+    "PAIRS",
+    "OccupancyIndex",
+    "Prefetcher",
+    "ReverseIndex",
+    "SearchIndex",
+    "find_entities",
+    "parse_entities",
+    "parse_times",
+    "search_index",
+]
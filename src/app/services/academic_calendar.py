@@ -0,0 +1,173 @@
+"""
+Учебный календарь: номер недели по дате без запроса к upstream.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+from time import monotonic
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from app.cache import Feed
+from app.connectors import ScheduleConnector
+
+logger = logging.getLogger("app.academic_calendar")
+
+FeedKey = tuple[int, int]
+
+# Маркер недели в ленте — all-day событие с SUMMARY «N неделя»
+_MARKER_START = re.compile(r"^DTSTART;(?:[^:\r\n]*;)?VALUE=DATE(?:;[^:\r\n]*)?:(\d{8})\r?$", re.M)
+_MARKER_SUMMARY = re.compile(r"^SUMMARY:\s*(\d{1,2})\s*неделя\s*\r?$", re.M | re.I)
+
+
+def monday(day: date) -> date:
+    """Понедельник недели, в которую попадает дата."""
+    return day - timedelta(days=day.weekday())
+
+
+def week_markers(ical_text: str) -> list[tuple[date, int]]:
+    """Маркеры недель ленты: (дата, номер недели). Лента не разбирается целиком."""
+    markers = []
+    for match in _MARKER_START.finditer(ical_text):
+        begin = ical_text.rfind("BEGIN:VEVENT", 0, match.start())
+        end = ical_text.find("END:VEVENT", match.end())
+        if begin < 0 or end < 0:
+            continue
+        summary = _MARKER_SUMMARY.search(ical_text, begin, end)
+        if summary is None:
+            continue
+        markers.append((datetime.strptime(match[1], "%Y%m%d").date(), int(summary[1])))
+    return markers
+
+
+@dataclass(slots=True, frozen=True)
+class AcademicPeriod:
+    """Учебный период [start, end]; первая неделя начинается в понедельник first_monday."""
+    first_monday: date
+    start: date
+    end: date
+    period_type: str = "Semester"
+
+    def contains(self, day: date) -> bool:
+        return self.start <= day <= self.end
+
+    def week(self, day: date) -> int:
+        """Номер недели, в которую попадает дата."""
+        return (day - self.first_monday).days // 7 + 1
+
+    def week_dates(self, number: int) -> tuple[date, date] | None:
+        """Понедельник и воскресенье недели number, если она есть в периоде."""
+        first = self.first_monday + timedelta(weeks=number - 1)
+        if number < 1 or first > self.end:
+            return None
+        return first, first + timedelta(days=6)
+
+
+class AcademicCalendar:
+    """
+    Номер учебной недели считается на месте по известным учебным периодам.
+
+    Периоды берутся из ответа upstream weeknumber — он запрашивается не чаще раза
+    в сутки, — и из маркеров недель «N неделя» в лентах, проходящих через кеш
+    (on_feed — слушатель FeedCache.add_listener). Маркеры выручают, когда upstream
+    недоступен. Даты — по часовому поясу университета tz.
+    """
+
+    # Пауза перед новой сверкой с upstream после ошибки
+    RETRY_AFTER = 300.0
+
+    def __init__(self, tz: str = "Europe/Moscow") -> None:
+        self.tz = ZoneInfo(tz)
+        self._periods: list[AcademicPeriod] = []
+        self._markers: dict[date, AcademicPeriod] = {}
+        self._synced_on: date | None = None
+        self._reported: dict[str, Any] | None = None
+        self._retry_at = 0.0
+
+    def today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    def period(self, day: date) -> AcademicPeriod | None:
+        """Известный период, в который попадает дата: сначала по upstream, затем по маркерам."""
+        for period in (*self._periods, *self._markers.values()):
+            if period.contains(day):
+                return period
+        return None
+
+    async def resolve(self, day: date) -> AcademicPeriod | None:
+        """
+        Период для даты; перед этим — сверка с upstream, если сегодня её ещё не было.
+        Ошибка сверки не пробрасывается: None, если период неизвестен.
+        """
+        await self._sync(self.today())
+        return self.period(day)
+
+    def reported(self) -> dict[str, Any] | None:
+        """Ответ upstream weeknumber, полученный при сегодняшней сверке; None — сверки сегодня не было."""
+        return self._reported if self._synced_on == self.today() else None
+
+    def describe(self, period: AcademicPeriod, day: date) -> dict[str, Any]:
+        """Номер недели в формате ответа upstream weeknumber."""
+        return {
+            "weekNumber": period.week(day),
+            "schedulePeriodType": period.period_type,
+            "start": self._instant(period.start, time.min),
+            "end": self._instant(period.end, time(23, 59, 59)),
+        }
+
+    def learn(self, raw: dict[str, Any], today: date) -> AcademicPeriod:
+        """Запоминает период из ответа upstream weeknumber, полученного сегодня."""
+        start = datetime.fromisoformat(raw["start"]).astimezone(self.tz).date()
+        end = datetime.fromisoformat(raw["end"]).astimezone(self.tz).date()
+        number = int(raw["weekNumber"])
+        # Номер недели upstream надёжнее даты начала: семестр может начаться не с понедельника
+        first_monday = monday(today) - timedelta(weeks=number - 1) if number > 0 else monday(start)
+        period = AcademicPeriod(
+            first_monday=first_monday,
+            start=start,
+            end=end,
+            period_type=str(raw.get("schedulePeriodType") or "Semester"),
+        )
+        self._periods = [p for p in self._periods if p.start != start] + [period]
+        return period
+
+    def learn_markers(self, markers: list[tuple[date, int]]) -> None:
+        """Периоды по маркерам недель: маркеры группируются по понедельнику первой недели."""
+        groups: dict[date, list[date]] = defaultdict(list)
+        for day, number in markers:
+            groups[monday(day) - timedelta(weeks=number - 1)].append(day)
+        for first_monday, days in groups.items():
+            known = self._markers.get(first_monday)
+            start, end = min(days), monday(max(days)) + timedelta(days=6)
+            if known is not None:
+                start, end = min(start, known.start), max(end, known.end)
+            self._markers[first_monday] = AcademicPeriod(first_monday=first_monday, start=start, end=end)
+
+    def on_feed(self, key: FeedKey, feed: Feed) -> None:
+        """Слушатель FeedCache: маркеры недель ищутся, пока текущий период по ним неизвестен."""
+        today = self.today()
+        if any(period.contains(today) for period in self._markers.values()):
+            return
+        markers = week_markers(feed.text)
+        if markers:
+            self.learn_markers(markers)
+
+    async def _sync(self, today: date) -> None:
+        if self._synced_on == today or monotonic() < self._retry_at:
+            return
+        try:
+            raw = await ScheduleConnector().get_week_number()
+            self.learn(raw, today)
+        except Exception as e:
+            # Без сверки обходимся известными периодами; если их нет, resolve вернёт None
+            self._retry_at = monotonic() + self.RETRY_AFTER
+            logger.warning("Не удалось сверить учебный календарь с upstream: %r", e)
+            return
+        self._reported = raw
+        self._synced_on = today
+
+    def _instant(self, day: date, moment: time) -> str:
+        return datetime.combine(day, moment, self.tz).astimezone(UTC).isoformat()
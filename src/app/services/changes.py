@@ -0,0 +1,141 @@
+"""
+Поток изменений расписания: события о добавленных и удалённых занятиях для подписчиков.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+
+from app.cache import Feed, FeedCache
+from app.connectors import Priority, upstream_priority
+from app.parsers import LessonRecord, ParseExecutor, encode_lesson
+
+from .feed_index import FeedDerivedIndex, FeedKey
+
+logger = logging.getLogger("app.changes")
+
+
+class _Channel:
+    """Подписчики одной сущности и последние события для неё (уже закодированные кадры SSE)."""
+
+    __slots__ = ("subscribers", "events", "last_id", "changed")
+
+    def __init__(self, history: int) -> None:
+        self.subscribers = 0
+        self.events: deque[tuple[int, bytes]] = deque(maxlen=history)
+        self.last_id = 0
+        self.changed = asyncio.Event()
+
+    def publish(self, event_id: int, frame: bytes) -> None:
+        self.events.append((event_id, frame))
+        self.last_id = event_id
+        # Одно set() будит всех ждущих; следующие ждут уже новое событие
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class ChangeFeed(FeedDerivedIndex):
+    """
+    Изменения расписаний сущностей, на которые кто-то подписан.
+
+    Для каждой такой сущности хранится набор её занятий за период horizon()
+    (в виде JSON-фрагментов). Когда лента меняется (on_feed — слушатель
+    FeedCache), новый набор сравнивается с прежним, и подписчикам уходит одно
+    событие change: {"type", "id", "added": [...], "removed": [...]}.
+    Кадр кодируется один раз и отдаётся всем подписчикам сущности.
+
+    Пока у сущности есть подписчики, run_forever сверяет её ленту с upstream
+    раз в interval секунд — один условный запрос вместо опроса каждым клиентом.
+    """
+
+    # Сколько последних событий сущности хранить для переподключения с Last-Event-ID
+    HISTORY = 16
+    # Одновременных сверок лент в run_forever
+    CONCURRENCY = 8
+
+    def __init__(self, cache: FeedCache, executor: ParseExecutor, heartbeat: float = 15.0) -> None:
+        super().__init__(executor)
+        self._cache = cache
+        self.heartbeat = heartbeat
+        self._channels: dict[FeedKey, _Channel] = {}
+        self._snapshots: dict[FeedKey, frozenset[str]] = {}
+        self._last_id = 0
+        self.published = 0
+
+    def subscribers(self) -> int:
+        return sum(channel.subscribers for channel in self._channels.values())
+
+    def on_feed(self, key: FeedKey, feed: Feed) -> None:
+        if key in self._channels:
+            super().on_feed(key, feed)
+
+    async def subscribe(self, key: FeedKey, feed: Feed, last_event_id: int | None = None) -> AsyncIterator[bytes]:
+        """
+        Кадры SSE для подписчика сущности key, пока он не отключится.
+        feed — текущая лента: её занятия — точка отсчёта для изменений.
+        С last_event_id сначала повторяются пропущенные события из истории.
+        """
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = _Channel(self.HISTORY)
+        channel.subscribers += 1
+        try:
+            await self.ensure(key, feed)
+            cursor = channel.last_id if last_event_id is None else last_event_id
+            yield f"retry: {int(self.heartbeat * 1000)}\n\n".encode()
+            while True:
+                for event_id, frame in channel.events:
+                    if event_id > cursor:
+                        yield frame
+                        cursor = event_id
+                changed = channel.changed
+                try:
+                    await asyncio.wait_for(changed.wait(), self.heartbeat)
+                except TimeoutError:
+                    yield b": ping\n\n"
+        finally:
+            channel.subscribers -= 1
+            if channel.subscribers == 0 and self._channels.get(key) is channel:
+                del self._channels[key]
+                self._snapshots.pop(key, None)
+                self._versions.pop(key, None)
+
+    def _apply(self, key: FeedKey, lessons: list[LessonRecord]) -> None:
+        current = frozenset(map(encode_lesson, lessons))
+        previous = self._snapshots.get(key)
+        channel = self._channels.get(key)
+        if channel is None:
+            return
+        self._snapshots[key] = current
+        if previous is None or previous == current:
+            return
+        added = ",".join(sorted(current - previous))
+        removed = ",".join(sorted(previous - current))
+        # Идентификатор — миллисекунды, но строго по возрастанию: переживает перезапуск
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1_000_000)
+        data = f'{{"type":{key[0]},"id":{key[1]},"added":[{added}],"removed":[{removed}]}}'
+        channel.publish(self._last_id, f"id: {self._last_id}\nevent: change\ndata: {data}\n\n".encode())
+        self.published += 1
+
+    def _reset(self) -> None:
+        self._snapshots.clear()
+
+    async def run_forever(self, interval: float) -> None:
+        """Сверка лент сущностей с подписчиками: каждая — не реже раза в interval секунд."""
+        semaphore = asyncio.Semaphore(self.CONCURRENCY)
+        # warm() обновляет ленту, если её возраст + min_ttl больше ttl, то есть старше interval
+        min_ttl = self._cache.ttl - interval
+
+        async def warm(key: FeedKey) -> None:
+            async with semaphore:
+                try:
+                    await self._cache.warm(*key, min_ttl=min_ttl)
+                except Exception as e:
+                    logger.warning("Не удалось сверить ленту %s: %r", key, e)
+
+        with upstream_priority(Priority.BACKGROUND):
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.gather(*(warm(key) for key in list(self._channels)))
@@ -0,0 +1,110 @@
+"""
+Основа индексов, которые строятся из лент, проходящих через кеш.
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.cache import Feed
+from app.parsers import LessonRecord, ParseExecutor, semester_bounds
+
+logger = logging.getLogger("app.feed_index")
+
+FeedKey = tuple[int, int]
+
+
+def horizon(today: date) -> tuple[date, date]:
+    """Период, который покрывают индексы: текущее и следующее полугодие."""
+    start, end = semester_bounds(today)
+    _, next_end = semester_bounds(end + timedelta(days=1))
+    return start, next_end
+
+
+class FeedDerivedIndex:
+    """
+    Индекс, пополняемый из лент: on_feed — слушатель FeedCache.add_listener.
+
+    Каждая версия ленты (digest) разбирается один раз за период horizon(), занятия
+    передаются в _apply. Когда начинается новое полугодие, период сдвигается,
+    индекс очищается (_reset) и заполняется заново по мере загрузки лент.
+    «Сегодня» считается по часовому поясу tz, как и в академическом календаре.
+    """
+
+    def __init__(self, executor: ParseExecutor, tz: str = "Europe/Moscow") -> None:
+        self._executor = executor
+        self.tz = ZoneInfo(tz)
+        self._start, self._end = horizon(self.today())
+        # Проиндексированная версия ленты: (digest, начало периода)
+        self._versions: dict[FeedKey, tuple[str, date]] = {}
+        self._pending: dict[FeedKey, asyncio.Task] = {}
+
+    def today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    @property
+    def period(self) -> tuple[date, date]:
+        return self._start, self._end
+
+    def __len__(self) -> int:
+        """Сколько лент проиндексировано."""
+        return len(self._versions)
+
+    def covers(self, day: date) -> bool:
+        self._roll(self.today())
+        return self._start <= day <= self._end
+
+    def on_feed(self, key: FeedKey, feed: Feed) -> None:
+        """Слушатель FeedCache: лента загружена или сверена с upstream."""
+        if self._is_current(key, feed) or key in self._pending:
+            return
+        task = asyncio.ensure_future(self._update_quietly(key, feed))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def ensure(self, key: FeedKey, feed: Feed) -> None:
+        """Индексирует ленту, если в индексе не её текущая версия."""
+        task = self._pending.get(key)
+        if task is not None:
+            await asyncio.shield(task)
+        if not self._is_current(key, feed):
+            await self.update(key, feed)
+
+    def _is_current(self, key: FeedKey, feed: Feed) -> bool:
+        self._roll(self.today())
+        return self._versions.get(key) == (feed.digest, self._start)
+
+    async def _update_quietly(self, key: FeedKey, feed: Feed) -> None:
+        try:
+            await self.update(key, feed)
+        except Exception as e:
+            logger.warning("%s: не удалось проиндексировать %s: %r", type(self).__name__, key, e)
+
+    async def update(self, key: FeedKey, feed: Feed) -> None:
+        """Пересчитывает вклад ленты сущности key."""
+        start, end = self._start, self._end
+        lessons = await self._executor.lessons(key, feed, start, end)
+        if (start, end) != (self._start, self._end):
+            # Пока шёл разбор, период индекса сменился — данные уже не подходят
+            return
+        self._apply(key, lessons)
+        self._versions[key] = (feed.digest, start)
+
+    def _roll(self, today: date) -> None:
+        start, end = horizon(today)
+        if start == self._start:
+            return
+        logger.info("%s: новый период %s — %s", type(self).__name__, start, end)
+        self._start, self._end = start, end
+        self._versions.clear()
+        self._reset()
+
+    def _days(self) -> int:
+        return self._end.toordinal() - self._start.toordinal() + 1
+
+    def _apply(self, key: FeedKey, lessons: list[LessonRecord]) -> None:
+        raise NotImplementedError
+
+    def _reset(self) -> None:
+        raise NotImplementedError
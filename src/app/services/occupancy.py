@@ -0,0 +1,185 @@
+"""
+Занятость групп, преподавателей и аудиторий по парам — для поиска свободного времени.
+"""
+
+from array import array
+from collections.abc import Iterable
+from datetime import date, timedelta
+from functools import lru_cache
+
+from app.parsers import LessonRecord, ParseExecutor
+from app.schemas.schedule import RoomRef
+from app.schemas.search import ScheduleTarget
+
+from .feed_index import FeedDerivedIndex, FeedKey
+
+# Расписание звонков РТУ МИРЭА: пары с первой по седьмую
+PAIRS: tuple[tuple[str, str], ...] = (
+    ("09:00", "10:30"),
+    ("10:40", "12:10"),
+    ("12:40", "14:10"),
+    ("14:20", "15:50"),
+    ("16:20", "17:50"),
+    ("18:00", "19:30"),
+    ("19:40", "21:10"),
+)
+ALL_PAIRS = (1 << len(PAIRS)) - 1
+
+
+@lru_cache(maxsize=1024)
+def pair_mask(time_start: str, time_end: str) -> int:
+    """Биты пар (бит 0 — первая пара), с которыми пересекается интервал "ЧЧ:ММ"–"ЧЧ:ММ"."""
+    mask = 0
+    for number, (start, end) in enumerate(PAIRS):
+        if time_start < end and start < time_end:
+            mask |= 1 << number
+    return mask
+
+
+def pairs_of(mask: int) -> list[int]:
+    """Номера пар (с 1) из битовой маски."""
+    return [number + 1 for number in range(len(PAIRS)) if mask >> number & 1]
+
+
+class OccupancyIndex(FeedDerivedIndex):
+    """
+    Занятость сущностей по дням: на каждый день периода индекса — байт,
+    в котором бит N означает «занят на паре N + 1».
+
+    Лента сущности задаёт её собственную занятость; кроме того, занятия
+    из лент групп и преподавателей отмечают занятость своих аудиторий — так
+    свободные аудитории видны, даже если их собственные ленты не загружались.
+    Если лента аудитории есть, она главнее данных из чужих лент.
+    Пересечение и объединение занятости — побитовые операции над байтами.
+    """
+
+    def __init__(self, executor: ParseExecutor, tz: str = "Europe/Moscow") -> None:
+        super().__init__(executor, tz)
+        # Собственная занятость сущностей, у которых проиндексирована лента
+        self._own: dict[FeedKey, bytearray] = {}
+        # Вклад ленты в занятость аудиторий: источник → аудитория → [день << 7 | маска, ...]
+        self._contrib: dict[FeedKey, dict[int, array]] = {}
+        # Аудитория → источники, в которых она встречается
+        self._sources: dict[int, set[FeedKey]] = {}
+        # Итоговая занятость аудиторий по чужим лентам
+        self._rooms_busy: dict[int, bytearray] = {}
+        self.rooms: dict[int, RoomRef] = {}
+
+    def _apply(self, key: FeedKey, lessons: list[LessonRecord]) -> None:
+        origin = self._start.toordinal()
+        own = self._empty_days()
+        rooms: dict[int, array] = {}
+        for lesson in lessons:
+            mask = pair_mask(lesson.time_start, lesson.time_end)
+            if not mask:
+                continue
+            day = lesson.date.toordinal() - origin
+            own[day] |= mask
+            room = lesson.details.room
+            if room is None:
+                continue
+            values = rooms.get(room.id)
+            if values is None:
+                values = rooms[room.id] = array("I")
+                self.rooms.setdefault(room.id, room)
+            values.append(day << 7 | mask)
+        if key[0] == ScheduleTarget.ROOM:
+            # Собственная лента аудитории — не чужой вклад, а её занятость
+            rooms.pop(key[1], None)
+        self._own[key] = own
+        self._set_contrib(key, rooms)
+
+    def _set_contrib(self, key: FeedKey, rooms: dict[int, array]) -> None:
+        previous = self._contrib.get(key, {})
+        if rooms:
+            self._contrib[key] = rooms
+        else:
+            self._contrib.pop(key, None)
+        for room_id in previous.keys() - rooms.keys():
+            self._sources[room_id].discard(key)
+        for room_id in rooms.keys() - previous.keys():
+            self._sources.setdefault(room_id, set()).add(key)
+        # Биты нельзя «вычесть»: где вклад ленты был раньше — пересобираем целиком,
+        # где он только добавился — дописываем поверх
+        for room_id in previous.keys():
+            self._merge_room(room_id)
+        for room_id in rooms.keys() - previous.keys():
+            busy = self._rooms_busy.get(room_id)
+            if busy is None:
+                busy = self._rooms_busy[room_id] = self._empty_days()
+            self._or_into(busy, rooms[room_id])
+
+    def _empty_days(self) -> bytearray:
+        return bytearray(self._days())
+
+    @staticmethod
+    def _or_into(busy: bytearray, values: array) -> None:
+        for value in values:
+            busy[value >> 7] |= value & ALL_PAIRS
+
+    def _merge_room(self, room_id: int) -> None:
+        busy = self._empty_days()
+        for source in self._sources.get(room_id, ()):
+            self._or_into(busy, self._contrib[source][room_id])
+        self._rooms_busy[room_id] = busy
+
+    def _reset(self) -> None:
+        self._own.clear()
+        self._contrib.clear()
+        self._sources.clear()
+        self._rooms_busy.clear()
+
+    def on_evict(self, key: FeedKey) -> None:
+        """
+        Слушатель вытеснения из FeedCache: собственная занятость сущности больше
+        не обновляется, поэтому забываем её — для аудитории остаются данные из
+        чужих лент. Вклад ленты в занятость аудиторий сохраняется.
+        """
+        self._own.pop(key, None)
+        self._versions.pop(key, None)
+
+    def busy(self, key: FeedKey, day: date) -> int | None:
+        """Маска занятых пар сущности в этот день; None — день вне периода индекса."""
+        offset = day.toordinal() - self._start.toordinal()
+        if not 0 <= offset < self._days():
+            return None
+        own = self._own.get(key)
+        if own is not None:
+            return own[offset]
+        if key[0] == ScheduleTarget.ROOM:
+            derived = self._rooms_busy.get(key[1])
+            if derived is not None:
+                return derived[offset]
+        return 0
+
+    def free_rooms(self, day: date, pairs: int, campus: str | None = None) -> list[RoomRef] | None:
+        """
+        Аудитории (известные индексу), свободные на всех парах из маски pairs;
+        None — день вне периода индекса.
+        """
+        if not self.covers(day):
+            return None
+        campus = campus.casefold() if campus else None
+        return [
+            room
+            for room_id, room in self.rooms.items()
+            if not self.busy((ScheduleTarget.ROOM, room_id), day) & pairs
+            and (campus is None or room.campus.casefold() == campus)
+        ]
+
+    def common_free(
+        self, keys: Iterable[FeedKey], date_from: date, date_to: date
+    ) -> list[tuple[date, int]] | None:
+        """Маски пар, свободных у всех сущностей, по дням периода; None — период вне индекса."""
+        if not (self.covers(date_from) and self.covers(date_to)):
+            return None
+        keys = list(keys)
+        result = []
+        day = date_from
+        while day <= date_to:
+            busy = 0
+            for key in keys:
+                busy |= self.busy(key, day)
+            result.append((day, ALL_PAIRS & ~busy))
+            day += timedelta(days=1)
+        return result
@@ -0,0 +1,161 @@
+"""
+Фоновый прогрев кеша лент перед учебным днём.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from app.cache import FeedCache
+from app.connectors import Priority, upstream_priority
+from app.parsers import ParseExecutor
+
+logger = logging.getLogger("app.prefetch")
+
+FeedKey = tuple[int, int]
+
+
+def parse_entities(value: str) -> list[FeedKey]:
+    """Список сущностей из строки вида "1:708, 2:1909" (тип:id)."""
+    entities: list[FeedKey] = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        schedule_type, _, entity_id = item.partition(":")
+        entities.append((int(schedule_type), int(entity_id)))
+    return entities
+
+
+def parse_times(value: str) -> list[time]:
+    """Время запусков из строки вида "07:30, 13:00"."""
+    return sorted(time.fromisoformat(item.strip()) for item in value.split(",") if item.strip())
+
+
+def seconds_until(times: list[time], now: datetime) -> float:
+    """Секунды от now до ближайшего из times (сегодня или завтра)."""
+    candidates = [
+        datetime.combine(now.date() + timedelta(days=days), moment, now.tzinfo)
+        for days in (0, 1)
+        for moment in times
+    ]
+    return min((c - now).total_seconds() for c in candidates if c > now)
+
+
+class Prefetcher:
+    """
+    Прогревает ленты и индексы занятий заранее, чтобы утренние запросы не ждали upstream.
+
+    Список сущностей — заданные в настройках плюс top самых запрашиваемых
+    (счётчики запросов переживают перезапуск в файле state_path). К upstream —
+    не чаще rate запросов в секунду (rate <= 0 — без предела) и с фоновым приоритетом:
+    запросы пользователей допускаются к upstream раньше (AdmissionController).
+    """
+
+    def __init__(
+        self,
+        cache: FeedCache,
+        executor: ParseExecutor,
+        entities: list[FeedKey],
+        top: int = 100,
+        rate: float = 2.0,
+        state_path: str | None = None,
+    ) -> None:
+        self._cache = cache
+        self._executor = executor
+        self.entities = entities
+        self.top = top
+        self.rate = rate
+        self.state_path = state_path
+        self._popularity: Counter[FeedKey] = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.entities) or self.top > 0
+
+    def record_request(self, schedule_type: int, entity_id: int) -> None:
+        """Учитывает успешный запрос пользователя в счётчике популярности."""
+        self._popularity[(schedule_type, entity_id)] += 1
+
+    def targets(self) -> list[FeedKey]:
+        """Сущности для прогрева: заданные в настройках, затем популярные."""
+        keys = dict.fromkeys(self.entities)
+        if self.top > 0:
+            keys.update(dict.fromkeys(key for key, _ in self._popularity.most_common(self.top)))
+        return list(keys)
+
+    async def run_once(self, min_ttl: float = 0) -> int:
+        """
+        Один проход прогрева; возвращает число прогретых сущностей.
+        Запросы к upstream идут с фоновым приоритетом (Priority.BACKGROUND).
+        """
+        warmed = 0
+        today = date.today()
+        with upstream_priority(Priority.BACKGROUND):
+            for key in self.targets():
+                try:
+                    feed = await self._cache.warm(*key, min_ttl=min_ttl)
+                    await self._executor.lessons(key, feed, today, today)
+                except Exception as e:
+                    logger.warning("Не удалось прогреть ленту %s: %r", key, e)
+                else:
+                    warmed += 1
+                if self.rate > 0:
+                    await asyncio.sleep(1 / self.rate)
+        return warmed
+
+    async def run_forever(self, times: list[time], timezone: str, on_startup: bool = True) -> None:
+        """
+        Прогрев при старте (on_startup) и ежедневно в times по часовому поясу timezone.
+        После каждого прохода счётчики популярности уменьшаются вдвое, чтобы
+        учитывались в первую очередь недавние запросы.
+        """
+        self.load_state()
+        zone = ZoneInfo(timezone)
+        if on_startup:
+            await self._run_logged()
+        if not times:
+            return
+        while True:
+            await asyncio.sleep(seconds_until(times, datetime.now(zone)))
+            await self._run_logged()
+
+    async def _run_logged(self) -> None:
+        started = asyncio.get_running_loop().time()
+        # ленты, которым до устаревания меньше половины ttl, тоже обновляются
+        warmed = await self.run_once(min_ttl=self._cache.ttl / 2)
+        logger.info(
+            "Прогрев: %d лент за %.1f с",
+            warmed,
+            asyncio.get_running_loop().time() - started,
+        )
+        self._popularity = Counter({key: count // 2 for key, count in self._popularity.items() if count > 1})
+        self.save_state()
+
+    def load_state(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                rows = json.load(f)
+            self._popularity.update({(t, i): count for t, i, count in rows})
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Не удалось прочитать %s: %r", self.state_path, e)
+
+    def save_state(self) -> None:
+        """Сохраняет счётчики самых запрашиваемых сущностей (не больше 10 × top)."""
+        if not self.state_path or self.top <= 0:
+            return
+        rows = [[t, i, count] for (t, i), count in self._popularity.most_common(self.top * 10)]
+        directory = os.path.dirname(self.state_path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump(rows, f)
+        except OSError as e:
+            logger.warning("Не удалось сохранить %s: %r", self.state_path, e)
@@ -0,0 +1,108 @@
+"""
+Обратный индекс: занятия преподавателей, групп и аудиторий, собранные из чужих лент.
+"""
+
+import time
+from datetime import date
+
+from app.cache import Feed
+from app.parsers import LessonRecord, ParseExecutor
+from app.schemas.search import ScheduleTarget
+
+from .feed_index import FeedDerivedIndex, FeedKey
+
+
+def _lesson_key(lesson: LessonRecord) -> tuple:
+    details = lesson.details
+    room = details.room
+    return (
+        lesson.date,
+        lesson.time_start,
+        lesson.time_end,
+        details.discipline,
+        details.lesson_type,
+        room.id if room is not None else None,
+    )
+
+
+class ReverseIndex(FeedDerivedIndex):
+    """
+    Каждое занятие ленты упоминает преподавателей, группы и аудиторию с их id
+    (X-META-TEACHER / X-META-GROUP / X-META-AUDITORIUM). Индекс раскладывает
+    занятия всех загруженных лент по этим сущностям, так что расписание
+    преподавателя или аудитории можно собрать из уже загруженных лент групп.
+
+    Полнота: когда проиндексирована собственная лента преподавателя или
+    аудитории, запоминается, из каких групп состоят её занятия. Если ленты всех
+    этих групп проиндексированы и сверялись с upstream не раньше чем max_age
+    секунд назад, собранное расписание считается полным (is_complete).
+    """
+
+    def __init__(self, executor: ParseExecutor, max_age: float = 3600, tz: str = "Europe/Moscow") -> None:
+        super().__init__(executor, tz)
+        self.max_age = max_age
+        # Источник → сущность → занятия источника, где она упоминается
+        self._by_source: dict[FeedKey, dict[FeedKey, list[LessonRecord]]] = {}
+        # Сущность → источники, где она упоминается
+        self._sources: dict[FeedKey, set[FeedKey]] = {}
+        # Преподаватель/аудитория → группы из её собственной ленты
+        self._members: dict[FeedKey, frozenset[FeedKey]] = {}
+        # Когда лента источника последний раз сверялась с upstream
+        self._fetched_at: dict[FeedKey, float] = {}
+
+    def on_feed(self, key: FeedKey, feed: Feed) -> None:
+        self._fetched_at[key] = feed.fetched_at
+        super().on_feed(key, feed)
+
+    def _apply(self, key: FeedKey, lessons: list[LessonRecord]) -> None:
+        targets: dict[FeedKey, list[LessonRecord]] = {}
+        members: set[FeedKey] = set()
+        for lesson in lessons:
+            details = lesson.details
+            for teacher in details.teachers:
+                targets.setdefault((ScheduleTarget.TEACHER, teacher.id), []).append(lesson)
+            for group in details.groups:
+                targets.setdefault((ScheduleTarget.GROUP, group.id), []).append(lesson)
+                members.add((ScheduleTarget.GROUP, group.id))
+            if details.room is not None:
+                targets.setdefault((ScheduleTarget.ROOM, details.room.id), []).append(lesson)
+        # Собственные занятия сущности отдаются из её ленты, здесь — только чужие
+        targets.pop(key, None)
+        if key[0] != ScheduleTarget.GROUP:
+            self._members[key] = frozenset(members)
+
+        previous = self._by_source.get(key, {})
+        for target in previous.keys() - targets.keys():
+            self._sources[target].discard(key)
+        for target in targets.keys() - previous.keys():
+            self._sources.setdefault(target, set()).add(key)
+        self._by_source[key] = targets
+
+    def _reset(self) -> None:
+        self._by_source.clear()
+        self._sources.clear()
+        self._members.clear()
+
+    def has(self, key: FeedKey) -> bool:
+        """Есть ли в индексе хоть одно занятие сущности."""
+        return bool(self._sources.get(key))
+
+    def is_complete(self, key: FeedKey) -> bool:
+        """Все группы из последней известной ленты сущности проиндексированы и свежи."""
+        members = self._members.get(key)
+        if not members:
+            return False
+        deadline = time.time() - self.max_age
+        return all(
+            member in self._versions and self._fetched_at.get(member, 0) >= deadline
+            for member in members
+        )
+
+    def lessons(self, key: FeedKey, date_from: date, date_to: date) -> list[LessonRecord]:
+        """Занятия сущности за период из чужих лент, без повторов, по порядку."""
+        seen: dict[tuple, LessonRecord] = {}
+        for source in self._sources.get(key, ()):
+            for lesson in self._by_source[source][key]:
+                if date_from <= lesson.date <= date_to:
+                    seen.setdefault(_lesson_key(lesson), lesson)
+        return [seen[k] for k in sorted(seen, key=lambda k: (*k[:5], k[5] or 0))]
@@ -0,0 +1,272 @@
+"""
+Локальный индекс групп, преподавателей и кабинетов для поиска без upstream.
+"""
+
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Self
+
+from cachetools import TTLCache
+
+from app.connectors import Priority, ScheduleConnector, upstream_priority
+
+logger = logging.getLogger("app.search_index")
+
+EntryKey = tuple[int, int]  # (scheduleTarget, id)
+
+
+def normalize(text: str) -> str:
+    """Приведение строки к виду для сравнения: регистр, ё → е, лишние пробелы."""
+    return " ".join(text.casefold().replace("ё", "е").split())
+
+
+def trigrams(text: str) -> set[str]:
+    """Триграммы нормализованной строки с пробелами по краям."""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(slots=True, frozen=True)
+class SearchEntry:
+    """Запись индекса в терминах ответа upstream /schedule/api/search."""
+    id: int
+    target_title: str
+    full_title: str
+    schedule_target: int
+
+    @property
+    def key(self) -> EntryKey:
+        return self.schedule_target, self.id
+
+    @classmethod
+    def from_raw(cls, item: dict[str, Any]) -> Self:
+        return cls(
+            id=int(item["id"]),
+            target_title=str(item["targetTitle"]),
+            full_title=str(item.get("fullTitle") or item["targetTitle"]),
+            schedule_target=int(item["scheduleTarget"]),
+        )
+
+    def as_raw(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "targetTitle": self.target_title,
+            "fullTitle": self.full_title,
+            "scheduleTarget": self.schedule_target,
+        }
+
+
+class SearchIndex:
+    """
+    In-memory индекс для поиска по названию.
+
+    Порядок выдачи: точное совпадение, совпадение по префиксу (регистр не важен),
+    затем нечёткие совпадения по триграммам с похожестью не ниже MIN_SIMILARITY.
+    complete — индекс заполнен полным обновлением (replace); до этого в нём только
+    то, что встречалось в ответах upstream. Порядок ответа upstream на запрос
+    запоминается на RANKING_TTL секунд (remember / ranked).
+    """
+
+    MIN_SIMILARITY = 0.3
+    RANKING_TTL = 3600
+
+    def __init__(self) -> None:
+        self._entries: dict[EntryKey, SearchEntry] = {}
+        self._names: list[tuple[str, EntryKey]] = []
+        self._postings: dict[str, set[EntryKey]] = defaultdict(set)
+        self._trigram_counts: dict[EntryKey, int] = {}
+        self._dirty = False
+        self.complete = False
+        # нормализованный запрос → (limit запроса к upstream, ключи в порядке ответа)
+        self._rankings: TTLCache = TTLCache(maxsize=4096, ttl=self.RANKING_TTL)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_many(self, items: list[dict[str, Any]]) -> None:
+        """Добавляет записи из ответа upstream; некорректные записи пропускаются."""
+        for item in items:
+            try:
+                entry = SearchEntry.from_raw(item)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if self._entries.get(entry.key) != entry:
+                self._entries[entry.key] = entry
+                self._dirty = True
+
+    def replace(self, items: list[dict[str, Any]]) -> None:
+        """Заменяет содержимое индекса целиком: после этого индекс считается полным."""
+        self._entries = {}
+        self.add_many(items)
+        self._dirty = True
+        self.complete = True
+        self._rankings.clear()
+
+    def remember(self, query: str, limit: int, items: list[dict[str, Any]]) -> None:
+        """Добавляет ответ upstream на запрос и запоминает порядок его записей."""
+        self.add_many(items)
+        keys = []
+        for item in items:
+            try:
+                keys.append(SearchEntry.from_raw(item).key)
+            except (KeyError, TypeError, ValueError):
+                continue
+        self._rankings[normalize(query)] = (limit, keys)
+
+    def ranked(self, query: str, limit: int = 100, target: int | None = None) -> list[dict[str, Any]] | None:
+        """Записи в порядке запомненного ответа upstream; None — ответа нет или его не хватает."""
+        ranking = self._rankings.get(normalize(query))
+        if ranking is None:
+            return None
+        upstream_limit, keys = ranking
+        result = [
+            self._entries[key].as_raw()
+            for key in keys
+            if key in self._entries and (target is None or key[0] == target)
+        ][:limit]
+        # Ответ upstream обрезан его limit: записей за его пределами мы не знаем
+        if len(keys) >= upstream_limit and len(result) < limit:
+            return None
+        return result
+
+    def search(
+        self, query: str, limit: int = 100, target: int | None = None, fuzzy: bool = True
+    ) -> list[dict[str, Any]]:
+        """Записи, подходящие под запрос, в формате ответа upstream; fuzzy — с нечёткими."""
+        q = normalize(query)
+        if not q or limit <= 0:
+            return []
+        if self._dirty:
+            self._rebuild()
+
+        found: dict[EntryKey, None] = {}
+        exact: list[EntryKey] = []
+        prefixed: list[EntryKey] = []
+        for i in range(bisect_left(self._names, (q,)), len(self._names)):
+            name, key = self._names[i]
+            if not name.startswith(q):
+                break
+            (exact if name == q else prefixed).append(key)
+        for key in exact + prefixed:
+            found.setdefault(key)
+
+        if fuzzy and len(q) >= 3 and len(found) < limit:
+            q_trigrams = trigrams(q)
+            shared: dict[EntryKey, int] = defaultdict(int)
+            for tg in q_trigrams:
+                for key in self._postings.get(tg, ()):
+                    shared[key] += 1
+            scored = []
+            for key, n in shared.items():
+                if key in found:
+                    continue
+                similarity = n / (len(q_trigrams) + self._trigram_counts[key] - n)
+                if similarity >= self.MIN_SIMILARITY:
+                    scored.append((-similarity, key))
+            scored.sort()
+            for _, key in scored:
+                found.setdefault(key)
+
+        result = []
+        for key in found:
+            if target is not None and key[0] != target:
+                continue
+            result.append(self._entries[key].as_raw())
+            if len(result) >= limit:
+                break
+        return result
+
+    def _rebuild(self) -> None:
+        names: list[tuple[str, EntryKey]] = []
+        postings: dict[str, set[EntryKey]] = defaultdict(set)
+        counts: dict[EntryKey, int] = {}
+        for key, entry in self._entries.items():
+            titles = {normalize(entry.target_title), normalize(entry.full_title)}
+            entry_trigrams: set[str] = set()
+            for title in titles:
+                names.append((title, key))
+                entry_trigrams |= trigrams(title)
+            for tg in entry_trigrams:
+                postings[tg].add(key)
+            counts[key] = len(entry_trigrams)
+        names.sort()
+        self._names, self._postings, self._trigram_counts = names, postings, counts
+        self._dirty = False
+
+    async def refresh(self, seeds: str, limit: int) -> None:
+        """
+        Полное обновление из upstream: по одному поисковому запросу на каждый символ seeds.
+        Индекс заменяется, только если все запросы удались; иначе полученные записи
+        добавляются к имеющимся. Если upstream ничего не вернул, индекс не трогаем.
+        """
+        connector = ScheduleConnector()
+        items: list[dict[str, Any]] = []
+        failed = 0
+        for seed in seeds:
+            try:
+                raw = await connector.search(query=seed, limit=limit)
+            except Exception as e:
+                failed += 1
+                logger.warning("Не удалось обновить поисковый индекс по «%s»: %r", seed, e)
+                continue
+            items.extend(raw.get("data", []))
+        if not items:
+            return
+        if failed:
+            self.add_many(items)
+            logger.info("Поисковый индекс дополнен: %d записей, неудачных запросов %d", len(self), failed)
+        else:
+            self.replace(items)
+            logger.info("Поисковый индекс обновлён: %d записей", len(self))
+
+    async def run_refresh_loop(self, seeds: str, limit: int, interval: float) -> None:
+        """Периодическое обновление индекса (запускается из lifespan), с фоновым приоритетом."""
+        with upstream_priority(Priority.BACKGROUND):
+            while True:
+                await self.refresh(seeds, limit)
+                await asyncio.sleep(interval)
+
+
+search_index = SearchIndex()
+
+
+async def find_entities(
+    query: str, limit: int = 100, target: int | None = None, fuzzy: bool = False
+) -> list[dict[str, Any]]:
+    """
+    Поиск без upstream, если ответ upstream на тот же запрос запомнен (его порядок
+    сохраняется) или если индекс полный и в нём ровно одно точное совпадение или
+    совпадение по префиксу. Иначе — upstream: его результаты попадают в индекс и
+    дополняются совпадениями из индекса, которых upstream не вернул.
+
+    Нечёткие совпадения (fuzzy) — только запасной вариант, когда upstream ничего
+    не нашёл или недоступен: иначе новая, ещё не проиндексированная группа
+    подменялась бы похожей на неё.
+    """
+    ranked = search_index.ranked(query, limit=limit, target=target)
+    if ranked:
+        return ranked
+    local = search_index.search(query, limit=limit, target=target, fuzzy=False)
+    # Порядок нескольких совпадений задаёт upstream (by-name берёт первое)
+    if len(local) == 1 and search_index.complete:
+        return local
+    try:
+        raw = await ScheduleConnector().search(query=query, limit=limit)
+    except Exception:
+        items = local or (search_index.search(query, limit=limit, target=target) if fuzzy else [])
+        if items:
+            return items
+        raise
+    items = raw.get("data", [])
+    search_index.remember(query, limit, items)
+    if target is not None:
+        items = [item for item in items if item.get("scheduleTarget") == target]
+    seen = {(item.get("scheduleTarget"), item.get("id")) for item in items}
+    items += [item for item in local if (item["scheduleTarget"], item["id"]) not in seen]
+    items = items[:limit]
+    if not items and fuzzy:
+        items = search_index.search(query, limit=limit, target=target)
+    return items
@@ -0,0 +1,114 @@
+"""
+Общие экземпляры приложения: кеш лент, разбор, кеш ответов и индексы, построенные по лентам.
+Роутеры и lifespan берут их отсюда.
+"""
+
+from app.cache import FeedCache, ResponseCache, create_feed_backend
+from app.config import settings
+from app.metrics import registry
+from app.parsers import FastICalParser, ICalParser, ParseExecutor
+from app.services import (
+    AcademicCalendar,
+    ChangeFeed,
+    OccupancyIndex,
+    Prefetcher,
+    ReverseIndex,
+    parse_entities,
+)
+
+feed_cache = FeedCache(
+    create_feed_backend(
+        settings.cache_backend,
+        ttl=settings.cache_ttl + settings.cache_stale_ttl,
+        path=settings.cache_path,
+        max_bytes=settings.cache_max_bytes,
+    ),
+    ttl=settings.cache_ttl,
+    stale_ttl=settings.cache_stale_ttl,
+    swr=settings.cache_mode == "swr",
+)
+_parser = FastICalParser() if settings.ical_parser == "fast" else ICalParser()
+parse_executor = ParseExecutor(
+    _parser,
+    mode=settings.parse_executor,
+    workers=settings.parse_workers,
+    maxsize=512,
+    ttl=settings.cache_ttl + settings.cache_stale_ttl,
+)
+response_cache = ResponseCache(max_bytes=settings.response_cache_max_bytes)
+prefetcher = Prefetcher(
+    feed_cache,
+    parse_executor,
+    entities=parse_entities(settings.prefetch_entities),
+    top=settings.prefetch_top,
+    rate=settings.prefetch_rate,
+    state_path=settings.prefetch_state_path,
+)
+occupancy_index = OccupancyIndex(parse_executor, settings.academic_timezone)
+feed_cache.add_listener(occupancy_index.on_feed)
+feed_cache.add_eviction_listener(occupancy_index.on_evict)
+reverse_index = ReverseIndex(parse_executor, max_age=settings.cache_ttl, tz=settings.academic_timezone)
+if settings.reverse_index != "off":
+    feed_cache.add_listener(reverse_index.on_feed)
+academic_calendar = AcademicCalendar(settings.academic_timezone)
+feed_cache.add_listener(academic_calendar.on_feed)
+change_feed = ChangeFeed(feed_cache, parse_executor, heartbeat=settings.changes_heartbeat)
+feed_cache.add_listener(change_feed.on_feed)
+
+
+def _by_result(stats: dict[str, float], **fields: str) -> dict[tuple[str, ...], float]:
+    """Счётчики из stats() кеша с меткой result: _by_result(stats, hit="hits", ...)."""
+    return {(result,): stats[field] for result, field in fields.items()}
+
+
+registry.callback(
+    "schedule_feed_cache_entries", "Лент в кеше", "gauge",
+    lambda: {(): feed_cache.stats()["size"]},
+)
+registry.callback(
+    "schedule_feed_cache_bytes", "Память, занятая лентами в кеше (для хранилищ в памяти)", "gauge",
+    lambda: {(): nbytes} if (nbytes := feed_cache.stats()["bytes"]) is not None else {},
+)
+registry.callback(
+    "schedule_feed_cache_requests_total", "Обращения к кешу лент", "counter",
+    lambda: _by_result(feed_cache.stats(), hit="hits", miss="misses", stale="stale_hits"),
+    ("result",),
+)
+registry.callback(
+    "schedule_feed_cache_evictions_total", "Ленты, вытесненные из кеша", "counter",
+    lambda: {(): feed_cache.stats()["evictions"]},
+)
+registry.callback(
+    "schedule_occupancy_indexed_feeds", "Лент, учтённых в индексе занятости", "gauge",
+    lambda: {(): len(occupancy_index)},
+)
+registry.callback(
+    "schedule_reverse_index_feeds", "Лент, учтённых в обратном индексе", "gauge",
+    lambda: {(): len(reverse_index)},
+)
+registry.callback(
+    "schedule_change_subscribers", "Подписчиков потока изменений", "gauge",
+    lambda: {(): change_feed.subscribers()},
+)
+registry.callback(
+    "schedule_change_events_total", "Событий изменения расписания", "counter",
+    lambda: {(): change_feed.published},
+)
+registry.callback(
+    "schedule_parsed_cache_entries", "Разобранных лент (индексов) в кеше", "gauge",
+    lambda: {(): parse_executor.stats()["size"]},
+)
+registry.callback(
+    "schedule_parsed_cache_requests_total", "Обращения к кешу разобранных лент", "counter",
+    lambda: _by_result(parse_executor.stats(), hit="hits", miss="misses"),
+    ("result",),
+)
+registry.callback(
+    "schedule_response_cache_bytes", "Байт в кеше готовых ответов", "gauge",
+    lambda: {(): response_cache.stats()["bytes"]},
+)
+registry.callback(
+    "schedule_response_cache_requests_total", "Обращения к кешу готовых ответов", "counter",
+    lambda: _by_result(response_cache.stats(), hit="hits", miss="misses"),
+    ("result",),
+)
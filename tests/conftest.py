@@ -0,0 +1,43 @@
+"""
+Общие фикстуры: подставной upstream вместо schedule-of.mirea.ru.
+"""
+
+import asyncio
+from collections.abc import Callable, Iterator
+
+import httpx
+import pytest
+
+from app.connectors import ScheduleConnector
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+class StandInUpstream:
+    """Отвечает на запросы коннектора через handler и записывает пути запросов."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.delay = 0.0
+        self.handler: Handler = lambda request: httpx.Response(404)
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.path)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.handler(request)
+
+
+@pytest.fixture
+def upstream() -> Iterator[StandInUpstream]:
+    connector = ScheduleConnector()
+    original = connector._client
+    stand_in = StandInUpstream()
+    connector._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(stand_in),
+        base_url=ScheduleConnector.BASE_URL,
+    )
+    try:
+        yield stand_in
+    finally:
+        connector._client = original
@@ -0,0 +1,48 @@
+"""
+Учебный календарь: поведение при недоступном upstream.
+"""
+
+import asyncio
+
+import httpx
+
+from app.services import AcademicCalendar
+
+
+def test_resolve_without_known_period_returns_none_on_upstream_error(upstream) -> None:
+    upstream.handler = lambda request: httpx.Response(404)
+    calendar = AcademicCalendar()
+
+    assert asyncio.run(calendar.resolve(calendar.today())) is None
+    # Повторная сверка — только после паузы
+    assert asyncio.run(calendar.resolve(calendar.today())) is None
+    assert len(upstream.calls) == 1
+
+
+def test_resolve_falls_back_to_week_markers(upstream) -> None:
+    upstream.handler = lambda request: httpx.Response(404)
+    calendar = AcademicCalendar()
+    today = calendar.today()
+    calendar.learn_markers([(today, 3)])
+
+    period = asyncio.run(calendar.resolve(today))
+    assert period is not None and period.week(today) == 3
+    assert period.contains(today)
+
+
+def test_week_outside_learned_period_reuses_todays_upstream_answer(upstream) -> None:
+    calendar = AcademicCalendar()
+    today = calendar.today()
+    # Каникулы: upstream сообщает прошедший семестр, в который сегодня не попадает
+    raw = {
+        "weekNumber": 0,
+        "schedulePeriodType": "Semester",
+        "start": f"{today.year - 1}-09-01T00:00:00+03:00",
+        "end": f"{today.year - 1}-12-31T00:00:00+03:00",
+    }
+    upstream.handler = lambda request: httpx.Response(200, json=raw)
+
+    assert asyncio.run(calendar.resolve(today)) is None
+    assert asyncio.run(calendar.resolve(today)) is None
+    assert calendar.reported() == raw
+    assert len(upstream.calls) == 1
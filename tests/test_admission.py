@@ -0,0 +1,90 @@
+"""
+Приоритеты допуска к upstream и склейка запросов разных классов.
+"""
+
+import asyncio
+
+import pytest
+
+from app.connectors import (
+    AdmissionController,
+    Priority,
+    ScheduleConnector,
+    schedule,
+    upstream_priority,
+)
+from app.connectors.singleflight import SingleFlight
+
+
+def test_interactive_caller_raises_priority_of_background_flight() -> None:
+    async def run() -> list[str]:
+        admission = AdmissionController(max_concurrent=1)
+        flight = SingleFlight()
+        order: list[str] = []
+        release = asyncio.Event()
+
+        async def request(name: str) -> str:
+            async with admission.slot("test"):
+                order.append(name)
+                if name == "blocker":
+                    await release.wait()
+            return name
+
+        blocker = asyncio.create_task(request("blocker"))
+        await asyncio.sleep(0)
+        with upstream_priority(Priority.BACKGROUND):
+            other = asyncio.create_task(request("other"))
+            await asyncio.sleep(0)
+            prefetch = asyncio.create_task(flight.do("ical", lambda: request("shared")))
+            await asyncio.sleep(0)
+        user = asyncio.create_task(flight.do("ical", lambda: request("duplicate")))
+        await asyncio.sleep(0)
+
+        release.set()
+        assert await user == await prefetch == "shared"
+        await asyncio.gather(blocker, other)
+        return order
+
+    assert asyncio.run(run()) == ["blocker", "shared", "other"]
+
+
+def test_background_caller_does_not_lower_priority() -> None:
+    async def run() -> list[str]:
+        admission = AdmissionController(max_concurrent=1)
+        flight = SingleFlight()
+        order: list[str] = []
+        release = asyncio.Event()
+
+        async def request(name: str) -> str:
+            async with admission.slot("test"):
+                order.append(name)
+                if name == "blocker":
+                    await release.wait()
+            return name
+
+        blocker = asyncio.create_task(request("blocker"))
+        await asyncio.sleep(0)
+        with upstream_priority(Priority.BATCH):
+            other = asyncio.create_task(request("other"))
+            await asyncio.sleep(0)
+        user = asyncio.create_task(flight.do("ical", lambda: request("shared")))
+        await asyncio.sleep(0)
+        with upstream_priority(Priority.BACKGROUND):
+            prefetch = asyncio.create_task(flight.do("ical", lambda: request("duplicate")))
+            await asyncio.sleep(0)
+
+        release.set()
+        assert await user == await prefetch == "shared"
+        await asyncio.gather(blocker, other)
+        return order
+
+    assert asyncio.run(run()) == ["blocker", "shared", "other"]
+
+
+def test_repeated_connector_calls_build_nothing(monkeypatch: pytest.MonkeyPatch) -> None:
+    admission = ScheduleConnector().admission
+    built: list[object] = []
+    monkeypatch.setattr(schedule, "AdmissionController", lambda **kwargs: built.append(kwargs))
+
+    assert ScheduleConnector().admission is admission
+    assert built == []
@@ -0,0 +1,34 @@
+"""
+Пакетный запрос расписания: ошибка одной сущности не роняет весь пакет.
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.routers import schedule
+from app.schemas.schedule import BatchScheduleItem
+from app.schemas.search import ScheduleTarget
+
+
+def test_item_error_is_reported_in_its_entry(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def load_lessons(schedule_type: int, entity_id: int, df: date, dt: date):
+        if entity_id == 1:
+            raise ValueError("битая лента")
+        return None, []
+
+    monkeypatch.setattr(schedule, "_load_lessons", load_lessons)
+    items = [
+        BatchScheduleItem(type=ScheduleTarget.GROUP, id=1),
+        BatchScheduleItem(type=ScheduleTarget.GROUP, id=2),
+    ]
+
+    async def run():
+        semaphore = asyncio.Semaphore(2)
+        day = date(2026, 9, 7)
+        return await asyncio.gather(*(schedule._batch_item(item, day, day, semaphore) for item in items))
+
+    broken, ok = asyncio.run(run())
+    assert broken.error == "Не удалось получить расписание: ValueError"
+    assert ok.error is None and ok.lessons == []
@@ -0,0 +1,63 @@
+"""
+ParseExecutor в режиме process: те же занятия, что inline, и текст ленты — только при промахе.
+"""
+
+import asyncio
+import hashlib
+from concurrent.futures import Executor, Future
+from datetime import date
+from pathlib import Path
+
+from app.cache import Feed
+from app.parsers import FastICalParser, ParseExecutor
+
+TEXT = (Path(__file__).parent / "fixtures" / "feeds" / "group_tzid.ics").read_text()
+PERIOD = (date(2026, 2, 1), date(2026, 8, 31))
+
+
+class RecordingExecutor(Executor):
+    """Пропускает задачи в настоящий пул и запоминает, передавался ли текст ленты."""
+
+    def __init__(self, inner: Executor) -> None:
+        self.inner = inner
+        self.sent_text: list[bool] = []
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        self.sent_text.append(args[2] is not None)
+        return self.inner.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self.inner.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def _feed(text: str) -> Feed:
+    return Feed(text=text, digest=hashlib.sha256(text.encode()).hexdigest())
+
+
+def _dump(lessons) -> list[dict]:
+    return [lesson.to_lesson().model_dump() for lesson in lessons]
+
+
+def test_process_mode_sends_text_only_on_worker_miss() -> None:
+    executor = ParseExecutor(FastICalParser(), mode="process", workers=2)
+    executor._workers = [RecordingExecutor(worker) for worker in executor._workers]
+    inline = ParseExecutor(FastICalParser())
+    feed, changed = _feed(TEXT), _feed(TEXT.replace("ЛК", "ПР"))
+    key = (1, 708)
+
+    async def run() -> None:
+        for current in (feed, feed, feed, changed, changed):
+            assert _dump(await executor.lessons(key, current, *PERIOD)) == _dump(
+                await inline.lessons(key, current, *PERIOD)
+            )
+
+    try:
+        asyncio.run(run())
+        workers = [worker for worker in executor._workers if worker.sent_text]
+        # Все запросы по ключу — в один процесс; текст — по разу на каждую версию ленты
+        assert len(workers) == 1
+        assert workers[0].sent_text == [False, True, False, False, False, True, False]
+        # Счётчики кеша — из процесса-воркера, а не из пустого кеша родителя
+        assert executor.stats() == {"size": 1, "hits": 3, "misses": 2}
+    finally:
+        executor.shutdown()
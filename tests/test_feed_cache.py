@@ -0,0 +1,63 @@
+"""
+Кеш лент поверх SQLite: вызовы хранилища вне цикла событий, вытеснения — в цикле.
+"""
+
+import asyncio
+import threading
+
+import httpx
+
+from app.cache import Feed, FeedCache
+from app.cache.backends import SQLiteFeedBackend
+
+TEXT = "BEGIN:VCALENDAR\nEND:VCALENDAR\n"
+
+
+def test_sqlite_backend_runs_off_the_event_loop(upstream, tmp_path) -> None:
+    upstream.handler = lambda request: httpx.Response(200, text=TEXT)
+    backend = SQLiteFeedBackend(str(tmp_path / "feeds.db"), ttl=60)
+    cache = FeedCache(backend, ttl=60)
+    threads: list[str] = []
+    get = backend.get
+
+    def recording_get(key):
+        threads.append(threading.current_thread().name)
+        return get(key)
+
+    backend.get = recording_get
+
+    async def run() -> None:
+        feed = await cache.get(1, 708)
+        assert (await cache.get(1, 708)).digest == feed.digest
+        assert await cache.digest(1, 708) == feed.digest
+        assert await cache.digest(1, 709) is None
+
+    try:
+        asyncio.run(run())
+        assert threads and threading.main_thread().name not in threads
+        assert len(upstream.calls) == 1
+        assert cache.stats()["hits"] == 1
+        assert len(backend) == 1
+    finally:
+        cache.close()
+
+
+def test_sqlite_evictions_reach_listeners_in_the_loop(tmp_path) -> None:
+    backend = SQLiteFeedBackend(str(tmp_path / "feeds.db"), ttl=-1)
+    cache = FeedCache(backend, ttl=60)
+    evicted: list[tuple[tuple[int, int], bool]] = []
+
+    def listener(key) -> None:
+        evicted.append((key, threading.current_thread() is threading.main_thread()))
+
+    cache.add_eviction_listener(listener)
+
+    async def run() -> None:
+        await cache._store((1, 708), Feed(text=TEXT, digest="abc"))
+        await asyncio.sleep(0)
+
+    try:
+        asyncio.run(run())
+        assert evicted == [((1, 708), True)]
+    finally:
+        cache.close()
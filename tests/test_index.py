@@ -0,0 +1,43 @@
+"""
+Индекс занятий по полугодиям: совпадает с разбором ленты целиком и не растёт без предела.
+"""
+
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from app.parsers import FastICalParser, ICalParser
+from app.parsers.index import OccurrenceIndex, index_horizon
+
+TEXT = (Path(__file__).parent / "fixtures" / "feeds" / "group_tzid.ics").read_text()
+
+
+def _dump(lessons) -> list[dict]:
+    return [lesson.to_lesson().model_dump() for lesson in lessons]
+
+
+def test_horizon_is_current_academic_year_and_a_semester_around() -> None:
+    assert index_horizon(date(2026, 10, 18)) == (date(2026, 2, 1), date(2028, 1, 31))
+    assert index_horizon(date(2027, 3, 1)) == (date(2026, 2, 1), date(2028, 1, 31))
+
+
+@pytest.mark.parametrize("parser", [ICalParser(), FastICalParser()], ids=["icalendar", "fast"])
+@pytest.mark.parametrize(
+    "period",
+    [
+        (date(2026, 3, 1), date(2026, 3, 31)),
+        (date(2025, 12, 1), date(2026, 3, 31)),
+        (date(2020, 1, 1), date(2035, 12, 31)),
+    ],
+    ids=["inside", "across-start", "wide"],
+)
+def test_index_matches_full_parse(parser: ICalParser, period: tuple[date, date]) -> None:
+    index = OccurrenceIndex.from_text(parser, TEXT)
+    assert _dump(index.lessons(*period)) == _dump(parser.parse(TEXT, *period))
+
+
+def test_periods_outside_horizon_are_not_cached() -> None:
+    index = OccurrenceIndex.from_text(FastICalParser(), TEXT)
+    index.lessons(date(1000, 1, 1), date(9000, 1, 1))
+    assert len(index._periods) <= OccurrenceIndex.MAX_PERIODS
@@ -0,0 +1,49 @@
+"""
+Индекс занятости: границы периода и вытеснение лент из кеша.
+"""
+
+from datetime import date, timedelta
+
+from app.cache import Feed, FeedCache
+from app.cache.backends import MemoryFeedBackend
+from app.parsers import FastICalParser, ParseExecutor
+from app.services.feed_index import horizon
+from app.services.occupancy import OccupancyIndex
+
+ROOM = (3, 42)
+
+
+def _index() -> OccupancyIndex:
+    return OccupancyIndex(ParseExecutor(FastICalParser()))
+
+
+def test_days_outside_period_are_not_read() -> None:
+    index = _index()
+    index._apply(ROOM, [])
+    start, end = index.period
+    assert index.busy(ROOM, start) == 0
+    assert index.busy(ROOM, start - timedelta(days=1)) is None
+    assert index.busy(ROOM, end + timedelta(days=1)) is None
+    assert index.common_free([ROOM], start, end + timedelta(days=1)) is None
+    assert index.free_rooms(end + timedelta(days=1), 1) is None
+
+
+def test_covers_rolls_to_current_period() -> None:
+    index = _index()
+    index._start, index._end = horizon(date(2000, 3, 1))
+    assert index.covers(index.today())
+    assert index.period == horizon(index.today())
+
+
+def test_evicted_feed_drops_own_occupancy() -> None:
+    index = _index()
+    cache = FeedCache(MemoryFeedBackend(ttl=60, maxsize=1), ttl=60)
+    cache.add_eviction_listener(index.on_evict)
+    index._apply(ROOM, [])
+    index._versions[ROOM] = ("abc", index.period[0])
+
+    cache._backend.set(ROOM, Feed(text="", digest="abc"))
+    cache._backend.set((1, 708), Feed(text="", digest="def"))
+    assert ROOM not in index._own
+    assert len(index) == 0
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,57 @@
+"""
+Дифференциальная проверка: FastICalParser даёт те же занятия, что ICalParser.
+"""
+
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.parsers import FastICalParser, ICalParser
+from app.parsers.fast import FastCalendar
+
+FEEDS = sorted((Path(__file__).parent / "fixtures" / "feeds").glob("*.ics"))
+
+
+def _windows() -> list[tuple[date, date]]:
+    windows = [
+        (date(2026, 2, 9), date(2026, 2, 9)),
+        (date(2026, 2, 10), date(2026, 2, 16)),
+        (date(2026, 2, 1), date(2026, 8, 31)),
+        (date(2026, 3, 16), date(2026, 3, 16)),
+        (date(2026, 5, 31), date(2026, 6, 2)),
+    ]
+    rnd = random.Random(1)
+    for _ in range(20):
+        start = date(2026, 2, 1) + timedelta(days=rnd.randrange(130))
+        windows.append((start, start + timedelta(days=rnd.randrange(10))))
+    return windows
+
+
+WINDOWS = _windows()
+
+
+def _lessons(parser: ICalParser, text: str, date_from: date, date_to: date) -> list[dict]:
+    return [record.to_lesson().model_dump() for record in parser.parse(text, date_from, date_to)]
+
+
+@pytest.mark.parametrize("path", FEEDS, ids=lambda p: p.stem)
+def test_fast_parser_matches_icalendar(path: Path) -> None:
+    text = path.read_text(encoding="utf-8")
+    reference, fast = ICalParser(), FastICalParser()
+    for date_from, date_to in WINDOWS:
+        expected = _lessons(reference, text, date_from, date_to)
+        assert _lessons(fast, text, date_from, date_to) == expected, (date_from, date_to)
+
+
+@pytest.mark.parametrize("path", FEEDS, ids=lambda p: p.stem)
+def test_fast_parser_handles_feed_itself(path: Path) -> None:
+    """Ленты fallback_* быстрый парсер отдаёт icalendar, остальные разбирает сам."""
+    calendar = FastICalParser().load(path.read_text(encoding="utf-8"))
+    assert isinstance(calendar, FastCalendar) != path.stem.startswith("fallback_")
+
+
+def test_feeds_are_not_empty() -> None:
+    text = (Path(__file__).parent / "fixtures" / "feeds" / "group_tzid.ics").read_text(encoding="utf-8")
+    assert _lessons(ICalParser(), text, date(2026, 2, 1), date(2026, 8, 31))
@@ -0,0 +1,42 @@
+"""
+Прогрев лент: скорость прогрева и учёт популярности сущностей.
+"""
+
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+
+from app.cache import FeedCache
+from app.cache.backends import MemoryFeedBackend
+from app.parsers import FastICalParser, ParseExecutor
+from app.routers import schedule
+from app.services.prefetch import Prefetcher
+
+TEXT = "BEGIN:VCALENDAR\nEND:VCALENDAR\n"
+
+
+def test_zero_rate_means_no_limit(upstream) -> None:
+    upstream.handler = lambda request: httpx.Response(200, text=TEXT)
+    prefetcher = Prefetcher(
+        FeedCache(MemoryFeedBackend(ttl=60), ttl=60),
+        ParseExecutor(FastICalParser()),
+        entities=[(1, 708), (1, 709)],
+        rate=0,
+    )
+
+    assert asyncio.run(prefetcher.run_once()) == 2
+    assert len(upstream.calls) == 2
+
+
+def test_failed_request_is_not_counted(upstream, monkeypatch: pytest.MonkeyPatch) -> None:
+    prefetcher = Prefetcher(
+        FeedCache(MemoryFeedBackend(ttl=60), ttl=60), ParseExecutor(FastICalParser()), entities=[]
+    )
+    monkeypatch.setattr(schedule, "prefetcher", prefetcher)
+    day = date(2026, 9, 7)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(schedule._load_lessons(1, 404, day, day))
+    assert prefetcher.targets() == []
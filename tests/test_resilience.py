@@ -0,0 +1,98 @@
+"""
+Ошибки upstream iCal после всех повторов: UpstreamUnavailableError (→ 503 с Retry-After),
+бюджет времени и устаревшая лента при недоступном upstream.
+"""
+
+import asyncio
+import time
+from collections.abc import Iterator
+
+import httpx
+import pytest
+
+from app.cache import Feed, FeedCache
+from app.cache.backends import MemoryFeedBackend
+from app.connectors import (
+    AdmissionController,
+    DeadlineExceededError,
+    ScheduleConnector,
+    UpstreamUnavailableError,
+)
+from app.connectors.resilience import CircuitBreaker, ResilientCall, sent_upstream
+
+TEXT = "BEGIN:VCALENDAR\nEND:VCALENDAR\n"
+
+
+@pytest.fixture
+def no_retry_delay(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    connector = ScheduleConnector()
+    monkeypatch.setattr(connector._ical_call, "retry_delay", 0.0)
+    yield
+    # Предохранитель общий для процесса: не оставляем его разомкнутым для других тестов
+    connector._ical_breaker.record_success()
+
+
+def _refuse(request: httpx.Request) -> httpx.Response:
+    raise httpx.ConnectError("refused", request=request)
+
+
+@pytest.mark.parametrize(
+    "handler",
+    [lambda request: httpx.Response(502), _refuse],
+    ids=["5xx", "transport"],
+)
+def test_exhausted_retries_become_upstream_unavailable(upstream, no_retry_delay, handler) -> None:
+    upstream.handler = handler
+    with pytest.raises(UpstreamUnavailableError) as info:
+        asyncio.run(ScheduleConnector().get_ical(1, 708))
+    assert info.value.retry_after is not None and info.value.retry_after > 0
+    assert len(upstream.calls) == ScheduleConnector().max_retries
+
+
+def test_client_errors_are_not_wrapped(upstream, no_retry_delay) -> None:
+    upstream.handler = lambda request: httpx.Response(404)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(ScheduleConnector().get_ical(1, 708))
+    assert len(upstream.calls) == 1
+
+
+def _resilient_call() -> tuple[ResilientCall, AdmissionController]:
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    return ResilientCall("test", breaker, deadline=0.05), AdmissionController(max_concurrent=1, queue_timeout=0)
+
+
+def test_deadline_in_admission_queue_is_not_an_upstream_failure() -> None:
+    call, admission = _resilient_call()
+
+    async def request() -> None:
+        async with admission.slot("test"):
+            with sent_upstream():
+                await asyncio.sleep(1)
+
+    async def run() -> None:
+        busy = asyncio.ensure_future(request())
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceededError):
+            await call.call(request)
+        assert call.breaker.state == "closed"
+        # Запрос, отправленный в upstream и не уложившийся в бюджет, — неудача
+        busy.cancel()
+        with pytest.raises(DeadlineExceededError):
+            await call.call(request)
+        assert call.breaker.state == "open"
+
+    asyncio.run(run())
+
+
+def test_ttl_mode_serves_stale_feed_while_upstream_is_down(upstream, no_retry_delay) -> None:
+    cache = FeedCache(MemoryFeedBackend(ttl=7200), ttl=60, stale_ttl=3600, swr=False)
+    stale = Feed(text=TEXT, digest="old", fetched_at=time.time() - 600)
+    cache._backend.set((1, 708), stale)
+
+    upstream.handler = lambda request: httpx.Response(502)
+    assert asyncio.run(cache.get(1, 708)) is stale
+    assert cache.stats()["stale_hits"] == 1
+
+    upstream.handler = lambda request: httpx.Response(200, text=TEXT.replace("END", "END "))
+    assert asyncio.run(cache.get(1, 708)).digest != "old"
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,75 @@
+"""
+Поиск по локальному индексу и upstream.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import find_entities, search_index
+
+INDEXED = {"id": 708, "targetTitle": "ИКБО-01-23", "fullTitle": "ИКБО-01-23", "scheduleTarget": 1}
+NEW = {"id": 900, "targetTitle": "ИКБО-05-24", "fullTitle": "ИКБО-05-24", "scheduleTarget": 1}
+
+
+@pytest.fixture(autouse=True)
+def index():
+    search_index.replace([INDEXED])
+    yield search_index
+    search_index.replace([])
+    search_index.complete = False
+
+
+def test_exact_and_prefix_hits_skip_upstream(upstream) -> None:
+    assert asyncio.run(find_entities("икбо-01-23"))[0]["id"] == 708
+    assert asyncio.run(find_entities("ИКБО-01"))[0]["id"] == 708
+    assert upstream.calls == []
+
+
+def test_fuzzy_hit_does_not_replace_unindexed_group(upstream) -> None:
+    upstream.handler = lambda request: httpx.Response(200, json={"data": [NEW]})
+    assert [item["id"] for item in asyncio.run(find_entities("ИКБО-05-24"))] == [900]
+    assert upstream.calls == ["/schedule/api/search"]
+
+
+def test_fuzzy_results_only_as_fallback(upstream) -> None:
+    upstream.handler = lambda request: httpx.Response(200, json={"data": []})
+    assert asyncio.run(find_entities("ИКБО-05-24")) == []
+    assert [item["id"] for item in asyncio.run(find_entities("ИКБО-05-24", fuzzy=True))] == [708]
+
+
+def test_partial_index_is_merged_with_upstream(upstream) -> None:
+    search_index.complete = False
+    upstream.handler = lambda request: httpx.Response(200, json={"data": [NEW]})
+    assert [item["id"] for item in asyncio.run(find_entities("ИКБО"))] == [900, 708]
+    assert upstream.calls == ["/schedule/api/search"]
+
+
+def test_partial_index_answers_when_upstream_is_down(upstream) -> None:
+    search_index.complete = False
+    upstream.handler = lambda request: httpx.Response(404)
+    assert [item["id"] for item in asyncio.run(find_entities("ИКБО-01"))] == [708]
+
+
+def test_upstream_ranking_is_kept_and_reused(upstream) -> None:
+    search_index.complete = False
+    upstream.handler = lambda request: httpx.Response(200, json={"data": [NEW, INDEXED]})
+    for _ in range(2):
+        assert [item["id"] for item in asyncio.run(find_entities("ИКБО"))] == [900, 708]
+    assert upstream.calls == ["/schedule/api/search"]
+
+
+def test_refresh_with_failed_seed_keeps_existing_entries(upstream) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["match"] == "а":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"data": [NEW]})
+
+    upstream.handler = handler
+    asyncio.run(search_index.refresh("аб", limit=10))
+    assert {item["id"] for item in search_index.search("ИКБО", fuzzy=False)} == {708, 900}
+
+    upstream.handler = lambda request: httpx.Response(200, json={"data": [NEW]})
+    asyncio.run(search_index.refresh("аб", limit=10))
+    assert [item["id"] for item in search_index.search("ИКБО", fuzzy=False)] == [900]
@@ -0,0 +1,54 @@
+"""
+Склейка одновременных одинаковых запросов к upstream.
+"""
+
+import asyncio
+
+import httpx
+
+from app.connectors import ScheduleConnector
+
+N = 50
+
+
+def test_concurrent_ical_requests_hit_upstream_once(upstream) -> None:
+    upstream.delay = 0.05
+    upstream.handler = lambda request: httpx.Response(200, text="BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n")
+
+    async def run() -> list[str]:
+        connector = ScheduleConnector()
+        return await asyncio.gather(*(connector.get_ical(1, 708) for _ in range(N)))
+
+    texts = asyncio.run(run())
+    assert len(set(texts)) == 1
+    assert upstream.calls == ["/schedule/api/ical/1/708"]
+
+
+def test_different_keys_are_not_coalesced(upstream) -> None:
+    upstream.delay = 0.05
+    upstream.handler = lambda request: httpx.Response(200, text="BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n")
+
+    async def run() -> None:
+        connector = ScheduleConnector()
+        await asyncio.gather(*(connector.get_ical(1, entity_id) for entity_id in (708, 709) for _ in range(N)))
+
+    asyncio.run(run())
+    assert sorted(upstream.calls) == ["/schedule/api/ical/1/708", "/schedule/api/ical/1/709"]
+
+
+def test_concurrent_search_and_week_hit_upstream_once(upstream) -> None:
+    upstream.delay = 0.05
+    upstream.handler = lambda request: httpx.Response(200, json={"data": []})
+
+    async def run() -> None:
+        connector = ScheduleConnector()
+        await asyncio.gather(
+            *(connector.search("ИКБО", limit=10) for _ in range(N)),
+            *(connector.get_week_number() for _ in range(N)),
+        )
+
+    asyncio.run(run())
+    assert sorted(upstream.calls) == [
+        "/schedule/api/search",
+        "/schedule/api/weeknumber/receiver/attendance_high_school",
+    ]
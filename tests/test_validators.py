@@ -0,0 +1,38 @@
+"""
+Валидаторы ответов расписания: ETag и Last-Modified / If-Modified-Since.
+"""
+
+import time
+from datetime import date, datetime
+from email.utils import formatdate
+
+from app.cache.feeds import Feed
+from app.headers import not_modified, validators
+
+VARIANT = ("schedule", 1, 708)
+
+
+def _feed(changed_at: float) -> Feed:
+    return Feed(text="BEGIN:VCALENDAR\nEND:VCALENDAR\n", digest="abc", changed_at=changed_at)
+
+
+def test_fixed_period_revalidates_by_feed_change() -> None:
+    changed_at = time.time() - 3 * 86400
+    headers = validators(_feed(changed_at), VARIANT)
+    assert not_modified(headers, None, formatdate(changed_at + 60, usegmt=True))
+    assert not not_modified(headers, None, formatdate(changed_at - 60, usegmt=True))
+
+
+def test_relative_period_is_not_modified_only_within_today() -> None:
+    # Период «сегодня» сдвигается с датой: вчерашний ответ устарел, хотя лента не менялась
+    changed_at = time.time() - 3 * 86400
+    midnight = datetime.combine(date.today(), datetime.min.time()).timestamp()
+    headers = validators(_feed(changed_at), VARIANT, relative=True)
+    assert not not_modified(headers, None, formatdate(midnight - 3600, usegmt=True))
+    assert not_modified(headers, None, formatdate(midnight + 1, usegmt=True))
+
+
+def test_etag_takes_precedence_over_if_modified_since() -> None:
+    headers = validators(_feed(time.time()), VARIANT)
+    assert not not_modified(headers, '"other"', formatdate(time.time() + 60, usegmt=True))
+    assert not_modified(headers, headers["ETag"], None)